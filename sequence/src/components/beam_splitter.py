@@ -9,8 +9,9 @@ from typing import TYPE_CHECKING, List
 
 if TYPE_CHECKING:
     from ..kernel.timeline import Timeline
+    from .pulse_train import PulseTrain
 
-from numpy import trace
+from numpy import trace, array, asarray, conj, where
 
 from .photon import Photon
 from ..kernel.quantum_utils import povm_0
@@ -76,6 +77,34 @@ class BeamSplitter(Entity):
                                  photon, self.get_generator())
             self._receivers[res].get(photon)
 
+    def get_pulse_train(self, train: "PulseTrain") -> None:
+        """Method to receive a pulse train for measurement.
+
+        Equivalent to calling `get` for each photon of the train at its arrival time.
+
+        Args:
+            train (PulseTrain): photons to measure (must have polarization encoding).
+
+        Side Effects:
+            May call `get_pulse_train` method of receivers with the arrival times of photons measured in each state.
+        """
+
+        assert train.encoding_type["name"] == "polarization", "Beamsplitter should only be used with polarization."
+
+        train = train.select(self.get_generator().random(len(train)) < self.fidelity)
+        indices = ((train.times - self.start_time) * self.frequency * 1e-12).astype(int)
+        in_window = (indices >= 0) & (indices < len(self.basis_list))
+        train = train.select(in_window)
+        bases = asarray(self.basis_list)[indices[in_window]]
+
+        # probability to measure the first basis state, for each state of the train and measurement basis
+        prob_0 = array([abs(train.state_table @ conj(basis[0])) ** 2 for basis in polarization["bases"]])
+        prob = where(train.noise, 0.5, prob_0[bases, train.states])
+        results = self.get_generator().random(len(train)) >= prob
+
+        self._receivers[0].get_pulse_train(train.times[~results])
+        self._receivers[1].get_pulse_train(train.times[results])
+
     def set_basis_list(self, basis_list: List[int], start_time: int, frequency: float) -> None:
         """Sets the basis_list, start_time, and frequency attributes."""
 
@@ -7,12 +7,13 @@ QSDetector is defined as an abstract template and as implementations for polariz
 
 from abc import ABC, abstractmethod
 from typing import TYPE_CHECKING, Any, Dict, List
-from numpy import eye, kron, exp, sqrt
+from numpy import eye, kron, exp, sqrt, zeros, ones, concatenate, flatnonzero, rint, sort
 from scipy.linalg import fractional_matrix_power
 from math import factorial
 
 if TYPE_CHECKING:
     from ..kernel.timeline import Timeline
+    from .pulse_train import PulseTrain
 
 from .photon import Photon
 from .beam_splitter import BeamSplitter
@@ -39,26 +40,34 @@ class Detector(Entity):
         count_rate (float): maximum detection rate; defines detector cooldown time.
         time_resolution (int): minimum resolving power of photon arrival time (in ps).
         photon_counter (int): counts number of detection events.
+        batch_dark_counts (bool): if dark counts are drawn when detections are recorded, instead of scheduled as events.
+        dark_count_time (int): time up to which batched dark counts have been drawn (in ps).
+        pending_times (numpy.ndarray): arrival times of photons from pulse trains and of batched dark counts not yet recorded (in ps).
     """
 
     _meas_circuit = Circuit(1)
     _meas_circuit.measure(0)
 
     def __init__(self, name: str, timeline: "Timeline", efficiency=0.9, dark_count=0, count_rate=int(25e6),
-                 time_resolution=150):
+                 time_resolution=150, batch_dark_counts=False):
         Entity.__init__(self, name, timeline)  # Detector is part of the QSDetector, and does not have its own name
         self.efficiency = efficiency
         self.dark_count = dark_count  # measured in 1/s
         self.count_rate = count_rate  # measured in Hz
         self.time_resolution = time_resolution  # measured in ps
+        self.batch_dark_counts = batch_dark_counts
         self.next_detection_time = -1
         self.photon_counter = 0
+        self.dark_count_time = 0
+        self.pending_times = zeros(0, dtype=int)
 
     def init(self):
         """Implementation of Entity interface (see base class)."""
         self.next_detection_time = -1
         self.photon_counter = 0
-        if self.dark_count > 0:
+        self.dark_count_time = self.timeline.now()
+        self.pending_times = zeros(0, dtype=int)
+        if self.dark_count > 0 and not self.batch_dark_counts:
             self.add_dark_count()
 
     def get(self, photon=None, **kwargs) -> None:
@@ -85,6 +94,79 @@ class Detector(Entity):
         if self.get_generator().random() < self.efficiency:
             self.record_detection()
 
+    def get_pulse_train(self, times) -> None:
+        """Method to receive the photons of a pulse train.
+
+        Equivalent to calling `get` at the arrival time of each photon.
+        Photons passing the efficiency check are recorded by `record_pending`, when the simulation reaches their arrival time.
+
+        Args:
+            times (numpy.ndarray): sorted arrival times of photons (in ps).
+        """
+
+        self.photon_counter += len(times)
+        detected = times[self.get_generator().random(len(times)) < self.efficiency]
+        if len(detected) > 0 and len(self.pending_times) > 0 and detected[0] < self.pending_times[-1]:
+            self.pending_times = sort(concatenate((self.pending_times, detected)))
+        else:
+            self.pending_times = concatenate((self.pending_times, detected))
+
+    def record_pending(self, until: int) -> None:
+        """Method to record the detections of pulse train photons and batched dark counts.
+
+        Applies the detector dead time to the photons arrived up to `until`, in order with the detections already recorded.
+        If `batch_dark_counts` is set, dark counts up to `until` are drawn first and recorded with the photons.
+
+        Args:
+            until (int): latest arrival time to record (in ps).
+
+        Side Effects:
+            May notify upper entities of detection events.
+        """
+
+        if self.batch_dark_counts and self.dark_count > 0 and until > self.dark_count_time:
+            self.add_dark_counts(until)
+
+        num_arrived = self.pending_times.searchsorted(until, side="right")
+        if num_arrived == 0:
+            return
+        times = self.pending_times[:num_arrived]
+        self.pending_times = self.pending_times[num_arrived:]
+
+        # a photon arriving more than a dead time after the previous one is always recorded,
+        # the others depend on which of the previous photons were recorded
+        dead_time = 1e12 / self.count_rate
+        recorded = ones(len(times), dtype=bool)
+        recorded[1:] = times[1:] - times[:-1] > dead_time
+        recorded &= times > self.next_detection_time
+        for i in flatnonzero(~recorded[1:]) + 1:
+            last = i - 1
+            while last >= 0 and not recorded[last]:
+                last -= 1
+            next_detection_time = times[last] + dead_time if last >= 0 else self.next_detection_time
+            recorded[i] = times[i] > next_detection_time
+
+        times = times[recorded]
+        if len(times) > 0:
+            self.notify({'times': (rint(times / self.time_resolution) * self.time_resolution).astype(int)})
+            self.next_detection_time = times[-1] + dead_time
+
+    def add_dark_counts(self, until: int) -> None:
+        """Method to draw the dark counts of a time window at once.
+
+        The number of dark counts since the previous window is drawn from a Poisson distribution, with times uniform within the window.
+        Dark counts are added to the pending detections, to be recorded by `record_pending`.
+
+        Args:
+            until (int): end of the time window (in ps).
+        """
+
+        window = until - self.dark_count_time
+        num_dark_counts = self.get_generator().poisson(self.dark_count * window * 1e-12)
+        times = self.get_generator().integers(self.dark_count_time + 1, until + 1, num_dark_counts)
+        self.pending_times = sort(concatenate((self.pending_times, times)))
+        self.dark_count_time = until
+
     def add_dark_count(self) -> None:
         """Method to schedule false positive detection events.
 
@@ -115,6 +197,8 @@ class Detector(Entity):
         """
 
         now = self.timeline.now()
+        # photons of pulse trains arrived before the dark count
+        self.record_pending(now - 1)
 
         if now > self.next_detection_time:
             time = round(now / self.time_resolution) * self.time_resolution
@@ -164,9 +248,13 @@ class QSDetector(Entity, ABC):
     def trigger(self, detector: Detector, info: Dict[str, Any]) -> None:
         # TODO: rewrite
         detector_index = self.detectors.index(detector)
-        self.trigger_times[detector_index].append(info['time'])
+        if 'times' in info:
+            self.trigger_times[detector_index].extend(info['times'])
+        else:
+            self.trigger_times[detector_index].append(info['time'])
 
-    def set_detector(self, idx: int,  efficiency=0.9, dark_count=0, count_rate=int(25e6), time_resolution=150):
+    def set_detector(self, idx: int,  efficiency=0.9, dark_count=0, count_rate=int(25e6), time_resolution=150,
+                     batch_dark_counts=False):
         """Method to set the properties of an attached detector.
 
         Args:
@@ -180,6 +268,7 @@ class QSDetector(Entity, ABC):
         detector.dark_count = dark_count
         detector.count_rate = count_rate
         detector.time_resolution = time_resolution
+        detector.batch_dark_counts = batch_dark_counts
 
     def get_photon_times(self):
         return self.trigger_times
@@ -236,7 +325,20 @@ class QSDetectorPolarization(QSDetector):
 
         self.splitter.get(photon)
 
+    def get_pulse_train(self, train: "PulseTrain") -> None:
+        """Method to receive a pulse train for measurement.
+
+        Forwards the train to the internal polarization beamsplitter.
+
+        Arguments:
+            train (PulseTrain): photons to measure.
+        """
+
+        self.splitter.get_pulse_train(train)
+
     def get_photon_times(self):
+        for detector in self.detectors:
+            detector.record_pending(self.timeline.now())
         times = self.trigger_times
         self.trigger_times = [[], []]
         return times
@@ -297,7 +399,20 @@ class QSDetectorTimeBin(QSDetector):
 
         self.switch.get(photon)
 
+    def get_pulse_train(self, train: "PulseTrain") -> None:
+        """Method to receive a pulse train for measurement.
+
+        Forwards the train to the internal fiber switch.
+
+        Arguments:
+            train (PulseTrain): photons to measure.
+        """
+
+        self.switch.get_pulse_train(train)
+
     def get_photon_times(self):
+        for detector in self.detectors:
+            detector.record_pending(self.timeline.now())
         times, self.trigger_times = self.trigger_times, [[], [], []]
         return times
 
@@ -5,12 +5,13 @@ Interferometers are usually instantiated as part of a QSDetector object, defined
 """
 
 from math import sqrt
-from numpy import multiply
+from numpy import multiply, minimum, where
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
     from ..kernel.timeline import Timeline
     from ..components.photon import Photon
+    from ..components.pulse_train import PulseTrain
 
 from ..kernel.process import Process
 from ..kernel.entity import Entity
@@ -107,3 +108,50 @@ class Interferometer(Entity):
         process = Process(self._receivers[detector_num], "get", [])
         event = Event(self.timeline.now() + time, process)
         self.timeline.schedule(event)
+
+    def get_pulse_train(self, train: "PulseTrain") -> None:
+        """Method to receive a pulse train for measurement.
+
+        Equivalent to calling `get` for each photon of the train at its arrival time.
+        Photons leave the interferometer after 0, 1 or 2 path differences.
+        Only the photons leaving after 1 path difference interfere: those in a superposition of early and late go to the detector given by their relative phase (or are lost), the others to a random detector.
+
+        Arguments:
+            train (PulseTrain): photons to measure (must have time bin encoding).
+
+        Side Effects:
+            May call `get_pulse_train` method of the attached receivers with the arrival times of photons.
+        """
+
+        assert train.encoding_type["name"] == "time_bin", \
+            "Invalid photon encoding {} received by interferometer".format(train.encoding_type["name"])
+
+        early = abs(train.state_table[:, 0]) ** 2
+        late = abs(train.state_table[:, 1]) ** 2
+        # coherence of early and late components, +1 for early + late and -1 for early - late
+        coherence = 2 * (train.state_table[:, 0] * train.state_table[:, 1].conj()).real
+
+        prob_first = early[train.states] / 2
+        prob_last = late[train.states] / 2
+        coherence = coherence[train.states]
+        phase_errors = self.get_generator().random(len(train)) < self.phase_error
+        coherence = where(phase_errors, -coherence, coherence)
+        prob_middle_0 = minimum(1, 1 + coherence) / 4
+        prob_middle_1 = minimum(1, 1 - coherence) / 4
+
+        random_num = self.get_generator().random(len(train))
+        first = random_num < prob_first
+        last = (random_num >= prob_first) & (random_num < prob_first + prob_last)
+        bound = prob_first + prob_last + prob_middle_0
+        middle_0 = (random_num >= prob_first + prob_last) & (random_num < bound)
+        middle_1 = (random_num >= bound) & (random_num < bound + prob_middle_1)
+
+        detector_num = where(middle_0, 0, where(middle_1, 1, self.get_generator().integers(2, size=len(train))))
+        delays = (middle_0 | middle_1) * self.path_difference + last * 2 * self.path_difference
+        kept = first | last | middle_0 | middle_1
+        times = train.times + delays
+
+        for i, receiver in enumerate(self._receivers):
+            detected = times[kept & (detector_num == i)]
+            detected.sort()
+            receiver.get_pulse_train(detected)
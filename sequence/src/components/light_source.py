@@ -6,9 +6,10 @@ These classes should be connected to one or two entities, respectively, that are
 
 from typing import List
 
-from numpy import multiply, sqrt, zeros, kron, outer
+from numpy import multiply, sqrt, zeros, kron, outer, flatnonzero, repeat, array
 
 from .photon import Photon
+from .pulse_train import PulseTrain
 from ..kernel.entity import Entity
 from ..kernel.event import Event
 from ..kernel.process import Process
@@ -31,10 +32,11 @@ class LightSource(Entity):
         encoding_type (Dict[str, Any]): encoding scheme of emitted photons (as defined in the encoding module).
         phase_error (float): phase error applied to qubits.
         photon_counter (int): counter for number of photons emitted.
+        pulse_train (bool): if `emit_states` should send all photons as one `PulseTrain` (polarization and time bin encodings).
     """
 
     def __init__(self, name, timeline, frequency=8e7, wavelength=1550, bandwidth=0, mean_photon_num=0.1,
-                 encoding_type=polarization, phase_error=0):
+                 encoding_type=polarization, phase_error=0, pulse_train=False):
         """Constructor for the LightSource class.
 
         Arguments:
@@ -46,6 +48,7 @@ class LightSource(Entity):
             mean_photon_num (float): mean number of photons emitted each period (default 0.1).
             encoding_type (Dict): encoding scheme of emitted photons (as defined in the encoding module) (default polarization).
             phase_error (float): phase error applied to qubits (default 0).
+            pulse_train (bool): if `emit_states` should send all photons as one `PulseTrain` (default False).
         """
 
         Entity.__init__(self, name, timeline)
@@ -56,6 +59,7 @@ class LightSource(Entity):
         self.encoding_type = encoding_type
         self.phase_error = phase_error
         self.photon_counter = 0
+        self.pulse_train = pulse_train
 
     def init(self):
         """Implementation of Entity interface (see base class)."""
@@ -68,6 +72,7 @@ class LightSource(Entity):
 
         Will emit photons for a length of time determined by the `state_list` parameter.
         The number of photons emitted per period is calculated as a poisson random variable.
+        Periods are visited by a single event, rescheduled for the next period with photons (see `emit_pulses`).
 
         Arguments:
             state_list (List[List[complex]]): list of complex coefficient arrays to send as photon-encoded qubits.
@@ -75,28 +80,106 @@ class LightSource(Entity):
 
         log.logger.info("{} emitting {} photons".format(self.name, len(state_list)))
 
-        time = self.timeline.now()
+        start_time = self.timeline.now()
         period = int(round(1e12 / self.frequency))
 
-        for i, state in enumerate(state_list):
-            num_photons = self.get_generator().poisson(self.mean_photon_num)
-
-            if self.get_generator().random() < self.phase_error:
-                state = multiply([1, -1], state)
-
-            for _ in range(num_photons):
-                wavelength = self.linewidth * self.get_generator().standard_normal() + self.wavelength
-                new_photon = Photon(str(i), self.timeline,
-                                    wavelength=wavelength,
-                                    location=self.owner,
-                                    encoding_type=self.encoding_type,
-                                    quantum_state=state)
-                process = Process(self._receivers[0], "get", [new_photon])
-                event = Event(time, process)
-                self.timeline.schedule(event)
-                self.photon_counter += 1
+        def pulses():
+            for i, state in enumerate(state_list):
+                num_photons = self.get_generator().poisson(self.mean_photon_num)
+
+                if self.get_generator().random() < self.phase_error:
+                    state = multiply([1, -1], state)
+
+                if num_photons > 0:
+                    yield start_time + i * period, self._create_photons(i, state, num_photons)
+
+        self.schedule_pulses(pulses())
+
+    def schedule_pulses(self, pulses) -> None:
+        """Method to schedule the emission of the next pulse of a pulse sequence.
+
+        A pulse sequence holds a single event in the timeline, whatever its length.
+
+        Arguments:
+            pulses (Iterator[Tuple[int, List[Photon]]]): emission time and photons of each remaining pulse.
+
+        Side Effects:
+            Will schedule an `emit_pulses` event at the time of the next pulse.
+        """
+
+        pulse = next(pulses, None)
+        if pulse is not None:
+            time, photons = pulse
+            process = Process(self, "emit_pulses", [photons, pulses])
+            event = Event(time, process)
+            self.timeline.schedule(event)
+
+    def emit_pulses(self, photons: List[Photon], pulses) -> None:
+        """Method to send the photons of a pulse and schedule the next pulse.
+
+        Arguments:
+            photons (List[Photon]): photons of the current pulse.
+            pulses (Iterator[Tuple[int, List[Photon]]]): emission time and photons of each remaining pulse.
+        """
+
+        for photon in photons:
+            self._receivers[0].get(photon)
+        self.schedule_pulses(pulses)
+
+    def _create_photons(self, index: int, state, num_photons: int) -> List[Photon]:
+        photons = []
+        for _ in range(num_photons):
+            wavelength = self.linewidth * self.get_generator().standard_normal() + self.wavelength
+            photons.append(Photon(str(index), self.timeline,
+                                  wavelength=wavelength,
+                                  location=self.owner,
+                                  encoding_type=self.encoding_type,
+                                  quantum_state=state))
+        self.photon_counter += num_photons
+        return photons
+
+    def emit_states(self, state_indices) -> None:
+        """Method to emit photons from an array of state indices.
+
+        Equivalent to `emit`, with the state of each period given as an index `2 * basis + bit` into the bases of `encoding_type`.
+        Photon numbers and phase errors are drawn for all periods at once, and only periods with photons are visited.
+        If the `pulse_train` attribute is set, photons of all periods are sent at once as a `PulseTrain` (polarization and time bin encodings).
+        Photon wavelengths are not tracked in this case.
+
+        Arguments:
+            state_indices (numpy.ndarray): index of the state to send in each period.
+        """
+
+        log.logger.info("{} emitting {} photons".format(self.name, len(state_indices)))
+
+        start_time = self.timeline.now()
+        period = int(round(1e12 / self.frequency))
 
-            time += period
+        states = [state for basis in self.encoding_type["bases"] for state in basis]
+        flipped_states = [multiply([1, -1], state) for state in states]
+        num_photons = self.get_generator().poisson(self.mean_photon_num, len(state_indices))
+        phase_errors = self.get_generator().random(len(state_indices)) < self.phase_error
+
+        if self.pulse_train and self.encoding_type["name"] in ("polarization", "time_bin"):
+            # flipped states follow the unflipped ones in the state table
+            periods = repeat(flatnonzero(num_photons), num_photons[num_photons > 0])
+            train = PulseTrain(start_time + periods * period,
+                               state_indices[periods] + len(states) * phase_errors[periods],
+                               array(states + flipped_states, dtype=complex),
+                               self.encoding_type)
+            self.photon_counter += len(train)
+            self._receivers[0].get_pulse_train(train)
+            return
+
+        def pulses():
+            for i in flatnonzero(num_photons):
+                if phase_errors[i]:
+                    state = flipped_states[state_indices[i]]
+                else:
+                    state = states[state_indices[i]]
+                yield start_time + int(i) * period, self._create_photons(i, state, num_photons[i])
+
+        self.schedule_pulses(pulses())
 
 
 class SPDCSource(LightSource):
@@ -5,13 +5,13 @@ It also defines the QuantumChannel class for transmission of qubits/photons and
 OpticalChannels must be attached to nodes on both ends.
 """
 
-import heapq as hq
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, List
 
 if TYPE_CHECKING:
     from ..kernel.timeline import Timeline
     from ..topology.node import Node
     from ..components.photon import Photon
+    from ..components.pulse_train import PulseTrain
     from ..message import Message
 
 from ..kernel.entity import Entity
@@ -20,6 +20,117 @@ from ..kernel.process import Process
 from ..utils import log
 
 
+class SlotAllocator():
+    """Class tracking reserved transmission slots of a channel.
+
+    Slots are stored as a bitmap (one byte per slot) starting at a base slot.
+    Slots before the base are free; the base moves forward as the lowest slots are released.
+    A cursor keeps the index before which all slots of the bitmap are reserved, so that reservations do not search the reserved slots at the start of the bitmap again.
+
+    Reserving `num_slots` slots from the cursor (e.g. back to back slots) takes O(num_slots) amortized time, and popping the lowest slot O(1) amortized time.
+    Reserving after the cursor searches the bitmap from `min_slot`, in time linear in the bitmap length, and reserving before the base copies the bitmap.
+
+    Attributes:
+        base (int): slot of the first byte of the bitmap.
+        bitmap (bytearray): 1 for reserved slots, 0 for free slots.
+        cursor (int): index of the bitmap before which all slots are reserved.
+        num_reserved (int): number of reserved slots.
+    """
+
+    def __init__(self):
+        self.base = 0
+        self.bitmap = bytearray()
+        self.cursor = 0
+        self.num_reserved = 0
+
+    def __len__(self) -> int:
+        return self.num_reserved
+
+    def __contains__(self, slot: int) -> bool:
+        index = slot - self.base
+        return 0 <= index < len(self.bitmap) and self.bitmap[index] == 1
+
+    def reserve(self, min_slot: int, num_slots=1) -> int:
+        """Method to reserve consecutive free slots.
+
+        Args:
+            min_slot (int): earliest slot to reserve.
+            num_slots (int): number of consecutive slots to reserve (default 1).
+
+        Returns:
+            int: first reserved slot.
+        """
+
+        if self.num_reserved == 0:
+            self.base = min_slot
+            self.bitmap = bytearray()
+            self.cursor = 0
+        elif min_slot < self.base:
+            self.bitmap[0:0] = bytes(self.base - min_slot)
+            self.base = min_slot
+            self.cursor = 0
+
+        start = max(min_slot - self.base, self.cursor)
+        index = self.bitmap.find(bytes(num_slots), start)
+        if index == -1:
+            # the slots extend past the end of the bitmap
+            index = max(start, self.bitmap.rfind(1) + 1)
+        end = index + num_slots
+        if end > len(self.bitmap):
+            self.bitmap.extend(bytes(end - len(self.bitmap)))
+        self.bitmap[index:end] = b"\x01" * num_slots
+        self.num_reserved += num_slots
+
+        # no free slot between the cursor and the reserved slots
+        if index == self.cursor or (num_slots == 1 and start == self.cursor):
+            self.cursor = end
+
+        slot = self.base + index
+        self._move_base()
+        return slot
+
+    def release(self, slot: int) -> None:
+        """Method to free a reserved slot.
+
+        Args:
+            slot (int): slot to free.
+        """
+
+        assert slot in self, "slot {} is not reserved".format(slot)
+        index = slot - self.base
+        self.bitmap[index] = 0
+        self.num_reserved -= 1
+        self.cursor = min(self.cursor, index)
+        if index == 0:
+            self._move_base()
+
+    def pop(self) -> int:
+        """Method to free the lowest reserved slot.
+
+        Returns:
+            int: freed slot.
+        """
+
+        assert self.num_reserved > 0, "no reserved slot"
+        slot = self.base
+        self.bitmap[0] = 0
+        self.num_reserved -= 1
+        self._move_base()
+        return slot
+
+    def _move_base(self) -> None:
+        # the bitmap always starts with a reserved slot (if any)
+        if self.bitmap[:1] == b"\x01":
+            return
+        index = self.bitmap.find(1)
+        if index == -1:
+            index = len(self.bitmap)
+        # deleting from the start of a bytearray does not copy it
+        del self.bitmap[:index]
+        self.base += index
+        self.cursor = max(self.cursor - index, 0)
+
+
 class OpticalChannel(Entity):
     """Parent class for optical fibers.
 
@@ -79,6 +190,7 @@ class QuantumChannel(OpticalChannel):
         loss (float): loss rate for transmitted photons (determined by attenuation).
         delay (int): delay (in ps) of photon transmission (determined by light speed, distance).
         frequency (float): maximum frequency of qubit transmission (in Hz).
+        send_bins (SlotAllocator): time bins reserved for transmission.
     """
 
     def __init__(self, name: str, timeline: "Timeline", attenuation: float, distance: int,
@@ -99,7 +211,7 @@ class QuantumChannel(OpticalChannel):
         self.delay = 0
         self.loss = 1
         self.frequency = frequency  # maximum frequency for sending qubits (measured in Hz)
-        self.send_bins = []
+        self.send_bins = SlotAllocator()
 
     def init(self) -> None:
         """Implementation of Entity interface (see base class)."""
@@ -149,7 +261,7 @@ class QuantumChannel(OpticalChannel):
         if len(self.send_bins) > 0:
             time = -1
             while time < self.timeline.now():
-                time_bin = hq.heappop(self.send_bins)
+                time_bin = self.send_bins.pop()
                 time = int(time_bin * (1e12 / self.frequency))
             assert time == self.timeline.now(), "qc {} transmit method called at invalid time".format(self.name)
 
@@ -189,6 +301,41 @@ class QuantumChannel(OpticalChannel):
         else:
             pass
 
+    def transmit_pulse_train(self, train: "PulseTrain", source: "Node") -> None:
+        """Method to transmit a pulse train.
+
+        Equivalent to calling `transmit` for each photon of the train at its emission time.
+        Losses and polarization noise are drawn for all photons at once.
+
+        Args:
+            train (PulseTrain): photons to be transmitted.
+            source (Node): source node sending the photons.
+
+        Side Effects:
+            Receiver node may receive the kept photons (via the `receive_pulse_train` method).
+        """
+
+        log.logger.info(
+            "{} send pulse train of {} photons to {} by Channel {}".format(
+                self.sender.name, len(train), self.receiver, self.name))
+
+        assert self.delay != 0 and self.loss != 1, \
+            "QuantumChannel init() function has not been run for {}".format(self.name)
+        assert source == self.sender
+        assert train.encoding_type["name"] in ("polarization", "time_bin"), \
+            "pulse trains are only supported with polarization and time bin encodings"
+
+        train = train.select(self.sender.get_generator().random(len(train)) > self.loss)
+        if train.encoding_type["name"] == "polarization":
+            train.noise |= self.sender.get_generator().random(len(train)) > self.polarization_fidelity
+        train.times = train.times + self.delay
+
+        # schedule receiving node to receive photons at arrival of the first one
+        if len(train) > 0:
+            process = Process(self.receiver, "receive_pulse_train", [source.name, train])
+            event = Event(int(train.times[0]), process)
+            self.timeline.schedule(event)
+
     def schedule_transmit(self, min_time: int) -> int:
         """Method to schedule a time for photon transmission.
 
@@ -204,21 +351,36 @@ class QuantumChannel(OpticalChannel):
 
         # TODO: move this to node?
 
+        time_bin = self.send_bins.reserve(self._min_time_bin(min_time))
+
+        # calculate time
+        time = int(time_bin * (1e12 / self.frequency))
+        return time
+
+    def schedule_transmits(self, min_time: int, num_photons: int) -> List[int]:
+        """Method to schedule times for the transmission of several photons.
+
+        Reserves consecutive transmission windows, starting from the first block of `num_photons` available windows.
+
+        Args:
+            min_time (int): minimum simulation time for transmission.
+            num_photons (int): number of transmission windows to reserve.
+
+        Returns:
+            List[int]: simulation times of the reserved transmission windows.
+        """
+
+        time_bin = self.send_bins.reserve(self._min_time_bin(min_time), num_photons)
+        return [int((time_bin + i) * (1e12 / self.frequency)) for i in range(num_photons)]
+
+    def _min_time_bin(self, min_time: int) -> int:
         min_time = max(min_time, self.timeline.now())
         time_bin = min_time * (self.frequency / 1e12)
         if time_bin - int(time_bin) > 0.00001:
             time_bin = int(time_bin) + 1
         else:
             time_bin = int(time_bin)
-
-        # find earliest available time bin
-        while time_bin in self.send_bins:
-            time_bin += 1
-        hq.heappush(self.send_bins, time_bin)
-
-        # calculate time
-        time = int(time_bin * (1e12 / self.frequency))
-        return time
+        return time_bin
 
     def _receiver_on_other_tl(self) -> bool:
         return self.timeline.get_entity_by_name(self.receiver) is None
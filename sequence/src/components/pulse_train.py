@@ -0,0 +1,58 @@
+"""Model for batches of photons.
+
+This module defines the PulseTrain class, which stores all photons emitted by a light source during one emission window as arrays.
+Pulse trains take the place of individual `Photon` objects when a `LightSource` is set to emit them (see the `pulse_train` attribute of `LightSource`).
+Components along the path (quantum channels, beam splitters, switches, interferometers and detectors) handle a whole train with a single method call.
+"""
+
+from typing import Any, Dict
+
+from numpy import ndarray, zeros
+
+
+class PulseTrain():
+    """Photons of an emission window, stored as arrays.
+
+    Photons are sorted by time.
+    Each photon has the state `state_table[states[i]]`, unless it was depolarized by the channel (`noise[i]`), in which case it has a random real polarization.
+
+    Attributes:
+        times (ndarray): emission time of each photon, arrival time once transmitted by a quantum channel (in ps).
+        states (ndarray): index of the state of each photon in `state_table`.
+        state_table (ndarray): complex coefficients of the states photons may be prepared in.
+        noise (ndarray): marks photons depolarized by channel noise (dtype bool).
+        encoding_type (Dict[str, Any]): encoding type of the photons (as defined in the encoding module).
+    """
+
+    def __init__(self, times: ndarray, states: ndarray, state_table: ndarray, encoding_type: Dict[str, Any]):
+        """Constructor for the pulse train class.
+
+        Args:
+            times (ndarray): emission time of each photon (in ps).
+            states (ndarray): index of the state of each photon in `state_table`.
+            state_table (ndarray): complex coefficients of the states photons may be prepared in.
+            encoding_type (Dict[str, Any]): encoding type of the photons.
+        """
+
+        self.times = times
+        self.states = states
+        self.state_table = state_table
+        self.noise = zeros(len(times), dtype=bool)
+        self.encoding_type = encoding_type
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def select(self, mask: ndarray) -> "PulseTrain":
+        """Method to get the photons of the train selected by a mask.
+
+        Args:
+            mask (ndarray): boolean mask (or indices) of photons to keep.
+
+        Returns:
+            PulseTrain: a new train with the selected photons.
+        """
+
+        train = PulseTrain(self.times[mask], self.states[mask], self.state_table, self.encoding_type)
+        train.noise = self.noise[mask]
+        return train
@@ -7,8 +7,11 @@ A more general switch class is in development.
 
 from typing import TYPE_CHECKING, List
 
+from numpy import asarray, conj
+
 if TYPE_CHECKING:
     from ..kernel.timeline import Timeline
+    from .pulse_train import PulseTrain
 
 from .photon import Photon
 from ..kernel.entity import Entity
@@ -85,3 +88,33 @@ class Switch(Entity):
             process = Process(receiver, "get", [photon])
             event = Event(time, process)
             self.timeline.schedule(event)
+
+    def get_pulse_train(self, train: "PulseTrain") -> None:
+        """Method to receive a pulse train for transmission.
+
+        Equivalent to calling `get` for each photon of the train at its arrival time.
+        Photons routed to the detector are measured in the first basis, with the late ones delayed by the bin separation.
+
+        Args:
+            train (PulseTrain): photons to transmit (must have time bin encoding).
+
+        Side Effects:
+            May call `get_pulse_train` method of the detector (with the arrival times of photons) and of the interferometer.
+        """
+
+        assert train.encoding_type["name"] == "time_bin"
+
+        indices = ((train.times - self.start_time) * self.frequency * 1e-12).astype(int)
+        in_window = (indices >= 0) & (indices < len(self.basis_list))
+        train = train.select(in_window)
+        bases = asarray(self.basis_list)[indices[in_window]]
+
+        detected = train.select(bases == 0)
+        early_basis = train.encoding_type["bases"][0]
+        prob_early = abs(detected.state_table @ conj(early_basis[0])) ** 2
+        late = self.get_generator().random(len(detected)) >= prob_early[detected.states]
+        times = detected.times + late * train.encoding_type["bin_separation"]
+        times.sort()
+
+        self._receivers[0].get_pulse_train(times)
+        self._receivers[1].get_pulse_train(train.select(bases == 1))
@@ -14,6 +14,7 @@ if TYPE_CHECKING:
 
 import numpy
 
+from .bitkey import BitKey
 from ..message import Message
 from ..protocol import StackProtocol
 from ..kernel.event import Event
@@ -58,7 +59,7 @@ class BB84Message(Message):
         start_time (int): simulation start time of qubit pulse (if `msg_type == BEGIN_PHOTON_PULSE`).
         wavelength (float): wavelength (in nm) of photons (if `msg_type == BEGIN_PHOTON_PULSE`).
         bases (List[int]): list of measurement bases (if `msg_type == BASIS_LIST`).
-        indices (List[int]): list of indices for matching bases (if `msg_type == MATCHING_INDICES`).
+        indices (numpy.ndarray): indices of matching bases (if `msg_type == MATCHING_INDICES`).
     """
 
     def __init__(self, msg_type: BB84MsgType, receiver: str, **kwargs):
@@ -94,9 +95,11 @@ class BB84(StackProtocol):
         start_time (int): simulation start time of key generation.
         photon_delay (int): time delay of photon (ps).
         basis_lists (List[int]): list of bases that qubits are sent in.
-        bit_lists (List[int]): list of 0/1 qubits sent (in bases from basis_lists).
-        key (int): generated key as an integer.
-        key_bits (List[int]): generated key as a list of 0/1 bits.
+        bit_lists (List[numpy.ndarray]): 0/1 qubits sent (in bases from basis_lists), -1 for qubits not received (Bob).
+        key (BitKey): generated key.
+        key_bits (numpy.ndarray): buffer of sifted 0/1 bits, bits `key_bits_start` to `key_bits_end` are not yet used for a key.
+        key_bits_start (int): first bit of `key_bits` not yet used for a key.
+        key_bits_end (int): end of the sifted bits in `key_bits`.
         another (BB84): other BB84 protocol instance (on opposite node).
         key_lengths (List[int]): list of desired key lengths.
         self.keys_left_list (List[int]): list of desired number of keys.
@@ -131,8 +134,10 @@ class BB84(StackProtocol):
         self.photon_delay = 0  # time delay of photon (including dispersion) (ps)
         self.basis_lists = None
         self.bit_lists = None
-        self.key = 0  # key as int
-        self.key_bits = None  # key as list of bits
+        self.key = None  # key as BitKey
+        self.key_bits = None  # sifted bits buffer
+        self.key_bits_start = 0
+        self.key_bits_end = 0
         self.another = None
         self.key_lengths = []  # desired key lengths (from parent)
         self.keys_left_list = []
@@ -198,8 +203,9 @@ class BB84(StackProtocol):
             self.another.basis_lists = []
             self.bit_lists = []
             self.another.bit_lists = []
-            self.key_bits = []
-            self.another.key_bits = []
+            for protocol in [self, self.another]:
+                protocol.key_bits = numpy.zeros(0, dtype=numpy.uint8)
+                protocol.key_bits_start = protocol.key_bits_end = 0
             self.latency = 0
             self.another.latency = 0
 
@@ -246,17 +252,12 @@ class BB84(StackProtocol):
 
             # generate basis/bit list
             num_pulses = round(self.light_time * self.ls_freq)
-            basis_list = numpy.random.choice([0, 1], num_pulses)
-            bit_list = numpy.random.choice([0, 1], num_pulses)
+            basis_list = self.own.get_generator().integers(2, size=num_pulses)
+            bit_list = self.own.get_generator().integers(2, size=num_pulses)
 
             # control hardware
             lightsource = self.own.components[self.ls_name]
-            encoding_type = lightsource.encoding_type
-            state_list = []
-            for i, bit in enumerate(bit_list):
-                state = (encoding_type["bases"][basis_list[i]])[bit]
-                state_list.append(state)
-            lightsource.emit(state_list)
+            lightsource.emit_states(2 * basis_list + bit_list)
 
             self.basis_lists.append(basis_list)
             self.bit_lists.append(bit_list)
@@ -289,7 +290,7 @@ class BB84(StackProtocol):
         log.logger.debug(self.name + " setting measurement basis")
 
         num_pulses = int(self.light_time * self.ls_freq)
-        basis_list = numpy.random.choice([0, 1], num_pulses)
+        basis_list = self.own.get_generator().integers(2, size=num_pulses)
         self.basis_lists.append(basis_list)
         self.own.components[self.qsd_name].set_basis_list(basis_list, self.start_time, self.ls_freq)
 
@@ -354,14 +355,12 @@ class BB84(StackProtocol):
                 # parse alice basis list
                 basis_list_alice = msg.bases
 
-                # compare own basis with basis message and create list of matching indices
-                indices = []
-                basis_list = self.basis_lists.pop(0)
-                bits = self.bit_lists.pop(0)
-                for i, b in enumerate(basis_list_alice):
-                    if bits[i] != -1 and basis_list[i] == b:
-                        indices.append(i)
-                        self.key_bits.append(bits[i])
+                # compare own basis with basis message and create array of matching indices
+                num_pulses = len(basis_list_alice)
+                basis_list = numpy.asarray(self.basis_lists.pop(0))[:num_pulses]
+                bits = numpy.asarray(self.bit_lists.pop(0))[:num_pulses]
+                indices = numpy.flatnonzero((bits != -1) & (basis_list == basis_list_alice))
+                self.add_key_bits(bits[indices])
 
                 # send to Alice list of matching indices
                 message = BB84Message(BB84MsgType.MATCHING_INDICES, self.another.name, indices=indices)
@@ -372,19 +371,18 @@ class BB84(StackProtocol):
                 # parse matching indices
                 indices = msg.indices
 
-                bits = self.bit_lists.pop(0)
+                bits = numpy.asarray(self.bit_lists.pop(0))
 
                 # set key equal to bits at received indices
-                for i in indices:
-                    self.key_bits.append(bits[i])
+                self.add_key_bits(bits[indices])
 
                 # check if key long enough. If it is, truncate if necessary and call cascade
-                if len(self.key_bits) >= self.key_lengths[0]:
+                if self.key_bits_end - self.key_bits_start >= self.key_lengths[0]:
                     throughput = self.key_lengths[0] * 1e12 / (self.own.timeline.now() - self.last_key_time)
 
-                    while len(self.key_bits) >= self.key_lengths[0] and self.keys_left_list[0] > 0:
+                    while self.key_bits_end - self.key_bits_start >= self.key_lengths[0] and self.keys_left_list[0] > 0:
                         log.logger.info(self.name + " generated a valid key")
-                        self.set_key()  # convert from binary list to int
+                        self.set_key()  # convert from binary list to BitKey
                         self._pop(info=self.key)
                         self.another.set_key()
                         self.another._pop(info=self.another.key)  # TODO: why access another node?
@@ -395,11 +393,8 @@ class BB84(StackProtocol):
 
                         self.throughputs.append(throughput)
 
-                        key_diff = self.key ^ self.another.key
-                        num_errors = 0
-                        while key_diff:
-                            key_diff &= key_diff - 1
-                            num_errors += 1
+                        # popcount of the differing bits
+                        num_errors = (self.key ^ self.another.key).popcount()
                         self.error_rates.append(num_errors / self.key_lengths[0])
 
                         self.keys_left_list[0] -= 1
@@ -411,9 +406,30 @@ class BB84(StackProtocol):
                     self.working = False
                     self.another.working = False
 
+    def add_key_bits(self, bits: numpy.ndarray) -> None:
+        """Method to append sifted bits to the `key_bits` buffer.
+
+        The unused bits are moved to the front of the buffer, which doubles in size when full, instead of allocating a new array for every frame.
+
+        Args:
+            bits (numpy.ndarray): sifted 0/1 bits.
+        """
+
+        num_bits = self.key_bits_end - self.key_bits_start
+        buffer = self.key_bits
+        if num_bits + len(bits) > len(buffer):
+            buffer = numpy.empty(max(2 * len(buffer), num_bits + len(bits)), dtype=numpy.uint8)
+        buffer[:num_bits] = self.key_bits[self.key_bits_start:self.key_bits_end]
+        buffer[num_bits:num_bits + len(bits)] = bits
+        self.key_bits = buffer
+        self.key_bits_start = 0
+        self.key_bits_end = num_bits + len(bits)
+
     def set_key(self):
-        """Method to convert `bit_list` field (List[int]) to a single key (int)."""
+        """Method to convert the first unused bits of `key_bits` field (numpy.ndarray) to a single key (BitKey)."""
 
-        key_bits = self.key_bits[0:self.key_lengths[0]]
-        del self.key_bits[0:self.key_lengths[0]]
-        self.key = int("".join(str(x) for x in key_bits), 2)  # convert from binary list to int
+        key_length = self.key_lengths[0]
+        key_bits = self.key_bits[self.key_bits_start:self.key_bits_start + key_length]
+        self.key_bits_start += key_length
+        # the first sifted bit is the most significant bit of the key
+        self.key = BitKey.from_bits(key_bits[::-1])
@@ -1,4 +1,4 @@
-__all__ = ['BB84', 'cascade']
+__all__ = ['BB84', 'bitkey', 'cascade', 'ldpc', 'privacy_amplification']
 
 def __dir__():
     return sorted(__all__)
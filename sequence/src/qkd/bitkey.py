@@ -0,0 +1,169 @@
+"""Definition of the packed bit string used for key material.
+
+This module defines the `BitKey` class, shared by the key generation (BB84), error correction (cascade) and key management layers.
+Keys are stored packed in a numpy array, so that parities, bit flips and error counts on long keys do not require conversion to python integers.
+"""
+
+from typing import Union
+
+import numpy
+
+# number of set bits of every byte value
+POPCOUNT_TABLE = numpy.unpackbits(numpy.arange(256, dtype=numpy.uint8)[:, None], axis=1).sum(axis=1)
+
+
+class BitKey():
+    """Packed bit string of fixed length.
+
+    Bit `i` of a key is bit `i` of the equivalent integer (i.e. `(int(key) >> i) & 1`), so that keys keep the bit positions of the integer keys used previously.
+    Bits are packed 8 per byte, least significant bit first; unused bits of the last byte are always 0.
+
+    Attributes:
+        data (numpy.ndarray): packed bits (dtype uint8).
+        length (int): number of bits in the key.
+    """
+
+    __slots__ = ["data", "length"]
+
+    def __init__(self, data: numpy.ndarray, length: int):
+        """Constructor for BitKey class.
+
+        Args:
+            data (numpy.ndarray): packed bits, least significant bit first (dtype uint8).
+            length (int): number of bits in the key.
+        """
+
+        self.data = data
+        self.length = length
+
+    @classmethod
+    def from_bits(cls, bits) -> "BitKey":
+        """Method to create a key from a sequence of bits.
+
+        Args:
+            bits (array_like): 0/1 values, `bits[i]` is bit `i` of the key.
+        """
+
+        bits = numpy.asarray(bits, dtype=numpy.uint8)
+        return cls(numpy.packbits(bits, bitorder="little"), len(bits))
+
+    @classmethod
+    def from_int(cls, value: int, length: int) -> "BitKey":
+        """Method to create a key from an integer.
+
+        Args:
+            value (int): integer value of the key (must be smaller than `2 ** length`).
+            length (int): number of bits in the key.
+        """
+
+        data = value.to_bytes((length + 7) // 8, "little")
+        return cls(numpy.frombuffer(data, dtype=numpy.uint8).copy(), length)
+
+    @classmethod
+    def from_bytes(cls, data: bytes, length: int) -> "BitKey":
+        """Method to create a key from random bytes.
+
+        Args:
+            data (bytes): at least `ceil(length / 8)` bytes; extra bits are discarded.
+            length (int): number of bits in the key.
+        """
+
+        nbytes = (length + 7) // 8
+        packed = numpy.frombuffer(data, dtype=numpy.uint8, count=nbytes).copy()
+        if length % 8:
+            packed[-1] &= (1 << (length % 8)) - 1
+        return cls(packed, length)
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __int__(self) -> int:
+        return int.from_bytes(self.data.tobytes(), "little")
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, BitKey):
+            return NotImplemented
+        return self.length == other.length and numpy.array_equal(self.data, other.data)
+
+    # keys are mutable (see `flip`)
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return "BitKey({}, {})".format(hex(int(self)), self.length)
+
+    def __getitem__(self, index) -> Union[int, numpy.ndarray, "BitKey"]:
+        """Method to read bits of the key.
+
+        Args:
+            index (Union[int, slice, array_like]): a bit position, a slice of positions or an array of positions.
+
+        Returns:
+            Union[int, numpy.ndarray, BitKey]: the bit at a single position, a new key for a slice, or an array of bits (dtype uint8) for an array of positions.
+        """
+
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.length)
+            if step == 1 and start % 8 == 0:
+                length = max(stop - start, 0)
+                return BitKey.from_bytes(self.data[start // 8:].tobytes(), length)
+            return BitKey.from_bits(self.to_bits()[index])
+
+        positions = numpy.asarray(index, dtype=numpy.intp)
+        bits = (self.data[positions >> 3] >> (positions & 7).astype(numpy.uint8)) & 1
+        if positions.ndim == 0:
+            return int(bits)
+        return bits
+
+    def __xor__(self, other: "BitKey") -> "BitKey":
+        if self.length != other.length:
+            raise ValueError("cannot xor keys of length {} and {}".format(self.length, other.length))
+        return BitKey(self.data ^ other.data, self.length)
+
+    def to_bits(self) -> numpy.ndarray:
+        """Method to unpack the key.
+
+        Returns:
+            numpy.ndarray: 0/1 values of the key bits (dtype uint8).
+        """
+
+        return numpy.unpackbits(self.data, count=self.length, bitorder="little")
+
+    def to_bytes(self) -> bytes:
+        """Method to get the packed key bytes, least significant bit first."""
+
+        return self.data.tobytes()
+
+    def copy(self) -> "BitKey":
+        return BitKey(self.data.copy(), self.length)
+
+    def flip(self, position: int) -> None:
+        """Method to flip one bit of the key in place.
+
+        Args:
+            position (int): position of bit to flip.
+        """
+
+        self.data[position >> 3] ^= 1 << (position & 7)
+
+    def popcount(self) -> int:
+        """Method to count the bits set in the key.
+
+        Returns:
+            int: number of bits with value 1.
+        """
+
+        return int(POPCOUNT_TABLE[self.data].sum())
+
+    def parity(self, positions=None) -> int:
+        """Method to compute the parity of (a subset of) the key bits.
+
+        Args:
+            positions (array_like): positions of bits to include (default all bits).
+
+        Returns:
+            int: xor of the selected bits.
+        """
+
+        if positions is None:
+            return self.popcount() & 1
+        return int(numpy.bitwise_xor.reduce(self[numpy.asarray(positions, dtype=numpy.intp)]))
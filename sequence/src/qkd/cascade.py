@@ -13,12 +13,63 @@ from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from ..topology.node import QKDNode
 
-from numpy import random
+from numpy import arange, bitwise_xor, empty, flatnonzero, minimum, random, uint8, where, zeros
 
+from .bitkey import BitKey
 from ..message import Message
 from ..protocol import StackProtocol
 from ..utils import log
 
+
+@lru_cache(maxsize=128)
+def get_block_indices(frame_len: int, k1: int, w: int):
+    """Function to compute the blocks of each pass of cascade.
+
+    Blocks of the first pass hold consecutive bits, blocks of the following passes hold bits shuffled by a permutation seeded by the pass number.
+    Results only depend on the parameters, they are cached and shared (read-only) by all protocol instances.
+
+    Args:
+        frame_len (int): length of frames.
+        k1 (int): block size of the first pass.
+        w (int): maximum number of passes.
+
+    Returns:
+        Tuple[List[numpy.ndarray], List[List[numpy.ndarray]], List[numpy.ndarray]]:
+            block id of each bit position for each pass (`index_to_block_id`),
+            bit positions of each block for each pass (`block_id_to_index`),
+            and position of each bit in the blocks of each pass (`bit_orders`).
+            All lists are indexed by pass id, starting from 1.
+    """
+
+    index_to_block_id = [None]
+    block_id_to_index = [None]
+    bit_orders = [None]
+    for pass_id in range(1, w + 1):
+        block_size = k1 * (2 ** (pass_id - 1))
+
+        if pass_id == 1:
+            bit_order = arange(frame_len)
+        else:
+            # if block_size/2 has been greater than key length, more pass
+            # will not fix error bit
+            if block_size / 2 >= frame_len:
+                break
+            bit_order = random.RandomState(pass_id).permutation(frame_len)
+
+        # bit i has position bit_order[i] in the blocks
+        block_ids = bit_order // block_size
+        indices = empty(frame_len, dtype=int)
+        indices[bit_order] = arange(frame_len)
+        for table in (bit_order, block_ids, indices):
+            table.flags.writeable = False
+
+        index_to_block_id.append(block_ids)
+        block_id_to_index.append([indices[start:start + block_size] for start in range(0, frame_len, block_size)])
+        bit_orders.append(bit_order)
+
+    return index_to_block_id, block_id_to_index, bit_orders
+
+
 def pair_cascade_protocols(sender: "Cascade", receiver: "Cascade") -> None:
     """Method to pair cascade protocol instance.
 
@@ -41,6 +92,8 @@ class CascadeMsgType(Enum):
     CHECKSUMS = auto()
     SEND_FOR_BINARY = auto()
     RECEIVE_FOR_BINARY = auto()
+    SEND_FOR_BATCH_BINARY = auto()
+    RECEIVE_FOR_BATCH_BINARY = auto()
     GENERATE_KEY = auto()
     KEY_IS_VALID = auto()
 
@@ -54,8 +107,9 @@ class CascadeMessage(Message):
     Attributes:
         msg_type (CascadeMsgType): defines the message type.
         receiver (str): name of destination protocol instance.
-        key (int): initial key sent to establish parameters (if `msg_type == KEY`).
+        key (BitKey): initial key sent to establish parameters (if `msg_type == KEY`).
         k (int): cascade parameter (if `msg_type == PARAMS`).
+        error_rate (float): estimated error rate (if `msg_type == PARAMS`).
         keylen (int): length of keys to request from BB84 (if `msg_type == PARAMS or GENERATE_KEY`).
         frame_num (int): number of keys to request (if `msg_type == PARAMS or GENERATE_KEY`).
         run_time (int): runtime for BB84 (if `msg_type == PARAMS or GENERATE_KEY`).
@@ -66,6 +120,10 @@ class CascadeMessage(Message):
         start (int): starting position in key (if `msg_type == SEND_FOR_BINARY or RECEIVE_FOR_BINARY`).
         end (int): ending position in key (if `msg_type == SEND_FOR_BINARY or RECEIVE_FOR_BINARY`).
         checksum (int): checksum result (if `msg_type == RECEIVE_FOR_BINARY`).
+        block_ids (numpy.ndarray): block numbers (if `msg_type == SEND_FOR_BATCH_BINARY or RECEIVE_FOR_BATCH_BINARY`).
+        starts (numpy.ndarray): starting positions in blocks (if `msg_type == SEND_FOR_BATCH_BINARY or RECEIVE_FOR_BATCH_BINARY`).
+        ends (numpy.ndarray): ending positions in blocks (if `msg_type == SEND_FOR_BATCH_BINARY or RECEIVE_FOR_BATCH_BINARY`).
+        checksums (numpy.ndarray): checksum results (if `msg_type == RECEIVE_FOR_BATCH_BINARY`).
     """
 
     def __init__(self, msg_type: Enum, receiver: str, **kwargs):
@@ -75,6 +133,7 @@ class CascadeMessage(Message):
             self.key = kwargs["key"]
         elif msg_type is CascadeMsgType.PARAMS:
             self.k = kwargs["k"]
+            self.error_rate = kwargs["error_rate"]
             self.keylen = kwargs["keylen"]
             self.frame_num = kwargs["frame_num"]
             self.run_time = kwargs["run_time"]
@@ -94,6 +153,19 @@ class CascadeMessage(Message):
             self.start = kwargs["start"]
             self.end = kwargs["end"]
             self.checksum = kwargs["checksum"]
+        elif msg_type is CascadeMsgType.SEND_FOR_BATCH_BINARY:
+            self.key_id = kwargs["key_id"]
+            self.pass_id = kwargs["pass_id"]
+            self.block_ids = kwargs["block_ids"]
+            self.starts = kwargs["starts"]
+            self.ends = kwargs["ends"]
+        elif msg_type is CascadeMsgType.RECEIVE_FOR_BATCH_BINARY:
+            self.key_id = kwargs["key_id"]
+            self.pass_id = kwargs["pass_id"]
+            self.block_ids = kwargs["block_ids"]
+            self.starts = kwargs["starts"]
+            self.ends = kwargs["ends"]
+            self.checksums = kwargs["checksums"]
         elif msg_type is CascadeMsgType.GENERATE_KEY:
             self.keylen = kwargs["keylen"]
             self.frame_num = kwargs["frame_num"]
@@ -126,27 +198,32 @@ class Cascade(StackProtocol):
         frame_len (int): length of frame to use to generate keys.
         frame_num (int): frame number.
         run_time (int): time to run protocol.
-        bits (List[int]): bits to operate on (received from BB84).
+        bits (List[BitKey]): bits to operate on (received from BB84).
         t1 (int): cascade parameter.
         t2 (int): cascade parameter.
         k1 (int): cascade parameter.
-        checksum_tables (List[List[int]]): lists of generated checksums.
+        error_rate (float): error rate estimated on the first key.
+        checksum_tables (List[List[numpy.ndarray]]): checksums of the blocks of each pass, for each key.
+        prefix_parities (List[List[numpy.ndarray]]): prefix xor of the bits of each block of each pass (one row per block), for each key being corrected.
         another_checksums (List[List[int]]): checksums of paired protocol.
-        index_to_block_id_lists (List): store block ids.
-        block_id_to_index_lists (List): store index ids.
+        index_to_block_id_lists (List): store block ids (see `get_block_indices`).
+        block_id_to_index_lists (List): store index ids (see `get_block_indices`).
         time_cost (int): time penalty for key generation.
         setup_time (int): time of cascade protocol setup.
         start_time (int): time to start generating corrected keys.
         end_time (int): time to stop generating keys.
-        valid_keys (List[int]): list of keys generated.
+        valid_keys (List[BitKey]): list of keys generated.
         throughput (float): protocol throughput in bits/s.
         error_bit_rate (float): rate of errors in finished keys.
         latency (int): average latency of generated keys.
-        disclosed_bits_counter (int): counts revealed bits.
+        disclosed_bits_counter (int): counts revealed bits: the error rate estimation sample and every parity sent by the sender.
+        estimation_bits (int): bits of the error rate estimation sample revealed (counted in `disclosed_bits_counter`).
         privacy_throughput (int): throughput of not revealed bits.
+        batch_binary_search (bool): if the receiver searches all mismatched blocks of a pass at once (see `batch_binary_search`).
+        binary_searches (Dict[int, Tuple]): pass id and searched ranges of keys with a batched search in progress.
     """
 
-    def __init__(self, own: "QKDNode", name: str, w=4, role=-1, secure_params=100):
+    def __init__(self, own: "QKDNode", name: str, w=4, role=-1, secure_params=100, batch_binary_search=False):
         """Constructor for cascade class.
 
         Args:
@@ -157,6 +234,7 @@ class Cascade(StackProtocol):
             w (int): parameter for cascade protocol (default 4).
             role (int): 0/1 role for protocol, differentiates Alice/Bob instances (default -1).
             secure_params (int): security parameter (default 100).
+            batch_binary_search (bool): if the receiver searches all mismatched blocks of a pass at once (default False).
         """
 
         super().__init__(own, name)
@@ -176,7 +254,9 @@ class Cascade(StackProtocol):
         self.t1 = []
         self.t2 = []
         self.k1 = 0
+        self.error_rate = None
         self.checksum_tables = [[]]
+        self.prefix_parities = [[]]
         self.another_checksums = [[]]
         self.index_to_block_id_lists = [[]]
         self.block_id_to_index_lists = [[]]
@@ -191,21 +271,48 @@ class Cascade(StackProtocol):
         self.error_bit_rate = None
         self.latency = None  # the average latency
         self.disclosed_bits_counter = 0
+        self.estimation_bits = 0
         self.privacy_throughput = None
 
+        self.batch_binary_search = batch_binary_search
+        self.binary_searches = {}
+
     def push(self, keylen: int, frame_num=math.inf, run_time=math.inf) -> None:
         """Method to receive key generation events.
 
-        Defers to `generate_key` method.
+        The first request starts key generation with the `generate_key` method.
+        Later requests add their keys to the keys left to generate on both ends and request their frames from BB84.
+        Requests received while the error rate is estimated are generated along with the first one.
+
+        Args:
+            keylen (int): length of key to generate (only used by the first request).
+            frame_num (int): number of keys to generate (default inf).
+            run_time (int): max simulation time allowed for key generation (default inf).
         """
 
-        self.generate_key(keylen, frame_num, run_time)
+        if self.role == 1:
+            raise Exception("Cascade.push() called on receiver '{}'".format(self.name))
+
+        if self.frame_num is None:
+            self.generate_key(keylen, frame_num, run_time)
+
+        elif self.start_time is None:
+            self.frame_num += frame_num
+
+        else:
+            self.frame_num += frame_num
+            self.another.frame_num += frame_num
+            self.run_time = run_time
+            self.start_time = self.own.timeline.now()
+            self.end_time = self.start_time + self.run_time
+            if frame_num > 0:
+                self._push(length=self.frame_len, key_num=frame_num, run_time=self.run_time)
 
-    def pop(self, info: int) -> None:
+    def pop(self, info: BitKey) -> None:
         """Function called by BB84 when it creates a key.
 
         Args:
-            info (int): key received.
+            info (BitKey): key received.
         """
 
         log.logger.debug(self.name + ' state={} get_key_from_BB84, key={}'.format(self.state, info))
@@ -221,6 +328,7 @@ class Cascade(StackProtocol):
             self.send_by_cc(message)
 
         elif self.state == 1 and self.role == 0:
+            self.disclose(sum(len(checksums) for checksums in self.checksum_tables[-1][1:]))
             message = CascadeMessage(CascadeMsgType.CHECKSUMS, self.another.name,
                                      key_id=len(self.checksum_tables)-1, checksums=self.checksum_tables[-1])
             self.send_by_cc(message)
@@ -258,26 +366,18 @@ class Cascade(StackProtocol):
 
                 return lower - 1
 
-            @lru_cache(maxsize=128)
-            def get_diff_bit_num(key1, key2):
-                val = key1 ^ key2
-                counter = 0
-                i = 0
-                while val >> i:
-                    if (val >> i) & 1:
-                        counter += 1
-                    i += 1
-                return counter
-
-            p = get_diff_bit_num(key, self.bits[0]) / 10000
+            p = (key ^ self.bits[0]).popcount() / 10000
             # avoid p==0, which will cause k1 to an infinite large number
             if p == 0:
                 p = 0.0001
             self.k1 = get_k1(p, 0, 10000)
+            self.error_rate = p
+            self.estimation_bits = self.another.estimation_bits = len(key)
+            self.disclose(len(key))
             self.state = 1
 
             message = CascadeMessage(CascadeMsgType.PARAMS, self.another.name,
-                                     k=self.k1, keylen=self.keylen, frame_num=self.frame_num,
+                                     k=self.k1, error_rate=self.error_rate, keylen=self.keylen, frame_num=self.frame_num,
                                      run_time=self.run_time)
             self.send_by_cc(message)
 
@@ -286,6 +386,7 @@ class Cascade(StackProtocol):
             Receiver receive k, keylen from sender
             """ 
             self.k1 = msg.k
+            self.error_rate = msg.error_rate
             self.keylen = msg.keylen
             self.frame_num = msg.frame_num
             self.run_time = msg.run_time
@@ -325,10 +426,8 @@ class Cascade(StackProtocol):
 
             log.logger.debug(self.name + ' state={} send_for_binary, params={}'.format(self.state, [pass_id, block_id, start, end]))
 
-            checksum = 0
-            block_id_to_index = self.block_id_to_index_lists[key_id]
-            for pos in block_id_to_index[pass_id][block_id][start:end]:
-                checksum ^= ((self.bits[key_id] >> pos) & 1)
+            checksum = self.block_parity(key_id, pass_id, block_id, start, end)
+            self.disclose(1)
 
             message = CascadeMessage(CascadeMsgType.RECEIVE_FOR_BINARY, self.another.name,
                                      key_id=key_id, pass_id=pass_id, block_id=block_id,
@@ -349,31 +448,16 @@ class Cascade(StackProtocol):
 
             log.logger.debug(self.name + ' state={} receive_for_binary, params={}'.format(self.state, [key_id, pass_id, block_id, start, end, checksum]))
 
-            def flip_bit_at_pos(val, pos):
-                """
-                flip one bit of integer val at pos (right bit with lower position)
-                """
-                self.disclosed_bits_counter += 1
-                self.another.disclosed_bits_counter += 1
-                return (((val >> pos) ^ 1) << pos) + (((1 << pos) - 1) & val)
+            # the key was corrected by a previous reply
+            if self.prefix_parities[key_id] is None:
+                return
 
-            _checksum = 0
             block_id_to_index = self.block_id_to_index_lists[key_id]
-            index_to_block_id = self.index_to_block_id_lists[key_id]
-            checksum_table = self.checksum_tables[key_id]
-            key = self.bits[key_id]
-            for pos in block_id_to_index[pass_id][block_id][start:end]:
-                _checksum ^= ((key >> pos) & 1)
+            _checksum = self.block_parity(key_id, pass_id, block_id, start, end)
 
             if checksum != _checksum:
                 if end - start == 1:
-                    pos = block_id_to_index[pass_id][block_id][start]
-                    self.bits[key_id] = flip_bit_at_pos(key, pos)
-                    log.logger.debug(self.name + ' state={} ::: flip at {}'.format(self.state, pos))
-                    # update checksum_table
-                    for _pass in range(1, len(checksum_table)):
-                        _block = index_to_block_id[_pass][pos]
-                        checksum_table[_pass][_block] ^= 1
+                    self.flip_bit(key_id, int(block_id_to_index[pass_id][block_id][start]))
 
                     if not self.check_checksum(key_id):
                         return
@@ -381,6 +465,42 @@ class Cascade(StackProtocol):
                 else:
                     self.interactive_binary_search(key_id, pass_id, block_id, start, end)
 
+        elif msg.msg_type is CascadeMsgType.SEND_FOR_BATCH_BINARY:
+            """
+            Sender sends checksums of all ranges block[start:end] in pass_id pass
+            """
+            key_id = msg.key_id
+            pass_id = msg.pass_id
+
+            log.logger.debug(self.name + ' state={} send_for_batch_binary, params={}'.format(self.state, [key_id, pass_id, len(msg.block_ids)]))
+
+            checksums = self.block_parities(key_id, pass_id, msg.block_ids, msg.starts, msg.ends)
+            self.disclose(len(checksums))
+
+            message = CascadeMessage(CascadeMsgType.RECEIVE_FOR_BATCH_BINARY, self.another.name,
+                                     key_id=key_id, pass_id=pass_id, block_ids=msg.block_ids,
+                                     starts=msg.starts, ends=msg.ends, checksums=checksums)
+            self.send_by_cc(message)
+
+        elif msg.msg_type is CascadeMsgType.RECEIVE_FOR_BATCH_BINARY:
+            """
+            Receiver receive checksums of the first half of the searched ranges
+            Errors are in the first half of ranges with different checksums, in the second half of the others
+            """
+            key_id = msg.key_id
+            pass_id = msg.pass_id
+
+            log.logger.debug(self.name + ' state={} receive_for_batch_binary, params={}'.format(self.state, [key_id, pass_id, len(msg.block_ids)]))
+
+            if self.prefix_parities[key_id] is None:
+                return
+
+            _, block_ids, starts, ends = self.binary_searches.pop(key_id)
+            middles = msg.ends
+            first_half = self.block_parities(key_id, pass_id, block_ids, starts, middles) != msg.checksums
+            self.search_blocks(key_id, pass_id, block_ids,
+                               where(first_half, starts, middles), where(first_half, middles, ends))
+
         elif msg.msg_type is CascadeMsgType.GENERATE_KEY:
             keylen = msg.keylen
             frame_num = msg.frame_num
@@ -389,9 +509,10 @@ class Cascade(StackProtocol):
 
         elif msg.msg_type is CascadeMsgType.KEY_IS_VALID:
             key_id = msg.key_id
+            self.prefix_parities[key_id] = None
 
             for i in range(int(self.frame_len / self.keylen)):
-                self.valid_keys.append((self.bits[key_id] >> (i*self.keylen)) & ((1 << self.keylen)-1))
+                self.valid_keys.append(self.bits[key_id][i*self.keylen:(i+1)*self.keylen])
                 if self.frame_num > 0:
                     log.logger.info(self.name + ' state={} got valid key'.format(self.state))
                     self._pop(key=self.valid_keys[-1])
@@ -430,8 +551,11 @@ class Cascade(StackProtocol):
         else:
             self.start_time = self.own.timeline.now()
             self.end_time = self.start_time + self.run_time
+            # keys requested after the PARAMS message was sent
+            self.another.frame_num = self.frame_num
             log.logger.debug(self.name + ' generate_key with state ' + str(self.state))
-            self._push(length=self.frame_len, key_num=self.frame_num, run_time=self.run_time)
+            if self.frame_num > 0:
+                self._push(length=self.frame_len, key_num=self.frame_num, run_time=self.run_time)
 
     def create_checksum_table(self) -> None:
         """Method to create checksum tables.
@@ -442,68 +566,88 @@ class Cascade(StackProtocol):
             Will modify `index_to_block_id_lists`, `block_id_to_index_lists`,  and `checksum_tables` attributes.
         """
 
-        # create index_to_block_id
         log.logger.debug(self.name + ' state={} create_checksum_table'.format(self.state))
-        index_to_block_id = [[]]
-        for pass_id in range(1, self.w + 1):
-            index_to_block_relation = []
-            block_size = self.k1 * (2**(pass_id - 1))
-
-            if pass_id == 1:
-                for i in range(self.frame_len):
-                    index_to_block_relation.append(int(i / block_size))
-            else:
-                # if block_size/2 has been greater than key length, more pass
-                # will not fix error bit
-                if block_size / 2 >= self.frame_len:
-                    break
-
-                random.seed(pass_id)
-                bit_order = list(range(self.frame_len))
-                random.shuffle(bit_order)
-                for i in range(self.frame_len):
-                    index_to_block_relation.append(int(bit_order[i] / block_size))
-
-            index_to_block_id.append(index_to_block_relation)
+        index_to_block_id, block_id_to_index, bit_orders = get_block_indices(self.frame_len, self.k1, self.w)
         self.index_to_block_id_lists.append(index_to_block_id)
-
-        # create block_id_to_index
-        block_id_to_index = [[]]
-        for pass_id in range(1, self.w + 1):
-            block_to_index_relation = []
-            block_size = self.k1 * (2**(pass_id - 1))
-            block_num = math.ceil(self.frame_len / block_size)
-            for _ in range(block_num):
-                block_to_index_relation.append([None] * block_size)
-
-            if pass_id == 1:
-                for i in range(self.frame_len):
-                    block_to_index_relation[int(i / block_size)][i % block_size] = i
-            else:
-                random.seed(pass_id)
-                bit_order = list(range(self.frame_len))
-                random.shuffle(bit_order)
-                for i in range(self.frame_len):
-                    bit_pos = bit_order[i]
-                    block_to_index_relation[int(bit_pos / block_size)][bit_pos % block_size] = i
-            # pop extra element in the last block
-            while block_to_index_relation[-1][-1] is None:
-                block_to_index_relation[-1].pop()
-
-            block_id_to_index.append(block_to_index_relation)
         self.block_id_to_index_lists.append(block_id_to_index)
 
-        # create checksum_table
+        # create checksum_table from the key bits in the block order of each pass
+        bits = self.bits[-1].to_bits()
         checksum_table = [[]]
+        prefix_parities = [None]
         for pass_id in range(1, len(index_to_block_id)):
             block_size = self.k1 * (2**(pass_id - 1))
-            block_num = math.ceil(self.frame_len / block_size)
-            checksum_table.append([0] * block_num)
-            for i in range(self.frame_len):
-                block_id = index_to_block_id[pass_id][i]
-                checksum_table[pass_id][block_id] ^= ((self.bits[-1] >> i) & 1)
+            pass_bits = empty(self.frame_len, dtype=uint8)
+            pass_bits[bit_orders[pass_id]] = bits
+            checksum_table.append(bitwise_xor.reduceat(pass_bits, arange(0, self.frame_len, block_size)))
+            # prefixes restart at each block, so that a flip only updates its block
+            num_blocks = len(checksum_table[pass_id])
+            blocks = zeros(num_blocks * block_size, dtype=uint8)
+            blocks[:self.frame_len] = pass_bits
+            prefix = zeros((num_blocks, block_size + 1), dtype=uint8)
+            bitwise_xor.accumulate(blocks.reshape(num_blocks, block_size), axis=1, out=prefix[:, 1:])
+            prefix_parities.append(prefix)
         self.checksum_tables.append(checksum_table)
-   
+        self.prefix_parities.append(prefix_parities)
+
+    def block_parity(self, key_id: int, pass_id: int, block_id: int, start: int, end: int) -> int:
+        """Method to compute the parity of part of a block.
+
+        Args:
+            key_id (int): id of key.
+            pass_id (int): id of pass of the block.
+            block_id (int): id of block.
+            start (int): index of first bit in the block.
+            end (int): index after the last bit in the block.
+
+        Returns:
+            int: parity of bits `block_id_to_index[pass_id][block_id][start:end]` of the key.
+        """
+
+        prefix = self.prefix_parities[key_id][pass_id][block_id]
+        return int(prefix[end] ^ prefix[start])
+
+    def block_parities(self, key_id: int, pass_id: int, block_ids, starts, ends):
+        """Method to compute the parities of parts of several blocks (see `block_parity`).
+
+        Args:
+            key_id (int): id of key.
+            pass_id (int): id of pass of the blocks.
+            block_ids (numpy.ndarray): ids of blocks.
+            starts (numpy.ndarray): index of first bit in each block.
+            ends (numpy.ndarray): index after the last bit in each block.
+
+        Returns:
+            numpy.ndarray: parity of each part of block.
+        """
+
+        prefix = self.prefix_parities[key_id][pass_id]
+        return prefix[block_ids, ends] ^ prefix[block_ids, starts]
+
+    def flip_bit(self, key_id: int, pos: int) -> None:
+        """Method to correct a bit of a key.
+
+        Args:
+            key_id (int): id of key.
+            pos (int): position of bit to flip.
+
+        Side Effects:
+            Will modify the key, its prefix parities and its checksum table.
+        """
+
+        self.bits[key_id].flip(pos)
+        log.logger.debug(self.name + ' state={} ::: flip at {}'.format(self.state, pos))
+
+        prefix_parities = self.prefix_parities[key_id]
+        checksum_table = self.checksum_tables[key_id]
+        index_to_block_id = self.index_to_block_id_lists[key_id]
+        _, _, bit_orders = get_block_indices(self.frame_len, self.k1, self.w)
+        for pass_id in range(1, len(prefix_parities)):
+            block_id = index_to_block_id[pass_id][pos]
+            start = bit_orders[pass_id][pos] - block_id * self.k1 * (2**(pass_id - 1))
+            prefix_parities[pass_id][block_id, start + 1:] ^= 1
+            checksum_table[pass_id][block_id] ^= 1
+
     def check_checksum(self, key_id: int) -> bool:
         """Method to check a checksum.
 
@@ -520,15 +664,24 @@ class Cascade(StackProtocol):
         another_checksum = self.another_checksums[cur_key]
         block_id_to_index = self.block_id_to_index_lists[cur_key]
         for _pass in range(1, len(another_checksum)):
-            for _block in range(len(another_checksum[_pass])):
-                if self.checksum_tables[cur_key][_pass][_block] != self.another_checksums[cur_key][_pass][_block]:
-                    log.logger.debug(self.name + ' state={} two checksums are different'.format(self.state, [cur_key, _pass, _block]))
-                    block_size = len(block_id_to_index[_pass][_block])
-                    self.interactive_binary_search(cur_key, _pass, _block, 0, block_size)
-                    return False
+            different = flatnonzero(self.checksum_tables[cur_key][_pass] != another_checksum[_pass])
+            if len(different) > 0 and self.batch_binary_search:
+                log.logger.debug(self.name + ' state={} {} checksums are different'.format(self.state, len(different)))
+                block_size = self.k1 * (2**(_pass - 1))
+                ends = minimum(block_size, self.frame_len - different * block_size)
+                self.search_blocks(cur_key, _pass, different, zeros(len(different), dtype=int), ends)
+                return False
+            elif len(different) > 0:
+                _block = int(different[0])
+                log.logger.debug(self.name + ' state={} two checksums are different'.format(self.state, [cur_key, _pass, _block]))
+                block_size = len(block_id_to_index[_pass][_block])
+                self.interactive_binary_search(cur_key, _pass, _block, 0, block_size)
+                return False
+
+        self.prefix_parities[key_id] = None
 
         for i in range(int(self.frame_len / self.keylen)):
-            self.valid_keys.append((self.bits[key_id] >> (i*self.keylen)) & ((1 << self.keylen)-1))
+            self.valid_keys.append(self.bits[key_id][i*self.keylen:(i+1)*self.keylen])
             if self.frame_num > 0:
                 log.logger.info(self.name + ' state={} got_valid_key'.format(self.state))
                 self._pop(key=self.valid_keys[-1])
@@ -580,6 +733,54 @@ class Cascade(StackProtocol):
                                  start=int((end+start) / 2), end=end)
         self.send_by_cc(message)
 
+    def search_blocks(self, key_id: int, pass_id: int, block_ids, starts, ends) -> None:
+        """Method to search for errors in several blocks of a pass at once.
+
+        Used instead of `interactive_binary_search` if `batch_binary_search` is set.
+        Ranges of a single bit are corrected, the others are split in two.
+        Checksums of the first halves of all ranges are asked in a single message.
+        Once all ranges are corrected, checksums are checked again (correcting blocks of previous passes).
+
+        Args:
+            key_id (int): id of key to check.
+            pass_id (int): id of pass to check.
+            block_ids (numpy.ndarray): ids of blocks to check, which have different checksums.
+            starts (numpy.ndarray): index to start checking at in each block.
+            ends (numpy.ndarray): index to stop checking at in each block.
+
+        Side Effects:
+            Will send a SEND_FOR_BATCH_BINARY message to other protocol, or check checksums.
+        """
+
+        log.logger.debug(self.name + ' state={} search_blocks, params={}'.format(
+            self.state, [key_id, pass_id, len(block_ids)]))
+
+        block_id_to_index = self.block_id_to_index_lists[key_id]
+        found = ends - starts == 1
+        for block_id, start in zip(block_ids[found], starts[found]):
+            self.flip_bit(key_id, int(block_id_to_index[pass_id][block_id][start]))
+
+        block_ids, starts, ends = block_ids[~found], starts[~found], ends[~found]
+        if len(block_ids) == 0:
+            self.check_checksum(key_id)
+            return
+
+        self.binary_searches[key_id] = (pass_id, block_ids, starts, ends)
+        message = CascadeMessage(CascadeMsgType.SEND_FOR_BATCH_BINARY, self.another.name,
+                                 key_id=key_id, pass_id=pass_id, block_ids=block_ids,
+                                 starts=starts, ends=(starts + ends) // 2)
+        self.send_by_cc(message)
+
+    def disclose(self, bits: int) -> None:
+        """Method to count bits revealed on the classical channel, on both ends.
+
+        Args:
+            bits (int): number of bits revealed.
+        """
+
+        self.disclosed_bits_counter += bits
+        self.another.disclosed_bits_counter += bits
+
     def send_by_cc(self, message: "CascadeMessage") -> None:
         """Method to send classical messages."""
 
@@ -609,16 +810,11 @@ class Cascade(StackProtocol):
 
         if self.own.timeline.now() - self.start_time:
             self.throughput = 1e12 * len(self.valid_keys) * self.keylen / (self.own.timeline.now() - self.start_time)
-            self.privacy_throughput = 1e12 * (len(self.valid_keys) * self.keylen - int(len(self.valid_keys)/40) * self.secure_params - self.disclosed_bits_counter) / (self.own.timeline.now() - self.start_time)
+            self.privacy_throughput = 1e12 * (len(self.valid_keys) * self.keylen - int(len(self.valid_keys)/40) * self.secure_params - self.disclosed_bits_counter + self.estimation_bits) / (self.own.timeline.now() - self.start_time)
 
         counter = 0
         for j in range(min(len(self.valid_keys), len(self.another.valid_keys))):
-            i = 0
-            val = self.valid_keys[j] ^ self.another.valid_keys[j]
-            while val >> i:
-                if (val >> i) & 1 == 1:
-                    counter += 1
-                i += 1
+            counter += (self.valid_keys[j] ^ self.another.valid_keys[j]).popcount()
 
         if len(self.valid_keys) > 1:
             self.error_bit_rate = counter / (self.keylen * (len(self.valid_keys)))
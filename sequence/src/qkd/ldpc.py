@@ -0,0 +1,577 @@
+"""Definition of LDPC error correction protocol implementation.
+
+This module provides a one-way error correction protocol based on low-density parity-check (LDPC) codes, an alternative to cascade.
+The sender discloses the syndrome of each frame and the receiver corrects its frame by belief propagation decoding, without further interaction.
+A short hash of the sender frame then verifies the corrected frame.
+The protocol must be provided with a lower-layer protocol for key generation, such as BB84.
+Also included in this module are the family of codes used by the protocol, a function to pair protocol instances (required before the start of transmission) and the message type used by the protocol.
+"""
+
+import math
+from enum import Enum, auto
+from functools import lru_cache
+from typing import TYPE_CHECKING, Tuple
+
+if TYPE_CHECKING:
+    from ..topology.node import QKDNode
+
+from numpy import arange, arctanh, array_equal, bincount, clip, exp2, log2, ndarray, random, repeat, tanh, uint8, unique
+
+from .bitkey import BitKey
+from ..message import Message
+from ..protocol import StackProtocol
+from ..utils import log
+
+# rates of the available codes
+CODE_RATES = (0.4, 0.45, 0.5, 0.55, 0.6, 0.65, 0.7, 0.75, 0.8, 0.85, 0.9)
+# number of checks on each bit
+BIT_DEGREE = 3
+
+
+def binary_entropy(p: float) -> float:
+    """Function to compute the binary entropy of a probability."""
+
+    if p <= 0 or p >= 1:
+        return 0
+    return -p * math.log2(p) - (1 - p) * math.log2(1 - p)
+
+
+def select_rate(error_rate: float, efficiency: float) -> float:
+    """Function to select the code to correct frames.
+
+    Args:
+        error_rate (float): estimated error rate of frames.
+        efficiency (float): ratio of disclosed bits to the Shannon limit `binary_entropy(error_rate)`.
+
+    Returns:
+        float: highest rate in `CODE_RATES` disclosing at least `efficiency * binary_entropy(error_rate)` bits per bit.
+    """
+
+    for rate in reversed(CODE_RATES):
+        if 1 - rate >= efficiency * binary_entropy(error_rate):
+            return rate
+    return CODE_RATES[0]
+
+
+@lru_cache(maxsize=32)
+def get_code(frame_len: int, rate: float) -> Tuple[ndarray, ndarray, int]:
+    """Function to build the parity check matrix of a code.
+
+    Codes are random regular codes with `BIT_DEGREE` checks on each bit, built with a fixed seed so that all protocol instances use the same matrix.
+    Results are cached and shared (read-only) by all protocol instances.
+
+    Args:
+        frame_len (int): length of frames (number of bits of the code).
+        rate (float): code rate (1 - number of checks / frame length).
+
+    Returns:
+        Tuple[ndarray, ndarray, int]: check and bit of each non-zero entry of the matrix (sorted by check), and number of checks.
+    """
+
+    num_checks = int(round(frame_len * (1 - rate)))
+    bit_ids = random.RandomState(frame_len).permutation(repeat(arange(frame_len), BIT_DEGREE))
+    check_ids = arange(len(bit_ids)) % num_checks
+
+    # a bit appearing twice in a check does not contribute to it
+    entries, counts = unique(check_ids * frame_len + bit_ids, return_counts=True)
+    check_ids, bit_ids = divmod(entries[counts % 2 == 1], frame_len)
+    check_ids.flags.writeable = False
+    bit_ids.flags.writeable = False
+    return check_ids, bit_ids, num_checks
+
+
+def get_syndrome(bits: ndarray, code: Tuple[ndarray, ndarray, int]) -> ndarray:
+    """Function to compute the syndrome of a frame.
+
+    Args:
+        bits (ndarray): bits of the frame.
+        code (Tuple[ndarray, ndarray, int]): code (see `get_code`).
+
+    Returns:
+        ndarray: parity of each check (dtype uint8).
+    """
+
+    check_ids, bit_ids, num_checks = code
+    return (bincount(check_ids, weights=bits[bit_ids], minlength=num_checks).astype(int) & 1).astype(uint8)
+
+
+def verification_hash(bits: ndarray, seed: int, length: int) -> ndarray:
+    """Function to compute the hash verifying a corrected frame.
+
+    Each bit of the hash is the parity of a random subset of the frame bits, so that two different frames give the same hash with probability `2 ** -length`.
+    The subsets are expanded from the seed on both ends, only the seed is sent with the hash.
+
+    Args:
+        bits (ndarray): bits of the frame.
+        seed (int): seed of the random subsets.
+        length (int): number of hash bits.
+
+    Returns:
+        ndarray: hash bits (dtype uint8).
+    """
+
+    subsets = random.default_rng(seed).integers(2, size=(length, len(bits)), dtype=uint8)
+    return ((subsets & bits).sum(axis=1) & 1).astype(uint8)
+
+
+def decode(bits: ndarray, syndrome: ndarray, error_rate: float, code: Tuple[ndarray, ndarray, int],
+           max_iterations=50) -> Tuple[ndarray, bool]:
+    """Function to correct a frame from the syndrome of the other frame.
+
+    Uses sum-product belief propagation, computed for all entries of the parity check matrix at once.
+
+    Args:
+        bits (ndarray): bits of the frame to correct.
+        syndrome (ndarray): syndrome of the other frame.
+        error_rate (float): probability of each bit to differ from the other frame.
+        code (Tuple[ndarray, ndarray, int]): code (see `get_code`).
+        max_iterations (int): maximum number of decoding iterations (default 50).
+
+    Returns:
+        Tuple[ndarray, bool]: corrected bits, and if the corrected frame has the given syndrome.
+    """
+
+    check_ids, bit_ids, num_checks = code
+    # log likelihood ratio of a bit being 0
+    prior = (1 - 2 * bits.astype(float)) * math.log((1 - error_rate) / error_rate)
+    check_signs = 1 - 2 * syndrome.astype(float)
+
+    to_check = prior[bit_ids]
+    decoded = bits
+    for _ in range(max_iterations):
+        # the message to each bit is the product over the other bits of the check
+        expectations = tanh(to_check / 2)
+        magnitudes = log2(clip(abs(expectations), 1e-15, None))
+        negative = expectations < 0
+        check_magnitudes = bincount(check_ids, weights=magnitudes, minlength=num_checks)
+        check_negative = bincount(check_ids, weights=negative, minlength=num_checks).astype(int)
+        signs = (1 - 2 * ((check_negative[check_ids] - negative) & 1)) * check_signs[check_ids]
+        products = signs * exp2(check_magnitudes[check_ids] - magnitudes)
+        to_bit = 2 * arctanh(clip(products, -1 + 1e-12, 1 - 1e-12))
+
+        posterior = prior + bincount(bit_ids, weights=to_bit, minlength=len(bits))
+        decoded = (posterior < 0).astype(uint8)
+        if array_equal(get_syndrome(decoded, code), syndrome):
+            return decoded, True
+        to_check = posterior[bit_ids] - to_bit
+
+    return decoded, False
+
+
+def pair_ldpc_protocols(sender: "LDPC", receiver: "LDPC") -> None:
+    """Method to pair LDPC protocol instances.
+
+    Args:
+        sender (LDPC): LDPC protocol on node sending qubits (Alice).
+        receiver (LDPC): LDPC protocol on node receiving qubits (Bob).
+    """
+
+    sender.another = receiver
+    receiver.another = sender
+    sender.role = 0
+    receiver.role = 1
+
+
+class LDPCMsgType(Enum):
+    """Defines possible message types for LDPC."""
+
+    KEY = auto()
+    PARAMS = auto()
+    SYNDROME = auto()
+    GENERATE_KEY = auto()
+    KEY_IS_VALID = auto()
+    KEY_IS_INVALID = auto()
+
+
+class LDPCMessage(Message):
+    """Message used by LDPC protocols.
+
+    This message contains all information passed between LDPC protocol instances.
+    Messages of different types contain different information.
+
+    Attributes:
+        msg_type (LDPCMsgType): defines the message type.
+        receiver (str): name of destination protocol instance.
+        key (BitKey): initial key sent to estimate the error rate (if `msg_type == KEY`).
+        error_rate (float): estimated error rate (if `msg_type == PARAMS`).
+        rate (float): rate of code used to correct frames (if `msg_type == PARAMS`).
+        keylen (int): length of keys to request from BB84 (if `msg_type == PARAMS or GENERATE_KEY`).
+        frame_num (int): number of keys to request (if `msg_type == PARAMS or GENERATE_KEY`).
+        run_time (int): runtime for BB84 (if `msg_type == PARAMS or GENERATE_KEY`).
+        key_id (int): key being processed (if `msg_type == SYNDROME or KEY_IS_VALID or KEY_IS_INVALID`).
+        syndrome (ndarray): syndrome of the sender frame (if `msg_type == SYNDROME`).
+        seed (int): seed of the verification hash (if `msg_type == SYNDROME`).
+        verification (ndarray): verification hash of the sender frame (if `msg_type == SYNDROME`).
+    """
+
+    def __init__(self, msg_type: Enum, receiver: str, **kwargs):
+        super().__init__(msg_type, receiver)
+        self.protocol_type = LDPC
+        if msg_type is LDPCMsgType.KEY:
+            self.key = kwargs["key"]
+        elif msg_type is LDPCMsgType.PARAMS:
+            self.error_rate = kwargs["error_rate"]
+            self.rate = kwargs["rate"]
+            self.keylen = kwargs["keylen"]
+            self.frame_num = kwargs["frame_num"]
+            self.run_time = kwargs["run_time"]
+        elif msg_type is LDPCMsgType.SYNDROME:
+            self.key_id = kwargs["key_id"]
+            self.syndrome = kwargs["syndrome"]
+            self.seed = kwargs["seed"]
+            self.verification = kwargs["verification"]
+        elif msg_type is LDPCMsgType.GENERATE_KEY:
+            self.keylen = kwargs["keylen"]
+            self.frame_num = kwargs["frame_num"]
+            self.run_time = kwargs["run_time"]
+        elif msg_type in (LDPCMsgType.KEY_IS_VALID, LDPCMsgType.KEY_IS_INVALID):
+            self.key_id = kwargs["key_id"]
+        else:
+            raise Exception("Invalid LDPC message type {}".format(msg_type))
+
+
+class LDPC(StackProtocol):
+    """Implementation of one-way error correction with LDPC codes.
+
+    Can replace cascade as the error correction layer of a QKD node (see `QKDNode.set_protocol_layer`).
+    Like cascade, the error rate is first estimated from a key of 10000 bits, which selects the code used for all frames.
+    Then, the sender sends the syndrome of each frame, which the receiver uses to correct its frame.
+    A syndrome match does not prove that the frames are equal, so the sender also sends a verification hash of its frame, checked on the corrected frame.
+    The bits of the syndrome and of the hash are counted as disclosed.
+    The receiver only replies whether its frame was corrected, frames failing to decode or to verify are discarded by both protocols.
+    The protocol exists in 3 states:
+
+    0. initialization step of protocol
+    1. generating block
+    2. end
+
+    Attributes:
+        own (QKDNode): node that protocol instance is attached to.
+        name (str): label for protocol instance.
+        role (int): differentiates "alice" and "bob" protocols.
+        efficiency (float): ratio of disclosed bits to the Shannon limit used to select codes.
+        max_iterations (int): maximum number of decoding iterations.
+        secure_params (int): security parameter.
+        verify_len (int): number of bits of the verification hash.
+        another (LDPC): reference to paired LDPC protocol.
+        state (int): current state of protocol.
+        keylen (int): length of keys to generate.
+        frame_len (int): length of frame to use to generate keys.
+        frame_num (int): number of keys left to generate.
+        run_time (int): time to run protocol.
+        bits (List[BitKey]): bits to operate on (received from BB84).
+        syndromes (Dict[int, Tuple[ndarray, ndarray, ndarray]]): syndromes, hash seeds and verification hashes received for frames not yet corrected.
+        t1 (List[int]): times of reception of each frame.
+        t2 (List[int]): times of correction of each frame (-1 if not corrected).
+        error_rate (float): estimated error rate.
+        rate (float): rate of code used to correct frames.
+        setup_time (int): time of protocol setup.
+        start_time (int): time to start generating corrected keys.
+        end_time (int): time to stop generating keys.
+        time_cost (int): time penalty for key generation.
+        valid_keys (List[BitKey]): list of keys generated.
+        failed_frames (int): number of frames discarded after a decoding or verification failure.
+        throughput (float): protocol throughput in bits/s.
+        error_bit_rate (float): rate of errors in finished keys.
+        latency (int): average latency of generated keys.
+        disclosed_bits_counter (int): counts revealed bits: the error rate estimation sample, syndromes and verification hashes.
+        estimation_bits (int): bits of the error rate estimation sample revealed (counted in `disclosed_bits_counter`).
+        privacy_throughput (int): throughput of not revealed bits.
+    """
+
+    def __init__(self, own: "QKDNode", name: str, role=-1, efficiency=1.5, max_iterations=50, secure_params=100,
+                 verify_len=64):
+        """Constructor for LDPC class.
+
+        Args:
+            own (QKDNode): node protocol instance is attached to.
+            name (str): name of protocol instance.
+
+        Keyword Args:
+            role (int): 0/1 role for protocol, differentiates Alice/Bob instances (default -1).
+            efficiency (float): ratio of disclosed bits to the Shannon limit used to select codes (default 1.5).
+            max_iterations (int): maximum number of decoding iterations (default 50).
+            secure_params (int): security parameter (default 100).
+            verify_len (int): number of bits of the verification hash (default 64).
+        """
+
+        super().__init__(own, name)
+
+        self.role = role  # 0 for sender, 1 for receiver
+        self.efficiency = efficiency
+        self.max_iterations = max_iterations
+        self.secure_params = secure_params
+        self.verify_len = verify_len
+
+        self.another = None
+        self.state = 0
+
+        self.keylen = None
+        self.frame_len = 10240
+        self.frame_num = None
+        self.run_time = None
+        self.bits = []
+        self.syndromes = {}
+        self.t1 = []
+        self.t2 = []
+        self.error_rate = None
+        self.rate = None
+        self.setup_time = None
+        self.start_time = None
+        self.end_time = math.inf
+        self.time_cost = None
+
+        # metrics
+        self.valid_keys = []
+        self.failed_frames = 0
+        self.throughput = None  # bits/sec
+        self.error_bit_rate = None
+        self.latency = None  # the average latency
+        self.disclosed_bits_counter = 0
+        self.estimation_bits = 0
+        self.privacy_throughput = None
+
+    def push(self, keylen: int, frame_num=math.inf, run_time=math.inf) -> None:
+        """Method to receive key generation events.
+
+        The first request starts key generation with the `generate_key` method.
+        Later requests add their keys to the keys left to generate on both ends and request their frames from BB84.
+        Requests received while the error rate is estimated are generated along with the first one.
+
+        Args:
+            keylen (int): length of key to generate (only used by the first request).
+            frame_num (int): number of keys to generate (default inf).
+            run_time (int): max simulation time allowed for key generation (default inf).
+        """
+
+        if self.role == 1:
+            raise Exception("LDPC.push() called on receiver '{}'".format(self.name))
+
+        if self.frame_num is None:
+            self.generate_key(keylen, frame_num, run_time)
+
+        elif self.start_time is None:
+            self.frame_num += frame_num
+
+        else:
+            self.frame_num += frame_num
+            self.another.frame_num += frame_num
+            self.run_time = run_time
+            self.start_time = self.own.timeline.now()
+            self.end_time = self.start_time + self.run_time
+            if frame_num > 0:
+                self._push(length=self.frame_len, key_num=frame_num, run_time=self.run_time)
+
+    def pop(self, info: BitKey) -> None:
+        """Function called by BB84 when it creates a key.
+
+        Args:
+            info (BitKey): key received.
+        """
+
+        log.logger.debug(self.name + ' state={} get_key_from_BB84, key={}'.format(self.state, info))
+        self.bits.append(info)
+        self.t1.append(self.own.timeline.now())
+        self.t2.append(-1)
+        key_id = len(self.bits) - 1
+
+        if self.state == 0 and self.role == 1:
+            message = LDPCMessage(LDPCMsgType.KEY, self.another.name, key=self.bits[0])
+            self.send_by_cc(message)
+
+        elif self.state == 1 and self.role == 0:
+            bits = info.to_bits()
+            syndrome = get_syndrome(bits, get_code(self.frame_len, self.rate))
+            seed = int(self.own.get_generator().integers(2 ** 63))
+            verification = verification_hash(bits, seed, self.verify_len)
+            self.disclosed_bits_counter += len(syndrome) + len(verification)
+            self.another.disclosed_bits_counter += len(syndrome) + len(verification)
+            message = LDPCMessage(LDPCMsgType.SYNDROME, self.another.name, key_id=key_id, syndrome=syndrome,
+                                  seed=seed, verification=verification)
+            self.send_by_cc(message)
+
+        elif self.state == 1 and key_id in self.syndromes:
+            self.correct_frame(key_id)
+
+    def received_message(self, src: str, msg: "Message") -> None:
+        """Method to receive messages from other protocol instance.
+
+        Different messages will cause different actions.
+
+        Args:
+            src (str): name of node that sent the message.
+            msg (Message): message received.
+        """
+
+        if msg.msg_type is LDPCMsgType.KEY:
+            # sender estimates the error rate and selects the code
+            error_rate = (msg.key ^ self.bits[0]).popcount() / len(self.bits[0])
+            # avoid an error rate of 0, which gives infinite likelihood ratios
+            self.error_rate = max(error_rate, 0.0001)
+            self.estimation_bits = self.another.estimation_bits = len(msg.key)
+            self.disclosed_bits_counter += len(msg.key)
+            self.another.disclosed_bits_counter += len(msg.key)
+            self.rate = select_rate(self.error_rate, self.efficiency)
+            self.state = 1
+
+            log.logger.debug(self.name + ' state={} receive_key, error_rate={}, rate={}'.format(
+                self.state, self.error_rate, self.rate))
+
+            message = LDPCMessage(LDPCMsgType.PARAMS, self.another.name,
+                                  error_rate=self.error_rate, rate=self.rate, keylen=self.keylen,
+                                  frame_num=self.frame_num, run_time=self.run_time)
+            self.send_by_cc(message)
+
+        elif msg.msg_type is LDPCMsgType.PARAMS:
+            if self.role == 0:
+                raise Exception("LDPC protocol sender '{}' got params message".format(self.name))
+
+            self.error_rate = msg.error_rate
+            self.rate = msg.rate
+            self.keylen = msg.keylen
+            self.frame_num = msg.frame_num
+            self.run_time = msg.run_time
+            self.start_time = self.own.timeline.now()
+            self.end_time = self.start_time + self.run_time
+            self.state = 1
+
+            log.logger.debug(self.name + ' state={} receive_params with params={}'.format(
+                self.state, [self.error_rate, self.rate, self.keylen, self.frame_num]))
+
+            message = LDPCMessage(LDPCMsgType.GENERATE_KEY, self.another.name,
+                                  keylen=self.keylen, frame_num=self.frame_num, run_time=self.run_time)
+            self.send_by_cc(message)
+
+        elif msg.msg_type is LDPCMsgType.SYNDROME:
+            self.syndromes[msg.key_id] = (msg.syndrome, msg.seed, msg.verification)
+            if msg.key_id < len(self.bits):
+                self.correct_frame(msg.key_id)
+
+        elif msg.msg_type is LDPCMsgType.GENERATE_KEY:
+            self.generate_key(msg.keylen, msg.frame_num, msg.run_time)
+
+        elif msg.msg_type is LDPCMsgType.KEY_IS_VALID:
+            self.t2[msg.key_id] = self.own.timeline.now()
+            self.add_valid_keys(msg.key_id)
+
+        elif msg.msg_type is LDPCMsgType.KEY_IS_INVALID:
+            self.failed_frames += 1
+
+    def generate_key(self, keylen: int, frame_num=math.inf, run_time=math.inf) -> None:
+        """Method to start key generation.
+
+        The process for generating keys is:
+
+        1. Generate 10000 bits key to measure error rate
+        2. Generate frames of `frame_len` bits to correct
+
+        Args:
+            keylen (int): length of key to generate.
+            frame_num (int): number of keys to generate (default inf).
+            run_time (int): max simulation time allowed for key generation (default inf).
+        """
+
+        log.logger.info(self.name + ' state={} generate_key, keylen={}, keynum={}'.format(
+            self.state, keylen, frame_num))
+        if self.role == 1:
+            raise Exception("LDPC.generate_key() called on receiver '{}'".format(self.name))
+
+        if self.state == 0:
+            self.setup_time = self.own.timeline.now()
+            self.keylen = keylen
+            self.frame_num = frame_num
+            self.run_time = run_time
+            self._push(length=10000, key_num=1)
+
+        else:
+            self.start_time = self.own.timeline.now()
+            self.end_time = self.start_time + self.run_time
+            # keys requested after the PARAMS message was sent
+            self.another.frame_num = self.frame_num
+            if self.frame_num > 0:
+                self._push(length=self.frame_len, key_num=self.frame_num, run_time=self.run_time)
+
+    def correct_frame(self, key_id: int) -> None:
+        """Method to correct a frame from the syndrome of the sender frame, and verify it with the hash of the sender frame.
+
+        Args:
+            key_id (int): id of frame to correct.
+
+        Side Effects:
+            May return keys to upper protocol.
+            Will send a KEY_IS_VALID or KEY_IS_INVALID message to other protocol.
+        """
+
+        syndrome, seed, verification = self.syndromes.pop(key_id)
+        bits, success = decode(self.bits[key_id].to_bits(), syndrome, self.error_rate,
+                               get_code(self.frame_len, self.rate), self.max_iterations)
+        # the decoded frame may match the syndrome and still differ from the sender frame
+        if success and not array_equal(verification_hash(bits, seed, len(verification)), verification):
+            log.logger.info(self.name + ' state={} failed to verify frame {}'.format(self.state, key_id))
+            success = False
+
+        if success:
+            self.bits[key_id] = BitKey.from_bits(bits)
+            self.add_valid_keys(key_id)
+            message = LDPCMessage(LDPCMsgType.KEY_IS_VALID, self.another.name, key_id=key_id)
+        else:
+            log.logger.info(self.name + ' state={} failed to decode frame {}'.format(self.state, key_id))
+            self.failed_frames += 1
+            message = LDPCMessage(LDPCMsgType.KEY_IS_INVALID, self.another.name, key_id=key_id)
+        self.send_by_cc(message)
+
+    def add_valid_keys(self, key_id: int) -> None:
+        """Method to split a corrected frame into keys.
+
+        Args:
+            key_id (int): id of corrected frame.
+
+        Side Effects:
+            May return keys to upper protocol.
+        """
+
+        for i in range(int(self.frame_len / self.keylen)):
+            self.valid_keys.append(self.bits[key_id][i*self.keylen:(i+1)*self.keylen])
+            if self.frame_num > 0:
+                log.logger.info(self.name + ' state={} got valid key'.format(self.state))
+                self._pop(key=self.valid_keys[-1])
+                self.frame_num -= 1
+
+        self.performance_measure()
+
+    def end_ldpc(self):
+        """Method to end LDPC protocol."""
+
+        self.state = 2
+
+    def send_by_cc(self, message: "LDPCMessage") -> None:
+        """Method to send classical messages."""
+
+        if self.own.timeline.now() > self.end_time and self.state != 2:
+            self.end_ldpc()
+            self.another.end_ldpc()
+            return
+
+        self.own.send_message(self.another.own.name, message)
+
+    def performance_measure(self) -> None:
+        """Method to record performance metrics."""
+
+        if self.role == 0:
+            latencies = [t2 - t1 for t1, t2 in zip(self.t1, self.t2) if t2 != -1]
+            self.latency = sum(latencies) / len(latencies) if latencies else None
+            self.another.latency = self.latency
+
+        if self.own.timeline.now() - self.start_time:
+            self.throughput = 1e12 * len(self.valid_keys) * self.keylen / (self.own.timeline.now() - self.start_time)
+            self.privacy_throughput = 1e12 * (len(self.valid_keys) * self.keylen - int(len(self.valid_keys)/40) * self.secure_params - self.disclosed_bits_counter + self.estimation_bits) / (self.own.timeline.now() - self.start_time)
+
+        counter = 0
+        for j in range(min(len(self.valid_keys), len(self.another.valid_keys))):
+            counter += (self.valid_keys[j] ^ self.another.valid_keys[j]).popcount()
+
+        if len(self.valid_keys) > 1:
+            self.error_bit_rate = counter / (self.keylen * (len(self.valid_keys)))
+        else:
+            self.error_bit_rate = 0
+        self.time_cost = self.end_time - self.start_time
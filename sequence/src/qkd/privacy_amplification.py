@@ -0,0 +1,347 @@
+"""Definition of privacy amplification protocol implementation.
+
+This module provides a privacy amplification protocol, which compresses error-corrected keys into shorter secret keys with Toeplitz hashing.
+The protocol must be provided with a lower-layer protocol for error correction, such as cascade or LDPC.
+Also included in this module are the hash function, a function to pair protocol instances (required before the start of transmission) and the message type used by the protocol.
+"""
+
+import math
+from enum import Enum, auto
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from ..topology.node import QKDNode
+
+from numpy import concatenate, fft, int64, ndarray, rint, uint8, zeros
+
+from .bitkey import BitKey
+from .ldpc import binary_entropy
+from ..message import Message
+from ..protocol import StackProtocol
+from ..utils import log
+
+
+def toeplitz_hash(bits: ndarray, seed: ndarray) -> ndarray:
+    """Function to hash bits with a Toeplitz matrix.
+
+    The matrix has `len(seed) - len(bits) + 1` rows and `len(bits)` columns, with entry `(i, j)` equal to `seed[i - j + len(bits) - 1]`.
+    The product is a convolution of the bits with the seed, computed with FFTs in O(n log n).
+
+    Args:
+        bits (ndarray): bits to hash.
+        seed (ndarray): bits defining the matrix (diagonals from bottom left to top right).
+
+    Returns:
+        ndarray: hashed bits (dtype uint8).
+    """
+
+    n = len(bits)
+    m = len(seed) - n + 1
+    if m <= 0:
+        return zeros(0, dtype=uint8)
+
+    size = 1 << (len(seed) + n - 2).bit_length()
+    convolution = fft.irfft(fft.rfft(bits, size) * fft.rfft(seed, size), size)
+    return (rint(convolution[n - 1:n - 1 + m]).astype(int64) & 1).astype(uint8)
+
+
+def pair_pa_protocols(sender: "PrivacyAmplification", receiver: "PrivacyAmplification") -> None:
+    """Method to pair privacy amplification protocol instances.
+
+    Args:
+        sender (PrivacyAmplification): privacy amplification protocol on node sending qubits (Alice).
+        receiver (PrivacyAmplification): privacy amplification protocol on node receiving qubits (Bob).
+    """
+
+    sender.another = receiver
+    receiver.another = sender
+    sender.role = 0
+    receiver.role = 1
+
+
+class PAMsgType(Enum):
+    """Defines possible message types for privacy amplification."""
+
+    HASH = auto()
+
+
+class PAMessage(Message):
+    """Message used by privacy amplification protocols.
+
+    Attributes:
+        msg_type (PAMsgType): defines the message type.
+        receiver (str): name of destination protocol instance.
+        key_id (int): frame to hash (None if the keys are taken from secret bits already generated).
+        seed (ndarray): bits defining the Toeplitz matrix (None if `key_id` is None).
+        key_num (int): number of keys to return to upper protocols.
+    """
+
+    def __init__(self, msg_type: Enum, receiver: str, **kwargs):
+        super().__init__(msg_type, receiver)
+        self.protocol_type = PrivacyAmplification
+        if msg_type is PAMsgType.HASH:
+            self.key_id = kwargs["key_id"]
+            self.seed = kwargs["seed"]
+            self.key_num = kwargs["key_num"]
+        else:
+            raise Exception("Invalid privacy amplification message type {}".format(msg_type))
+
+
+class PrivacyAmplification(StackProtocol):
+    """Implementation of privacy amplification with Toeplitz hashing.
+
+    The protocol requests whole frames from the error correction protocol and compresses each frame into a secret key.
+    The sender chooses the length of the secret key and a random Toeplitz matrix for each frame, and sends the matrix to the receiver.
+    The secret length of a frame of `n` bits is `n * (1 - h(e)) - leak - secure_params`, where `h` is the binary entropy, `e` the error rate estimated by the error correction protocol and `leak` the number of bits it disclosed since the previous frame.
+The error rate estimation sample is not part of the leak: it is a frame of its own, discarded once the error rate is estimated.
+    Secret bits are returned to upper protocols as keys of the requested length, bits left over are kept for the next requests.
+    Only the frames needed for a request are requested from the error correction protocol, from the secret bits expected per frame.
+
+    The receiver returns keys when it gets the matrix of a frame, one classical channel delay after the sender.
+    Upper protocols of the receiver (e.g. key managers) thus get each key, and see their pool refill, later than those of the sender.
+
+    Attributes:
+        own (QKDNode): node that protocol instance is attached to.
+        name (str): label for protocol instance.
+        role (int): differentiates "alice" and "bob" protocols.
+        secure_params (int): security parameter (bits removed from each frame).
+        another (PrivacyAmplification): reference to paired protocol.
+        keylen (int): length of keys to generate.
+        frame_num (int): number of keys left to generate.
+        run_time (int): max simulation time allowed for key generation.
+        frames (List[BitKey]): error-corrected frames (received from error correction protocol).
+        frames_pending (int): number of frames requested and not yet received.
+        hashes (List[Tuple[int, ndarray, int]]): frame ids, seeds and key numbers received and not yet processed, in order.
+        key_bits (ndarray): secret bits not yet returned as keys.
+        disclosed_bits (int): bits disclosed by error correction accounted for in previous frames.
+        input_bits (int): number of bits of hashed frames.
+        secret_bits (int): number of secret bits generated.
+        start_time (int): time of the first key request.
+        valid_keys (List[BitKey]): list of keys generated.
+        compression_ratio (float): ratio of secret bits to error-corrected bits.
+        throughput (float): secret key throughput in bits/s.
+    """
+
+    def __init__(self, own: "QKDNode", name: str, role=-1, secure_params=100):
+        """Constructor for privacy amplification class.
+
+        Args:
+            own (QKDNode): node protocol instance is attached to.
+            name (str): name of protocol instance.
+
+        Keyword Args:
+            role (int): 0/1 role for protocol, differentiates Alice/Bob instances (default -1).
+            secure_params (int): security parameter (default 100).
+        """
+
+        super().__init__(own, name)
+
+        self.role = role
+        self.secure_params = secure_params
+        self.another = None
+
+        self.keylen = None
+        self.frame_num = 0
+        self.run_time = math.inf
+        self.frames = []
+        self.frames_pending = 0
+        self.hashes = []
+        self.key_bits = zeros(0, dtype=uint8)
+        self.disclosed_bits = 0
+        self.input_bits = 0
+        self.secret_bits = 0
+        self.start_time = None
+
+        # metrics
+        self.valid_keys = []
+        self.compression_ratio = None
+        self.throughput = None  # bits/sec
+
+    def push(self, keylen: int, frame_num=math.inf, run_time=math.inf) -> None:
+        """Method to receive key generation events.
+
+        Keys are first taken from the secret bits left over by previous frames, then frames are requested from the error correction protocol.
+
+        Args:
+            keylen (int): length of key to generate.
+            frame_num (int): number of keys to generate (default inf).
+            run_time (int): max simulation time allowed for key generation (default inf).
+        """
+
+        log.logger.info(self.name + ' generate_key, keylen={}, keynum={}'.format(keylen, frame_num))
+        if self.role == 1:
+            raise Exception("PrivacyAmplification.push() called on receiver '{}'".format(self.name))
+
+        self.keylen = keylen
+        self.another.keylen = keylen
+        self.frame_num += frame_num
+        self.run_time = run_time
+        if self.start_time is None:
+            self.start_time = self.own.timeline.now()
+            self.another.start_time = self.start_time
+
+        key_num = self.pop_keys(self.frame_num)
+        if key_num > 0:
+            self.frame_num -= key_num
+            message = PAMessage(PAMsgType.HASH, self.another.name, key_id=None, seed=None, key_num=key_num)
+            self.own.send_message(self.another.own.name, message)
+
+        self.request_frames()
+
+    def pop(self, key: BitKey) -> None:
+        """Method to receive error-corrected frames.
+
+        Args:
+            key (BitKey): frame received.
+        """
+
+        self.frames.append(key)
+        key_id = len(self.frames) - 1
+        self.frames_pending = max(self.frames_pending - 1, 0)
+
+        if self.role == 0:
+            seed = self.choose_seed(key)
+            self.add_secret(key_id, seed)
+            key_num = self.pop_keys(self.frame_num)
+            self.frame_num -= key_num
+            message = PAMessage(PAMsgType.HASH, self.another.name, key_id=key_id, seed=seed, key_num=key_num)
+            self.own.send_message(self.another.own.name, message)
+            # frames yielded less secret bits than expected
+            self.request_frames()
+
+        else:
+            self.process_hashes()
+
+    def received_message(self, src: str, msg: "Message") -> None:
+        """Method to receive messages from other protocol instance.
+
+        Args:
+            src (str): name of node that sent the message.
+            msg (Message): message received.
+        """
+
+        if msg.msg_type is PAMsgType.HASH:
+            self.hashes.append((msg.key_id, msg.seed, msg.key_num))
+            self.process_hashes()
+
+    def expected_secret_bits(self) -> float:
+        """Method to estimate the secret bits of the next frame.
+
+        Returns:
+            float: `frame_len * (1 - h(e)) - leak - secure_params`, with the mean leak of previous frames (`frame_len` if the error rate is not estimated yet).
+        """
+
+        lower = self.lower_protocols[0]
+        if lower.error_rate is None:
+            return lower.frame_len
+
+        frame_num = len(self.frames)
+        leak = self.disclosed_bits / frame_num if frame_num else 0
+        return lower.frame_len * (1 - binary_entropy(lower.error_rate)) - leak - self.secure_params
+
+    def request_frames(self) -> None:
+        """Method to request the frames needed for the keys left to generate.
+
+        Frames are requested once the previous request has been served, so that the error correction protocol generates exactly the frames requested.
+
+        Side Effects:
+            May request frames from the error correction protocol.
+        """
+
+        if self.frames_pending > 0:
+            return
+
+        secret_bits = self.expected_secret_bits()
+        missing_bits = self.frame_num * self.keylen - len(self.key_bits)
+        if missing_bits <= 0 or secret_bits <= 0:
+            return
+
+        frame_num = math.ceil(missing_bits / secret_bits) if missing_bits != math.inf else math.inf
+        self.frames_pending = frame_num
+        lower = self.lower_protocols[0]
+
+        log.logger.debug(self.name + ' request_frames, frame_num={}'.format(frame_num))
+        self._push(keylen=lower.frame_len, frame_num=frame_num, run_time=self.run_time)
+
+    def choose_seed(self, frame: BitKey) -> ndarray:
+        """Method to choose the Toeplitz matrix of a frame.
+
+        Args:
+            frame (BitKey): frame to hash.
+
+        Returns:
+            ndarray: random bits defining the matrix, `len(frame) + secret length - 1` bits long.
+        """
+
+        lower = self.lower_protocols[0]
+        disclosed_bits = lower.disclosed_bits_counter - lower.estimation_bits
+        leak = disclosed_bits - self.disclosed_bits
+        self.disclosed_bits = disclosed_bits
+        secret_len = max(int(len(frame) * (1 - binary_entropy(lower.error_rate))) - leak - self.secure_params, 0)
+
+        log.logger.debug(self.name + ' choose_seed, leak={}, secret_len={}'.format(leak, secret_len))
+        return self.own.get_generator().integers(2, size=len(frame) + secret_len - 1, dtype=uint8)
+
+    def process_hashes(self) -> None:
+        """Method to process the matrices received, in order, while their frames are available.
+
+        Side Effects:
+            May return keys to upper protocols.
+        """
+
+        while self.hashes:
+            key_id, seed, key_num = self.hashes[0]
+            if key_id is not None:
+                if key_id >= len(self.frames):
+                    return
+                self.add_secret(key_id, seed)
+            self.pop_keys(key_num)
+            self.hashes.pop(0)
+
+    def add_secret(self, key_id: int, seed: ndarray) -> None:
+        """Method to compress a frame into secret bits.
+
+        Args:
+            key_id (int): id of frame to hash.
+            seed (ndarray): bits defining the Toeplitz matrix.
+        """
+
+        frame = self.frames[key_id]
+        self.frames[key_id] = None
+        secret = toeplitz_hash(frame.to_bits(), seed)
+        self.input_bits += len(frame)
+        self.secret_bits += len(secret)
+        self.key_bits = concatenate((self.key_bits, secret))
+        self.compression_ratio = self.secret_bits / self.input_bits
+
+    def pop_keys(self, key_num: int) -> int:
+        """Method to return secret keys to upper protocols.
+
+        Args:
+            key_num (int): maximum number of keys to return.
+
+        Returns:
+            int: number of keys returned.
+
+        Side Effects:
+            May return keys to upper protocols.
+        """
+
+        count = 0
+        while len(self.key_bits) >= self.keylen and count < key_num:
+            key = BitKey.from_bits(self.key_bits[:self.keylen])
+            self.key_bits = self.key_bits[self.keylen:]
+            self.valid_keys.append(key)
+            log.logger.info(self.name + ' got secret key')
+            self._pop(key=key)
+            count += 1
+
+        if count:
+            self.performance_measure()
+        return count
+
+    def performance_measure(self) -> None:
+        """Method to record performance metrics."""
+
+        if self.own.timeline.now() - self.start_time:
+            self.throughput = 1e12 * len(self.valid_keys) * self.keylen / (self.own.timeline.now() - self.start_time)
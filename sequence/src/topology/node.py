@@ -18,6 +18,7 @@ if TYPE_CHECKING:
     from ..components.optical_channel import QuantumChannel, ClassicalChannel
     from ..components.memory import Memory
     from ..components.photon import Photon
+    from ..components.pulse_train import PulseTrain
     from ..app.random_request import RandomRequestApp
 
 from ..kernel.entity import Entity
@@ -153,6 +154,11 @@ class Node(Entity):
 
         return self.qchannels[dst].schedule_transmit(min_time)
 
+    def schedule_qubits(self, dst: str, min_time: int, num_qubits: int) -> List[int]:
+        """Interface for quantum channel `schedule_transmits` method."""
+
+        return self.qchannels[dst].schedule_transmits(min_time, num_qubits)
+
     def send_qubit(self, dst: str, qubit) -> None:
         """Interface for quantum channel `transmit` method."""
 
@@ -170,6 +176,23 @@ class Node(Entity):
 
         self.components[self.first_component_name].get(qubit)
 
+    def send_pulse_train(self, dst: str, train: "PulseTrain") -> None:
+        """Interface for quantum channel `transmit_pulse_train` method."""
+
+        self.qchannels[dst].transmit_pulse_train(train, self)
+
+    def receive_pulse_train(self, src: str, train: "PulseTrain") -> None:
+        """Method to receive pulse trains from quantum channel.
+
+        By default, forwards the train to hardware element designated by field `receiver_name`.
+
+        Args:
+            src (str): name of node where the train was sent from.
+            train (PulseTrain): transmitted photons.
+        """
+
+        self.components[self.first_component_name].get_pulse_train(train)
+
     def get_components_by_type(self, component_type: str) -> List[Entity]:
         return [comp for comp in self.components.values() if type(comp).__name__ == component_type]
 
@@ -371,9 +394,9 @@ class QKDNode(Node):
     The protocol stack is:
 
     4. Authentication <= No implementation
-    3. Privacy Amplification  <= No implementation
+    3. Privacy Amplification  <= implemented by privacy amplification (see `set_protocol_layer`)
     2. Entropy Estimation <= No implementation
-    1. Error Correction <= implemented by cascade
+    1. Error Correction <= implemented by cascade (or LDPC, see `set_protocol_layer`)
     0. Sifting <= implemented by BB84
 
     Additionally, the `components` dictionary contains the following hardware:
@@ -440,6 +463,8 @@ class QKDNode(Node):
     def set_protocol_layer(self, layer: int, protocol: "StackProtocol") -> None:
         """Method to set a layer of the protocol stack.
 
+        The protocol is attached to the closest layers below and above holding a protocol, so that empty layers are skipped.
+
         Args:
             layer (int): layer to change.
             protocol (StackProtocol): protocol to insert.
@@ -448,18 +473,31 @@ class QKDNode(Node):
         if layer < 0 or layer > 4:
             raise ValueError("layer must be between 0 and 4; given {}".format(layer))
 
-        if self.protocol_stack[layer] is not None:
-            self.protocols.remove(self.protocol_stack[layer])
+        lower = next((p for p in reversed(self.protocol_stack[:layer]) if p is not None), None)
+        upper = next((p for p in self.protocol_stack[layer + 1:] if p is not None), None)
+
+        old_protocol = self.protocol_stack[layer]
+        if old_protocol is not None:
+            self.protocols.remove(old_protocol)
+            # detach the replaced protocol from its neighbours
+            if lower is not None:
+                lower.upper_protocols.remove(old_protocol)
+            if upper is not None:
+                upper.lower_protocols.remove(old_protocol)
+        elif lower is not None and upper is not None:
+            # the protocol is inserted between its neighbours
+            lower.upper_protocols.remove(upper)
+            upper.lower_protocols.remove(lower)
         self.protocol_stack[layer] = protocol
         self.protocols.append(protocol)
 
-        if layer > 0 and self.protocol_stack[layer - 1] is not None:
-            self.protocol_stack[layer - 1].upper_protocols.append(protocol)
-            protocol.lower_protocols.append(self.protocol_stack[layer - 1])
+        if lower is not None:
+            lower.upper_protocols.append(protocol)
+            protocol.lower_protocols.append(lower)
 
-        if layer < 5 and self.protocol_stack[layer + 1] is not None:
-            protocol.upper_protocols.append(self.protocol_stack[layer + 1])
-            self.protocol_stack[layer + 1].lower_protocols.append(protocol)
+        if upper is not None:
+            protocol.upper_protocols.append(upper)
+            upper.lower_protocols.append(protocol)
 
     def update_lightsource_params(self, arg_name: str, value: Any) -> None:
         for component in self.components.values():
@@ -486,68 +524,59 @@ class QKDNode(Node):
             detector_name (str): name of the QSDetector measuring qubits.
 
         Returns:
-            List[int]: list of calculated bits.
+            numpy.ndarray: calculated bits (dtype int8).
         """
 
         qsdetector = self.components[detector_name]
 
         # compute received bits based on encoding scheme
         encoding = self.encoding["name"]
-        bits = [-1] * int(round(light_time * frequency))  # -1 used for invalid bits
+        num_bits = int(round(light_time * frequency))
+        bits = np.full(num_bits, -1, dtype=np.int8)  # -1 used for invalid bits
+
+        def get_indices(times):
+            indices = np.rint((times - start_time) * frequency * 1e-12).astype(np.int64)
+            return indices, (indices >= 0) & (indices < num_bits)
+
+        def in_bin(indices, times):
+            return np.abs(((indices * 1e12 / frequency) + start_time) - times) < bin_separation / 2
+
+        def count(indices):
+            return np.bincount(indices, minlength=num_bits)
 
         if encoding == "polarization":
-            detection_times = qsdetector.get_photon_times()
-
-            # determine indices from detection times and record bits
-            for time in detection_times[0]:  # detection times for |0> detector
-                index = round((time - start_time) * frequency * 1e-12)
-                if 0 <= index < len(bits):
-                    bits[index] = 0
-
-            for time in detection_times[1]:  # detection times for |1> detector
-                index = round((time - start_time) * frequency * 1e-12)
-                if 0 <= index < len(bits):
-                    if bits[index] == 0:
-                        bits[index] = -1
-                    else:
-                        bits[index] = 1
+            detection_times = [np.asarray(times, dtype=np.int64) for times in qsdetector.get_photon_times()]
+
+            # clicks of both the |0> and |1> detector give an invalid bit
+            clicks = []
+            for times in detection_times:
+                indices, valid = get_indices(times)
+                clicks.append(count(indices[valid]) > 0)
+            bits[clicks[0] & ~clicks[1]] = 0
+            bits[clicks[1] & ~clicks[0]] = 1
 
         elif encoding == "time_bin":
-            detection_times = qsdetector.get_photon_times()
+            detection_times = [np.asarray(times, dtype=np.int64) for times in qsdetector.get_photon_times()]
             bin_separation = self.encoding["bin_separation"]
-        
-            # single detector (for early, late basis) times
-            for time in detection_times[0]:
-                index = int(round((time - start_time) * frequency * 1e-12))
-                if 0 <= index < len(bits):
-                    if abs(((index * 1e12 / frequency) + start_time) - time) < bin_separation / 2:
-                        bits[index] = 0
-                    elif abs(((index * 1e12 / frequency) + start_time) - (time - bin_separation)) < bin_separation / 2:
-                        bits[index] = 1
-        
-            # interferometer detector 0 times
-            for time in detection_times[1]:
-                time -= bin_separation
-                index = int(round((time - start_time) * frequency * 1e-12))
-                # check if index is in range and is in correct time bin
-                if 0 <= index < len(bits) and \
-                        abs(((index * 1e12 / frequency) + start_time) - time) < bin_separation / 2:
-                    if bits[index] == -1:
-                        bits[index] = 0
-                    else:
-                        bits[index] = -1
-
-            # interferometer detector 1 times
-            for time in detection_times[2]:
-                time -= bin_separation
-                index = int(round((time - start_time) * frequency * 1e-12))
-                # check if index is in range and is in correct time bin
-                if 0 <= index < len(bits) and \
-                        abs(((index * 1e12 / frequency) + start_time) - time) < bin_separation / 2:
-                    if bits[index] == -1:
-                        bits[index] = 1
-                    else:
-                        bits[index] = -1
+
+            # single detector (for early, late basis) times, the last detection of a bit is kept
+            times = detection_times[0]
+            indices, valid = get_indices(times)
+            early = valid & in_bin(indices, times)
+            late = valid & ~early & in_bin(indices, times - bin_separation)
+            bits[indices[early | late]] = late[early | late]
+
+            # interferometer detector 0 and 1 times
+            # each detection in the correct time bin sets an invalid bit to the detector value, any other bit to -1
+            for value, times in [(0, detection_times[1]), (1, detection_times[2])]:
+                times = times - bin_separation
+                indices, valid = get_indices(times)
+                valid &= in_bin(indices, times)
+                clicks = count(indices[valid])
+                invalid = bits == -1
+                bits[(clicks % 2 == 1) & invalid] = value
+                bits[(clicks % 2 == 1) & ~invalid] = -1
+                bits[(clicks > 0) & (clicks % 2 == 0) & ~invalid] = value
 
         else:
             raise Exception("QKD node {} has illegal encoding type {}".format(self.name, encoding))
@@ -600,3 +629,6 @@ class QKDNode(Node):
 
     def get(self, photon: "Photon", **kwargs):
         self.send_qubit(self.destination, photon)
+
+    def get_pulse_train(self, train: "PulseTrain"):
+        self.send_pulse_train(self.destination, train)
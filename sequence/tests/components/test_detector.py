@@ -329,3 +329,59 @@ def test_QSDetectorFockInterference():
 
     times = qsd.get_photon_times()
     assert len(times[0]) == NUM_TRIALS
+
+
+def test_Detector_get_pulse_train():
+    # same detections as photons received one by one
+    count_rate = 1e11
+    interval = 1e12 / count_rate
+    detector, parent, tl = create_detector(efficiency=1, count_rate=count_rate, time_resolution=1)
+    detections = []
+    detector.notify = lambda info: detections.extend(info['times'])
+    arrive_times = np.array([0, 2 * interval, 4 * interval, 4.5 * interval, 5.1 * interval, 5.1 * interval,
+                             5.5 * interval, 6.2 * interval], dtype=int)
+    detector.get_pulse_train(arrive_times)
+    assert detector.photon_counter == len(arrive_times)
+
+    # photons are recorded when the simulation reaches their arrival time
+    detector.record_pending(int(4 * interval))
+    assert detections == [0, 2 * interval, 4 * interval]
+    detector.record_pending(int(10 * interval))
+    assert detections == [0, 2 * interval, 4 * interval, 5.1 * interval, 6.2 * interval]
+
+    # efficiency
+    efficiency = 0.5
+    detector, parent, tl = create_detector(efficiency=efficiency)
+    detections = []
+    detector.notify = lambda info: detections.extend(info['times'])
+    detector.get_pulse_train(np.arange(1000, dtype=np.int64) * int(1e9))
+    detector.record_pending(int(1e12))
+    assert abs(len(detections) / 1000 - efficiency) < 0.1
+
+
+def test_Detector_batch_dark_counts():
+    time = 1e14
+    dark_count = 100
+    detector, parent, tl = create_detector(dark_count=dark_count)
+    detector.batch_dark_counts = True
+    detections = []
+    detector.notify = lambda info: detections.extend(info['times'])
+
+    tl.init()
+    assert len(tl.events) == 0
+    detector.record_pending(int(time))
+
+    ratio = len(detections) / (dark_count * time * 1e-12)
+    assert abs(ratio - 1) < 0.1
+    assert all(t1 < t2 for t1, t2 in zip(detections, detections[1:]))
+    assert all(t % detector.time_resolution == 0 for t in detections)
+
+    # dark counts are merged with the photons of pulse trains
+    detector.dark_count = 1e9
+    detector.efficiency = 1
+    detections.clear()
+    detector.get_pulse_train(np.arange(1, 11, dtype=np.int64) * int(1e6) + int(time))
+    detector.record_pending(int(time + 2e7))
+    dead_time = 1e12 / detector.count_rate
+    assert len(detections) > 10
+    assert all(t2 - t1 > dead_time - detector.time_resolution for t1, t2 in zip(detections, detections[1:]))
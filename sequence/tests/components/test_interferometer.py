@@ -2,6 +2,7 @@ import numpy as np
 
 from sequence.components.interferometer import Interferometer
 from sequence.components.photon import Photon
+from sequence.components.pulse_train import PulseTrain
 from sequence.kernel.timeline import Timeline
 from sequence.utils.encoding import time_bin
 
@@ -149,3 +150,52 @@ def test_Interferometer_get():
             assert False
 
     assert abs(counter1 / counter3 - 1) < 0.1 and counter2 == 0
+
+
+def test_Interferometer_get_pulse_train():
+    class Owner:
+        def __init__(self):
+            self.generator = np.random.default_rng(SEED)
+
+        def get_generator(self):
+            return self.generator
+
+    class Receiver:
+        def __init__(self):
+            self.times = []
+
+        def get_pulse_train(self, times):
+            self.times.append(times)
+
+    tl = Timeline()
+    intfm = Interferometer("interferometer", tl, time_bin["bin_separation"])
+    d0 = Receiver()
+    d1 = Receiver()
+    intfm.add_receiver(d0)
+    intfm.add_receiver(d1)
+    intfm.owner = Owner()
+    tl.init()
+
+    sep = time_bin["bin_separation"]
+    state_table = np.array([state for basis in time_bin["bases"] for state in basis], dtype=complex)
+    # expected fraction of photons at each delay for each state (both detectors)
+    expects = [[0.5, 0.5, 0], [0, 0.5, 0.5], [0.25, 0.25, 0.25], [0.25, 0.25, 0.25]]
+    for state in range(4):
+        train = PulseTrain(np.arange(NUM_TRIALS) * int(1e6), np.full(NUM_TRIALS, state), state_table, time_bin)
+        intfm.get_pulse_train(train)
+        times0, times1 = d0.times[-1], d1.times[-1]
+        assert all(np.diff(times0) >= 0) and all(np.diff(times1) >= 0)
+        delays = np.concatenate((times0, times1)) % int(1e6)
+        for i, expect in enumerate(expects[state]):
+            assert abs(np.count_nonzero(delays == i * sep) / NUM_TRIALS - expect) < 0.02
+        # early + late only interferes on detector 0 and early - late on detector 1
+        if state == 2:
+            assert np.count_nonzero(times1 % int(1e6) == sep) == 0
+        if state == 3:
+            assert np.count_nonzero(times0 % int(1e6) == sep) == 0
+
+    # phase errors send early + late photons to detector 1
+    intfm.phase_error = 1
+    train = PulseTrain(np.arange(NUM_TRIALS) * int(1e6), np.full(NUM_TRIALS, 2), state_table, time_bin)
+    intfm.get_pulse_train(train)
+    assert np.count_nonzero(d0.times[-1] % int(1e6) == sep) == 0
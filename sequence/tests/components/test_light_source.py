@@ -1,4 +1,4 @@
-from numpy import random
+from numpy import random, allclose
 from sequence.components.light_source import LightSource
 from sequence.kernel.timeline import Timeline
 from sequence.utils.encoding import polarization
@@ -10,10 +10,14 @@ class Receiver:
     def __init__(self, timeline):
         self.timeline = timeline
         self.log = []
+        self.trains = []
 
     def get(self, photon):
         self.log.append((self.timeline.now(), photon))
 
+    def get_pulse_train(self, train):
+        self.trains.append(train)
+
 
 def test_light_source():
     tl = Timeline()
@@ -31,6 +35,7 @@ def test_light_source():
 
     tl.init()
     ls.emit(state_list)
+    assert len(tl.events) == 1
     tl.run()
 
     assert (len(receiver.log) / STATE_LEN) - MEAN < 0.1
@@ -38,3 +43,52 @@ def test_light_source():
         index = int(qubit.name)
         assert state_list[index] == qubit.quantum_state.state
         assert time == index * (1e12 / FREQ)
+
+
+def test_light_source_emit_states():
+    tl = Timeline()
+    FREQ, MEAN = 1e8, 0.1
+    ls = LightSource("ls", tl, frequency=FREQ, mean_photon_num=MEAN)
+    receiver = Receiver(tl)
+    ls.add_receiver(receiver)
+
+    STATE_LEN = 1000
+    bases = random.randint(2, size=STATE_LEN)
+    bits = random.randint(2, size=STATE_LEN)
+
+    tl.init()
+    ls.emit_states(2 * bases + bits)
+    # a single event emits the pulses one after the other
+    assert len(tl.events) == 1
+    tl.run()
+
+    assert (len(receiver.log) / STATE_LEN) - MEAN < 0.1
+    for time, qubit in receiver.log:
+        index = int(qubit.name)
+        state = polarization["bases"][bases[index]][bits[index]]
+        assert state == qubit.quantum_state.state
+        assert time == index * (1e12 / FREQ)
+
+
+def test_light_source_pulse_train():
+    tl = Timeline()
+    FREQ, MEAN = 1e8, 0.1
+    ls = LightSource("ls", tl, frequency=FREQ, mean_photon_num=MEAN, pulse_train=True)
+    receiver = Receiver(tl)
+    ls.add_receiver(receiver)
+
+    STATE_LEN = 1000
+    bases = random.randint(2, size=STATE_LEN)
+    bits = random.randint(2, size=STATE_LEN)
+
+    tl.init()
+    ls.emit_states(2 * bases + bits)
+
+    assert len(receiver.trains) == 1
+    train = receiver.trains[0]
+    assert (len(train) / STATE_LEN) - MEAN < 0.1
+    assert ls.photon_counter == len(train)
+    for time, state in zip(train.times, train.states):
+        index = int(round(time * FREQ * 1e-12))
+        assert time == index * (1e12 / FREQ)
+        assert allclose(train.state_table[state], polarization["bases"][bases[index]][bits[index]])
@@ -132,3 +132,52 @@ def test_QuantumChannel_schedule_transmit():
     tl.time = 2
     time = qc.schedule_transmit(0)
     assert time == 3
+
+
+def test_QuantumChannel_schedule_transmits():
+    tl = Timeline()
+    qc = QuantumChannel("qc", tl, attenuation=0, distance=1e3, frequency=1e12)
+
+    assert qc.schedule_transmit(1) == 1
+    assert qc.schedule_transmit(4) == 4
+    # first block of 3 free windows
+    assert qc.schedule_transmits(0, 3) == [5, 6, 7]
+    assert qc.schedule_transmits(0, 2) == [2, 3]
+    assert qc.schedule_transmit(0) == 0
+    assert len(qc.send_bins) == 8
+
+
+def test_SlotAllocator():
+    slots = SlotAllocator()
+    assert slots.reserve(10) == 10
+    assert slots.reserve(10) == 11
+    assert slots.reserve(5, 3) == 5
+    assert slots.reserve(8, 3) == 12
+    assert len(slots) == 8
+    assert 6 in slots and 8 not in slots
+
+    # releasing slots in the middle frees them for the next reservations
+    slots.release(11)
+    slots.release(12)
+    assert 11 not in slots
+    assert slots.reserve(8, 2) == 8
+    assert slots.reserve(8, 2) == 11
+    assert slots.pop() == 5
+    assert slots.pop() == 6
+    assert slots.base == 7
+    assert slots.reserve(0) == 0
+    assert slots.base == 0
+
+    # the cursor skips the slots reserved back to back
+    slots = SlotAllocator()
+    for i in range(100):
+        assert slots.reserve(0) == i
+    assert slots.cursor == 100
+    slots.release(50)
+    assert slots.cursor == 50
+    assert slots.reserve(0) == 50
+    assert slots.cursor == 51
+    assert slots.reserve(0) == 100
+    assert slots.cursor == 101
+    assert slots.pop() == 0
+    assert slots.cursor == 100
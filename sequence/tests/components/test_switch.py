@@ -1,4 +1,6 @@
+import numpy as np
 from numpy import random
+from sequence.components.pulse_train import PulseTrain
 from sequence.components.photon import Photon
 from sequence.components.switch import Switch
 from sequence.kernel.timeline import Timeline
@@ -72,3 +74,52 @@ def test_Switch_get():
         time = time % (1e12 / FREQ)
         assert time == 0
         assert photon is not None
+
+
+def test_Switch_get_pulse_train():
+    class Owner:
+        def __init__(self):
+            self.generator = np.random.default_rng(0)
+
+        def get_generator(self):
+            return self.generator
+
+    class Receiver:
+        def __init__(self):
+            self.log = []
+
+        def get_pulse_train(self, train):
+            self.log.append(train)
+
+    tl = Timeline()
+    sw = Switch("sw", tl)
+    r1 = Receiver()
+    r2 = Receiver()
+    sw.add_receiver(r1)
+    sw.add_receiver(r2)
+    sw.owner = Owner()
+    sw.set_basis_list([0, 1] * 1000, 0, FREQ)
+
+    # |e>, |l>, |e+l>, |e-l> in each pair of periods
+    period = int(1e12 / FREQ)
+    state_table = np.array([state for basis in time_bin["bases"] for state in basis], dtype=complex)
+    states = np.tile([0, 2, 1, 3, 2, 2, 3, 3], 250)
+    # the last photon arrives after the basis list
+    train = PulseTrain(np.arange(2001) * period, np.append(states, 0), state_table, time_bin)
+    sw.get_pulse_train(train)
+
+    times = r1.log[0]
+    assert len(times) == 1000
+    assert all(np.diff(times) >= 0)
+    slots = (times // period) % 8
+    delays = times % period
+    assert all(delays[slots == 0] == 0)
+    assert all(delays[slots == 2] == time_bin["bin_separation"])
+    # superposition states give early and late with equal probability
+    superposed = delays[slots >= 4]
+    assert abs(np.count_nonzero(superposed == 0) / len(superposed) - 0.5) < 0.1
+
+    x_train = r2.log[0]
+    assert len(x_train) == 1000
+    assert all(x_train.times % (2 * period) == period)
+    assert list(x_train.states[:4]) == [2, 3, 2, 3]
@@ -1,4 +1,6 @@
-from sequence.qkd.BB84 import pair_bb84_protocols
+import numpy
+
+from sequence.qkd.BB84 import BB84, pair_bb84_protocols
 
 # For testing BB84 Protocol
 from sequence.kernel.timeline import Timeline
@@ -72,6 +74,46 @@ def test_BB84_polarization():
     assert pa.counter == pb.counter == 10
 
 
+def test_BB84_pulse_train():
+    tl = Timeline(1e12)  # stop time is 1 s
+
+    alice = QKDNode("alice", tl, stack_size=1)
+    bob = QKDNode("bob", tl, stack_size=1)
+    alice.set_seed(0)
+    bob.set_seed(1)
+    alice.update_lightsource_params("pulse_train", True)
+    pair_bb84_protocols(alice.protocol_stack[0], bob.protocol_stack[0])
+
+    qc0 = QuantumChannel("qc0", tl, distance=10e3, polarization_fidelity=0.99,
+                         attenuation=0.00002)
+    qc1 = QuantumChannel("qc1", tl, distance=10e3, polarization_fidelity=0.99,
+                         attenuation=0.00002)
+    qc0.set_ends(alice, bob.name)
+    qc1.set_ends(bob, alice.name)
+    cc0 = ClassicalChannel("cc0", tl, distance=10e3)
+    cc1 = ClassicalChannel("cc1", tl, distance=10e3)
+    cc0.set_ends(alice, bob.name)
+    cc1.set_ends(bob, alice.name)
+
+    # Parent
+    pa = Parent(alice, 128, "alice")
+    pb = Parent(bob, 128, "bob")
+    alice.protocol_stack[0].upper_protocols.append(pa)
+    pa.lower_protocols.append(alice.protocol_stack[0])
+    bob.protocol_stack[0].upper_protocols.append(pb)
+    pb.lower_protocols.append(bob.protocol_stack[0])
+
+    process = Process(pa, "push", [])
+    event = Event(0, process)
+    tl.schedule(event)
+
+    tl.init()
+    tl.run()
+    assert pa.counter == pb.counter == 10
+    # a photon with polarization error gives a random bit
+    assert numpy.mean(alice.protocol_stack[0].error_rates) < 0.02
+
+
 def test_BB84_time_bin():
     tl = Timeline(1e12)  # stop time is 1 s
 
@@ -108,3 +150,61 @@ def test_BB84_time_bin():
     tl.run()
     assert pa.counter == pb.counter == 10
 
+
+def test_BB84_time_bin_pulse_train():
+    tl = Timeline(1e12)  # stop time is 1 s
+
+    alice = QKDNode("alice", tl, encoding=time_bin, stack_size=1)
+    bob = QKDNode("bob", tl, encoding=time_bin, stack_size=1)
+    alice.set_seed(2)
+    bob.set_seed(3)
+    alice.update_lightsource_params("pulse_train", True)
+    pair_bb84_protocols(alice.protocol_stack[0], bob.protocol_stack[0])
+
+    qc0 = QuantumChannel("qc0", tl, distance=10e3, polarization_fidelity=0.99,
+                         attenuation=0.00002)
+    qc1 = QuantumChannel("qc1", tl, distance=10e3, polarization_fidelity=0.99,
+                         attenuation=0.00002)
+    qc0.set_ends(alice, bob.name)
+    qc1.set_ends(bob, alice.name)
+    cc0 = ClassicalChannel("cc0", tl, distance=10e3)
+    cc1 = ClassicalChannel("cc1", tl, distance=10e3)
+    cc0.set_ends(alice, bob.name)
+    cc1.set_ends(bob, alice.name)
+
+    # Parent
+    pa = Parent(alice, 128, "alice")
+    pb = Parent(bob, 128, "bob")
+    alice.protocol_stack[0].upper_protocols.append(pa)
+    pa.lower_protocols.append(alice.protocol_stack[0])
+    bob.protocol_stack[0].upper_protocols.append(pb)
+    pb.lower_protocols.append(bob.protocol_stack[0])
+
+    process = Process(pa, "push", [])
+    event = Event(0, process)
+    tl.schedule(event)
+
+    tl.init()
+    tl.run()
+    assert pa.counter == pb.counter == 10
+    assert numpy.mean(alice.protocol_stack[0].error_rates) == 0
+
+
+def test_BB84_set_key():
+    protocol = BB84(None, "", "", "")
+    bits = [1, 0, 1, 1, 0, 0, 1, 0, 1, 1, 1, 0, 1]
+    protocol.key_bits = numpy.zeros(0, dtype=numpy.uint8)
+    protocol.key_bits_start = protocol.key_bits_end = 0
+    protocol.key_lengths = [len(bits)]
+
+    # bits of several frames
+    protocol.add_key_bits(numpy.array(bits[:5]))
+    protocol.add_key_bits(numpy.array(bits[5:] + [0, 1]))
+    protocol.set_key()
+    assert int(protocol.key) == int("".join(str(b) for b in bits), 2)
+    assert len(protocol.key) == len(bits)
+    assert list(protocol.key_bits[protocol.key_bits_start:protocol.key_bits_end]) == [0, 1]
+
+    # unused bits move to the front of the buffer
+    protocol.add_key_bits(numpy.array([1]))
+    assert list(protocol.key_bits[protocol.key_bits_start:protocol.key_bits_end]) == [0, 1, 1]
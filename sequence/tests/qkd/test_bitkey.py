@@ -0,0 +1,42 @@
+import numpy
+
+from sequence.qkd.bitkey import BitKey
+
+
+def test_bitkey_int():
+    value = 0b1011001110001
+    key = BitKey.from_int(value, 13)
+    assert int(key) == value
+    assert len(key) == 13
+    assert [key[i] for i in range(13)] == [(value >> i) & 1 for i in range(13)]
+    assert key == BitKey.from_bits([(value >> i) & 1 for i in range(13)])
+    assert key != BitKey.from_int(value, 14)
+
+    # extra bits of the last byte are discarded
+    key = BitKey.from_bytes(b"\xff\xff", 12)
+    assert int(key) == 2 ** 12 - 1
+    assert key.popcount() == 12
+
+
+def test_bitkey_operations():
+    rng = numpy.random.default_rng(0)
+    bits1 = rng.integers(2, size=1000)
+    bits2 = rng.integers(2, size=1000)
+    key1 = BitKey.from_bits(bits1)
+    key2 = BitKey.from_bits(bits2)
+
+    assert (key1 ^ key2).popcount() == numpy.sum(bits1 != bits2)
+    assert key1.parity() == numpy.sum(bits1) % 2
+    positions = [3, 17, 256, 999]
+    assert key1.parity(positions) == numpy.sum(bits1[positions]) % 2
+    assert key1.parity([]) == 0
+    assert list(key1[positions]) == list(bits1[positions])
+
+    # aligned and unaligned slices
+    assert key1[128:256] == BitKey.from_bits(bits1[128:256])
+    assert key1[5:300] == BitKey.from_bits(bits1[5:300])
+    assert int(key1[0:512]) == int(key1) & (2 ** 512 - 1)
+
+    key1.flip(17)
+    assert key1[17] == 1 - bits1[17]
+    assert (key1 ^ key2).popcount() == numpy.sum(bits1 != bits2) + (1 if bits1[17] == bits2[17] else -1)
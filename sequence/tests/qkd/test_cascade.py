@@ -1,10 +1,13 @@
+import numpy as np
+
 from sequence.components.optical_channel import QuantumChannel, ClassicalChannel
 from sequence.kernel.event import Event
 from sequence.kernel.process import Process
 from sequence.kernel.timeline import Timeline
 from sequence.protocol import StackProtocol
 from sequence.qkd.BB84 import pair_bb84_protocols
-from sequence.qkd.cascade import pair_cascade_protocols
+from sequence.qkd.bitkey import BitKey
+from sequence.qkd.cascade import Cascade, pair_cascade_protocols, get_block_indices
 from sequence.topology.node import QKDNode, Node
 
 
@@ -33,10 +36,7 @@ class Parent(StackProtocol):
         pass
 
 
-def test_cascade_run():
-    KEYSIZE = 512
-    KEYNUM = 10
-
+def create_link(keysize, keynum, batch_binary_search=False):
     tl = Timeline(1e11)
 
     alice = QKDNode("alice", tl)
@@ -45,6 +45,8 @@ def test_cascade_run():
     bob.set_seed(0)
     pair_bb84_protocols(alice.protocol_stack[0], bob.protocol_stack[0])
     pair_cascade_protocols(alice.protocol_stack[1], bob.protocol_stack[1])
+    alice.protocol_stack[1].batch_binary_search = batch_binary_search
+    bob.protocol_stack[1].batch_binary_search = batch_binary_search
 
     qc0 = QuantumChannel("qc0", tl, distance=1e3, attenuation=2e-5,
                          polarization_fidelity=0.97)
@@ -58,22 +60,122 @@ def test_cascade_run():
     cc1.set_ends(bob, alice.name)
 
     # Parent
-    pa = Parent(alice, KEYSIZE, KEYNUM)
-    pb = Parent(bob, KEYSIZE, KEYNUM)
+    pa = Parent(alice, keysize, keynum)
+    pb = Parent(bob, keysize, keynum)
     alice.protocol_stack[1].upper_protocols.append(pa)
     pa.lower_protocols.append(alice.protocol_stack[1])
     bob.protocol_stack[1].upper_protocols.append(pb)
     pb.lower_protocols.append(bob.protocol_stack[1])
 
-    process = Process(pa, "push", [])
-    event = Event(0, process)
-    tl.schedule(event)
+    return tl, alice, bob, pa, pb
+
+
+def test_cascade_run():
+    KEYSIZE = 512
+    KEYNUM = 10
+
+    # (events, end time) with sequential and batch binary searches
+    runs = []
+    for batch_binary_search in [False, True]:
+        tl, alice, bob, pa, pb = create_link(KEYSIZE, KEYNUM, batch_binary_search)
+
+        process = Process(pa, "push", [])
+        event = Event(0, process)
+        tl.schedule(event)
+
+        tl.init()
+        tl.run()
+        runs.append((tl.run_counter, tl.now()))
+
+        assert pa.counter == pb.counter == KEYNUM
+        for k1, k2 in zip(pa.keys, pb.keys):
+            assert k1 == k2
+            assert len(k1) == KEYSIZE  # check that key is not too large
+
+        # the estimation sample, the checksums of every frame and the parities of the binary searches are disclosed
+        cascade = alice.protocol_stack[1]
+        checksums = sum(len(table) for table in cascade.checksum_tables[1][1:])
+        frame_num = len(cascade.checksum_tables) - 1
+        assert cascade.estimation_bits == 10000
+        assert cascade.disclosed_bits_counter == bob.protocol_stack[1].disclosed_bits_counter
+        assert cascade.disclosed_bits_counter > cascade.estimation_bits + frame_num * checksums
+        assert alice.protocol_stack[1].error_bit_rate == 0
 
+    # batch searches share the round trips of the blocks of a pass
+    (sequential_events, sequential_end), (batch_events, batch_end) = runs
+    assert batch_events < sequential_events
+    assert batch_end < sequential_end
+
+
+def test_cascade_push_adds_requests():
+    KEYSIZE = 512
+
+    tl, alice, bob, pa, pb = create_link(KEYSIZE, 2)
+    cascade = alice.protocol_stack[1]
+
+    # the second request arrives while the error rate is estimated
+    tl.schedule(Event(0, Process(pa, "push", [])))
+    tl.schedule(Event(1, Process(pa, "push", [])))
     tl.init()
     tl.run()
 
-    assert pa.counter == pb.counter == KEYNUM
-    for k1, k2 in zip(pa.keys, pb.keys):
-        assert k1 == k2
-        assert k1 < 2 ** KEYSIZE  # check that key is not too large
-    assert alice.protocol_stack[1].error_bit_rate == 0
+    assert cascade.state == 1
+    assert pa.counter == pb.counter == 4
+    assert cascade.frame_num == bob.protocol_stack[1].frame_num == 0
+
+    # a request once keys are generated only asks BB84 for its own frames
+    pa.keynum = 1
+    frames = len(cascade.bits)
+    tl.schedule(Event(tl.now() + 1, Process(pa, "push", [])))
+    tl.run()
+
+    assert pa.counter == pb.counter == 5
+    assert pa.keys == pb.keys
+    assert len(cascade.bits) == frames + 1
+
+
+def test_get_block_indices():
+    index_to_block_id, block_id_to_index, bit_orders = get_block_indices(100, 10, 4)
+    assert len(index_to_block_id) == len(block_id_to_index) == 5
+    assert list(index_to_block_id[1][:12]) == [0] * 10 + [1] * 2
+    assert list(block_id_to_index[1][1]) == list(range(10, 20))
+    for pass_id in range(1, 5):
+        block_size = 10 * 2 ** (pass_id - 1)
+        assert len(block_id_to_index[pass_id]) == -(-100 // block_size)
+        for block_id, indices in enumerate(block_id_to_index[pass_id]):
+            assert all(index_to_block_id[pass_id][indices] == block_id)
+
+    # passes with blocks twice as large as the frame are skipped
+    index_to_block_id, _, _ = get_block_indices(100, 50, 4)
+    assert len(index_to_block_id) == 3
+
+    # tables are shared by all protocol instances
+    assert get_block_indices(100, 10, 4) is get_block_indices(100, 10, 4)
+    assert not index_to_block_id[2].flags.writeable
+    assert len(bit_orders) == 5
+    assert not bit_orders[2].flags.writeable
+
+
+def test_cascade_block_parity():
+    cascade = Cascade(None, "cascade")
+    pair_cascade_protocols(Cascade(None, "another"), cascade)
+    cascade.frame_len = 100
+    cascade.k1 = 10
+    rng = np.random.default_rng(0)
+    # key 0 is used to estimate the error rate
+    cascade.bits.append(None)
+    cascade.bits.append(BitKey.from_bits(rng.integers(2, size=100)))
+    cascade.create_checksum_table()
+    key = cascade.bits[1]
+    _, block_id_to_index, _ = get_block_indices(100, 10, 4)
+
+    for pos in [None, 0, 37, 99]:
+        if pos is not None:
+            cascade.flip_bit(1, pos)
+        for pass_id in range(1, 5):
+            for block_id, indices in enumerate(block_id_to_index[pass_id]):
+                assert cascade.checksum_tables[1][pass_id][block_id] == key.parity(indices)
+                for start, end in [(0, len(indices)), (1, 3), (2, 2)]:
+                    assert cascade.block_parity(1, pass_id, block_id, start, end) == key.parity(indices[start:end])
+    # correcting bits discloses nothing, the parities sent do
+    assert cascade.disclosed_bits_counter == cascade.another.disclosed_bits_counter == 0
@@ -0,0 +1,149 @@
+import numpy as np
+
+from sequence.components.optical_channel import QuantumChannel, ClassicalChannel
+from sequence.kernel.event import Event
+from sequence.kernel.process import Process
+from sequence.kernel.timeline import Timeline
+from sequence.protocol import StackProtocol
+from sequence.qkd.BB84 import pair_bb84_protocols
+from sequence.qkd.cascade import Cascade
+from sequence.qkd.ldpc import LDPC, pair_ldpc_protocols, get_code, get_syndrome, decode, select_rate, verification_hash
+from sequence.topology.node import QKDNode, Node
+
+
+# dummy parent class to test ldpc functionality
+class Parent(StackProtocol):
+    def __init__(self, own: "Node", keysize: int, keynum: int):
+        super().__init__(own, "")
+        self.upper_protocols = []
+        self.lower_protocols = []
+        self.keysize = keysize
+        self.keynum = keynum
+        self.keys = []
+        self.counter = 0
+
+    def init(self):
+        pass
+
+    def pop(self, key):
+        self.keys.append(key)
+        self.counter += 1
+
+    def push(self):
+        self.lower_protocols[0].push(self.keysize, self.keynum)
+
+    def received_message(self):
+        pass
+
+
+def test_ldpc_run():
+    KEYSIZE = 512
+    KEYNUM = 10
+
+    tl = Timeline(1e11)
+
+    alice = QKDNode("alice", tl)
+    bob = QKDNode("bob", tl)
+    alice.set_seed(0)
+    bob.set_seed(0)
+    alice.set_protocol_layer(1, LDPC(alice, "alice.ldpc"))
+    bob.set_protocol_layer(1, LDPC(bob, "bob.ldpc"))
+    pair_bb84_protocols(alice.protocol_stack[0], bob.protocol_stack[0])
+    pair_ldpc_protocols(alice.protocol_stack[1], bob.protocol_stack[1])
+
+    qc0 = QuantumChannel("qc0", tl, distance=1e3, attenuation=2e-5,
+                         polarization_fidelity=0.97)
+    qc1 = QuantumChannel("qc1", tl, distance=1e3, attenuation=2e-5,
+                         polarization_fidelity=0.97)
+    qc0.set_ends(alice, bob.name)
+    qc1.set_ends(bob, alice.name)
+    cc0 = ClassicalChannel("cc0", tl, distance=1e3)
+    cc1 = ClassicalChannel("cc1", tl, distance=1e3)
+    cc0.set_ends(alice, bob.name)
+    cc1.set_ends(bob, alice.name)
+
+    # Parent
+    pa = Parent(alice, KEYSIZE, KEYNUM)
+    pb = Parent(bob, KEYSIZE, KEYNUM)
+    alice.set_protocol_layer(2, pa)
+    bob.set_protocol_layer(2, pb)
+
+    process = Process(pa, "push", [])
+    event = Event(0, process)
+    tl.schedule(event)
+
+    tl.init()
+    tl.run()
+
+    # cascade protocols were replaced
+    assert not any(isinstance(p, Cascade) for p in alice.protocols + bob.protocols)
+    assert alice.protocol_stack[0].upper_protocols == [alice.protocol_stack[1]]
+
+    assert pa.counter == pb.counter == KEYNUM
+    for k1, k2 in zip(pa.keys, pb.keys):
+        assert k1 == k2
+        assert len(k1) == KEYSIZE
+    ldpc = alice.protocol_stack[1]
+    assert ldpc.error_bit_rate == 0
+    assert ldpc.disclosed_bits_counter == bob.protocol_stack[1].disclosed_bits_counter > 0
+    assert ldpc.latency is not None
+
+    # the estimation sample, the syndrome and the verification hash of every frame are disclosed
+    num_checks = get_code(ldpc.frame_len, ldpc.rate)[2]
+    frame_num = len(ldpc.bits) - 1
+    assert ldpc.estimation_bits == len(ldpc.bits[0])
+    assert ldpc.disclosed_bits_counter == ldpc.estimation_bits + frame_num * (num_checks + ldpc.verify_len)
+
+    # a frame matching the syndrome but not the hash is discarded
+    receiver = bob.protocol_stack[1]
+    failed_frames = receiver.failed_frames
+    bits = receiver.bits[1].to_bits()
+    receiver.bits.append(receiver.bits[1])
+    receiver.syndromes[len(receiver.bits) - 1] = (get_syndrome(bits, get_code(receiver.frame_len, receiver.rate)),
+                                                  0, verification_hash(bits, 0, receiver.verify_len) ^ 1)
+    receiver.correct_frame(len(receiver.bits) - 1)
+    assert receiver.failed_frames == failed_frames + 1
+
+
+def test_ldpc_decode():
+    frame_len = 2000
+    rng = np.random.default_rng(0)
+    error_rate = 0.02
+    rate = select_rate(error_rate, 1.5)
+    assert 1 - rate >= 1.5 * 0.1414
+
+    code = get_code(frame_len, rate)
+    assert get_code(frame_len, rate) is code
+    assert not code[0].flags.writeable
+    check_ids, bit_ids, num_checks = code
+    assert num_checks == round(frame_len * (1 - rate))
+    # no entry of the matrix is repeated
+    assert len(np.unique(check_ids * frame_len + bit_ids)) == len(bit_ids)
+
+    bits = rng.integers(2, size=frame_len).astype(np.uint8)
+    syndrome = get_syndrome(bits, code)
+    assert len(syndrome) == num_checks
+    errors = np.zeros(frame_len, dtype=np.uint8)
+    errors[rng.choice(frame_len, int(frame_len * error_rate), replace=False)] = 1
+    corrected, success = decode(bits ^ errors, syndrome, error_rate, code)
+    assert success
+    assert np.array_equal(corrected, bits)
+
+    # too many errors for the code
+    errors[rng.choice(frame_len, frame_len // 5, replace=False)] = 1
+    _, success = decode(bits ^ errors, syndrome, error_rate, code, max_iterations=10)
+    assert not success
+
+
+def test_verification_hash():
+    rng = np.random.default_rng(0)
+    bits = rng.integers(2, size=1000, dtype=np.uint8)
+    subsets = np.random.default_rng(1).integers(2, size=(64, 1000), dtype=np.uint8)
+
+    verification = verification_hash(bits, 1, 64)
+    assert len(verification) == 64
+    assert np.array_equal(verification, subsets.astype(int) @ bits % 2)
+
+    # a single bit error changes the hash
+    bits[0] ^= 1
+    assert not np.array_equal(verification_hash(bits, 1, 64), verification)
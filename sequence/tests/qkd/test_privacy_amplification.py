@@ -0,0 +1,134 @@
+import numpy as np
+
+from sequence.components.optical_channel import QuantumChannel, ClassicalChannel
+from sequence.kernel.event import Event
+from sequence.kernel.process import Process
+from sequence.kernel.timeline import Timeline
+from sequence.protocol import StackProtocol
+from sequence.qkd.BB84 import pair_bb84_protocols
+from sequence.qkd.cascade import pair_cascade_protocols
+from sequence.qkd.privacy_amplification import PrivacyAmplification, binary_entropy, pair_pa_protocols, toeplitz_hash
+from sequence.topology.node import QKDNode, Node
+
+
+# dummy parent class to test privacy amplification functionality
+class Parent(StackProtocol):
+    def __init__(self, own: "Node", keysize: int, keynum: int):
+        super().__init__(own, "")
+        self.upper_protocols = []
+        self.lower_protocols = []
+        self.keysize = keysize
+        self.keynum = keynum
+        self.keys = []
+        self.times = []
+        self.counter = 0
+
+    def init(self):
+        pass
+
+    def pop(self, key):
+        self.keys.append(key)
+        self.times.append(self.own.timeline.now())
+        self.counter += 1
+
+    def push(self):
+        self.lower_protocols[0].push(self.keysize, self.keynum)
+
+    def received_message(self):
+        pass
+
+
+def test_toeplitz_hash():
+    rng = np.random.default_rng(0)
+    n, m = 50, 20
+    bits = rng.integers(2, size=n, dtype=np.uint8)
+    seed = rng.integers(2, size=n + m - 1, dtype=np.uint8)
+
+    rows, cols = np.indices((m, n))
+    matrix = seed[rows - cols + n - 1]
+    assert np.array_equal(toeplitz_hash(bits, seed), matrix @ bits % 2)
+
+    # large frames do not lose precision
+    n, m = 200000, 100000
+    bits = np.ones(n, dtype=np.uint8)
+    seed = np.ones(n + m - 1, dtype=np.uint8)
+    assert np.array_equal(toeplitz_hash(bits, seed), np.zeros(m))
+
+    assert len(toeplitz_hash(bits, seed[:n - 1])) == 0
+
+
+def test_privacy_amplification_run():
+    KEYSIZE = 512
+    KEYNUM = 4
+
+    tl = Timeline(1e11)
+
+    alice = QKDNode("alice", tl)
+    bob = QKDNode("bob", tl)
+    alice.set_seed(0)
+    bob.set_seed(0)
+    alice.set_protocol_layer(3, PrivacyAmplification(alice, "alice.pa"))
+    bob.set_protocol_layer(3, PrivacyAmplification(bob, "bob.pa"))
+    pair_bb84_protocols(alice.protocol_stack[0], bob.protocol_stack[0])
+    pair_cascade_protocols(alice.protocol_stack[1], bob.protocol_stack[1])
+    pair_pa_protocols(alice.protocol_stack[3], bob.protocol_stack[3])
+
+    qc0 = QuantumChannel("qc0", tl, distance=1e3, attenuation=2e-5,
+                         polarization_fidelity=0.97)
+    qc1 = QuantumChannel("qc1", tl, distance=1e3, attenuation=2e-5,
+                         polarization_fidelity=0.97)
+    qc0.set_ends(alice, bob.name)
+    qc1.set_ends(bob, alice.name)
+    cc0 = ClassicalChannel("cc0", tl, distance=1e3)
+    cc1 = ClassicalChannel("cc1", tl, distance=1e3)
+    cc0.set_ends(alice, bob.name)
+    cc1.set_ends(bob, alice.name)
+
+    # Parent
+    pa = Parent(alice, KEYSIZE, KEYNUM)
+    pb = Parent(bob, KEYSIZE, KEYNUM)
+    alice.set_protocol_layer(4, pa)
+    bob.set_protocol_layer(4, pb)
+    assert alice.protocol_stack[1].upper_protocols == [alice.protocol_stack[3]]
+
+    process = Process(pa, "push", [])
+    event = Event(0, process)
+    tl.schedule(event)
+
+    tl.init()
+    tl.run()
+
+    assert pa.counter == pb.counter == KEYNUM
+    for k1, k2 in zip(pa.keys, pb.keys):
+        assert k1 == k2
+        assert len(k1) == KEYSIZE
+    # secret keys are not the corrected keys
+    assert pa.keys[0] != alice.protocol_stack[1].valid_keys[0][:KEYSIZE]
+
+    cascade = alice.protocol_stack[1]
+    privacy_amplification = alice.protocol_stack[3]
+    # every parity disclosed by cascade for the frame is removed, the estimation sample is a frame of its own
+    n = privacy_amplification.input_bits
+    leak = privacy_amplification.disclosed_bits
+    assert leak == cascade.disclosed_bits_counter - cascade.estimation_bits
+    assert leak > sum(len(table) for table in cascade.checksum_tables[1][1:])
+    bound = 1 - binary_entropy(cascade.error_rate) - leak / n - privacy_amplification.secure_params / n
+    assert bound - 1 / n < privacy_amplification.compression_ratio <= bound
+
+    # the receiver gets each key one classical channel delay after the sender
+    for t1, t2 in zip(pa.times, pb.times):
+        assert t2 >= t1 + cc0.delay
+
+    # one frame holds the secret bits of more than KEYNUM keys
+    assert len(privacy_amplification.frames) == 1
+    assert len(privacy_amplification.key_bits) >= KEYSIZE
+
+    # the next key is served from the secret bits left over, without new frames
+    process = Process(pa, "push", [])
+    pa.keynum = 1
+    tl.schedule(Event(tl.now() + 1, process))
+    tl.run()
+
+    assert pa.counter == pb.counter == KEYNUM + 1
+    assert pa.keys[-1] == pb.keys[-1]
+    assert len(privacy_amplification.frames) == len(bob.protocol_stack[3].frames) == 1
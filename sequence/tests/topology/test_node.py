@@ -1,6 +1,9 @@
+import numpy as np
+
 from sequence.components.optical_channel import ClassicalChannel, QuantumChannel
 from sequence.kernel.timeline import Timeline
-from sequence.topology.node import Node, QuantumRouter, BSMNode
+from sequence.topology.node import Node, QuantumRouter, BSMNode, QKDNode
+from sequence.utils.encoding import time_bin
 
 
 def test_Node_assign_cchannel():
@@ -102,3 +105,21 @@ def test_Node_send_qubit():
     expect_rate_1 = 1 - qc1.loss
     assert abs(len(node1.log) / 1000 - expect_rate_1) < 0.1
     assert abs(len(node2.log) / 1000 - expect_rate_0) < 0.1
+
+
+def test_QKDNode_get_bits():
+    tl = Timeline()
+    node = QKDNode("node", tl)
+    qsdetector = node.components["node.qsdetector"]
+    qsdetector.trigger_times = [[0, 2000, 3000], [1000, 3000, 7000]]
+    bits = node.get_bits(5e-9, 0, 1e9, "node.qsdetector")
+    assert bits.dtype == np.int8
+    # clicks of both detectors give an invalid bit, late clicks are out of range
+    assert list(bits) == [0, 1, 0, -1, -1]
+
+    node = QKDNode("node2", tl, encoding=time_bin)
+    qsdetector = node.components["node2.qsdetector"]
+    separation = time_bin["bin_separation"]
+    qsdetector.trigger_times = [[0, 100000 + separation], [200000 + separation], [separation, 300000 + separation]]
+    bits = node.get_bits(5e-7, 0, 1e7, "node2.qsdetector")
+    assert list(bits) == [-1, 1, 0, 1, -1]
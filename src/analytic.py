@@ -0,0 +1,146 @@
+import math
+
+# sequence modules
+from sequence.topology.node import Node
+from sequence.protocol import StackProtocol
+from sequence.kernel.event import Event
+from sequence.kernel.process import Process
+from sequence.qkd.bitkey import BitKey
+
+
+def pair_analytic_protocols(sender, receiver):
+    sender.another = receiver
+    receiver.another = sender
+    sender.role = 0
+    receiver.role = 1
+
+
+class AnalyticQKD(StackProtocol):
+
+    def __init__(self, own, name, frequency=8e7, mean_photon_num=0.1,
+                 efficiency=0.9, dark_count=0, count_rate=int(25e6)):
+        super().__init__(own, name)
+        self.role = -1
+        self.another = None
+
+        # light source and detector parameters, same defaults of sequence
+        self.frequency = frequency
+        self.mean_photon_num = mean_photon_num
+        self.efficiency = efficiency
+        self.dark_count = dark_count
+        self.count_rate = count_rate
+
+        # bits sifted per frame and by the error rate estimation of cascade
+        self.frame_len = 10240
+        self.setup_len = 10000
+
+        self.state = 0
+        self.working = False
+        self.keylen = 0
+        self.frame_num = 0
+
+        # metrics, same names of bb84 and cascade
+        self.throughput = 0
+        self.error_bit_rate = 0
+        self.latency = 0
+        self.setup_time = 0
+        self.start_time = 0
+        self.throughputs = []
+        self.error_rates = []
+
+    def _click_probabilities(self):
+        qchannel = self.own.qchannels[self.another.own.name]
+        transmittance = 10 ** (qchannel.distance * qchannel.attenuation / -10)
+
+        signal = 1 - math.exp(
+            -self.mean_photon_num * transmittance * self.efficiency)
+        # dark counts of both detectors within a pulse period
+        dark = 1 - math.exp(-2 * self.dark_count / self.frequency)
+        return signal, dark, signal + dark - signal * dark
+
+    # sifted key bits per second, half of the detections share the basis
+    def key_rate(self):
+        _, _, click = self._click_probabilities()
+        click_rate = self.frequency * click
+        # non paralyzable dead time of the detectors
+        click_rate = click_rate / (1 + click_rate / self.count_rate)
+        return click_rate / 2
+
+    # depolarized photons and dark counts give a random bit
+    def qber(self):
+        signal, dark, click = self._click_probabilities()
+        if click == 0:
+            return 0
+        fidelity = self.own.qchannels[
+            self.another.own.name].polarization_fidelity
+        return ((1 - fidelity) / 2 * signal + dark / 2) / click
+
+    def push(self, keylen, frame_num=math.inf, run_time=math.inf):
+        if self.role != 0:
+            raise AssertionError("generate key must be called from Alice")
+
+        rate = self.key_rate()
+        if rate == 0:
+            return
+
+        # requests add up while frames are generated
+        self.keylen = keylen
+        self.frame_num += frame_num
+
+        # like cascade, the first request also estimates the error rate
+        delay = 0
+        if self.state == 0:
+            self.state = 1
+            self.setup_time = self.own.timeline.now()
+            delay = self.setup_len / rate
+
+        if not self.working:
+            self.working = True
+            self.start_time = self.own.timeline.now()
+            self._schedule_frame(delay + self.frame_len / rate)
+
+    def _schedule_frame(self, seconds):
+        process = Process(self, "end_frame", [])
+        time = self.own.timeline.now() + int(round(seconds * 1e12))
+        self.own.timeline.schedule(Event(time, process))
+
+    # corrected keys of a frame reach both key managers at the same time
+    def end_frame(self):
+        rate = self.key_rate()
+        qber = self.qber()
+        nbytes = (self.keylen + 7) // 8
+
+        for _ in range(min(self.frame_num, self.frame_len // self.keylen)):
+            key = BitKey.from_bytes(self.own.get_generator().bytes(nbytes),
+                                    self.keylen)
+            self._pop(key=key)
+            self.another._pop(key=key)
+            self.frame_num -= 1
+
+        for protocol in [self, self.another]:
+            protocol.throughput = rate
+            protocol.latency = self.frame_len / rate
+            protocol.throughputs.append(rate)
+            protocol.error_rates.append(qber)
+
+        if self.frame_num > 0:
+            self._schedule_frame(self.frame_len / rate)
+        else:
+            self.working = False
+
+    def pop(self, **kwargs):
+        pass
+
+    def received_message(self, src, msg):
+        return False
+
+
+class AnalyticQKDNode(Node):
+
+    def __init__(self, name, timeline, **kwargs):
+        super().__init__(name, timeline)
+        protocol = AnalyticQKD(self, name + ".analytic", **kwargs)
+        self.protocols.append(protocol)
+
+        # the analytic protocol stands for both sifting and error correction
+        self.protocol_stack = [protocol, protocol, None, None, None]
@@ -0,0 +1,159 @@
+import os
+import json
+import hashlib
+
+# sequence modules
+from sequence.topology.node import QKDNode
+from sequence.qkd.ldpc import LDPC
+
+# bump when the key generation of the links changes
+CACHE_VERSION = 2
+
+
+def link_params(sender, receiver, key_size, num_keys, seed):
+    qchannel = sender.qchannels[receiver.name]
+    lightsource = sender.components[sender.name + ".lightsource"]
+    qsdetector = receiver.components[receiver.name + ".qsdetector"]
+    error_correction = sender.protocol_stack[1]
+    pa = sender.protocol_stack[3]
+
+    if isinstance(error_correction, LDPC):
+        error_correction_params = ["ldpc", error_correction.efficiency,
+                                   error_correction.max_iterations,
+                                   error_correction.verify_len]
+    else:
+        error_correction_params = ["cascade", error_correction.w]
+    error_correction_params.append(error_correction.frame_len)
+
+    return {
+        "version": CACHE_VERSION,
+        "qchannel": [qchannel.attenuation, qchannel.distance,
+                     qchannel.polarization_fidelity, qchannel.light_speed,
+                     qchannel.frequency],
+        "cchannels": [sender.cchannels[receiver.name].delay,
+                      receiver.cchannels[sender.name].delay],
+        "lightsource": [lightsource.frequency, lightsource.wavelength,
+                        lightsource.mean_photon_num, lightsource.phase_error,
+                        lightsource.encoding_type["name"],
+                        lightsource.pulse_train],
+        "detectors": [[d.efficiency, d.dark_count, d.count_rate,
+                       d.time_resolution] for d in qsdetector.detectors],
+        "error_correction": error_correction_params,
+        "privacy_amplification": pa.secure_params if pa is not None else None,
+        "key_size": key_size,
+        "num_keys": num_keys,
+        "seed": seed,
+    }
+
+
+class KeyCache():
+
+    def __init__(self, directory, max_bytes=64 * 2**20, seed=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        # seed of the global random generators, None if not seeded
+        self.seed = seed
+        # links recording their warm up key streams during the run
+        self.recording = []
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".keys")
+
+    def link_key(self, sender, receiver, key_size, num_keys):
+        params = link_params(sender, receiver, key_size, num_keys, self.seed)
+        data = json.dumps(params, sort_keys=True).encode()
+        return hashlib.sha256(data).hexdigest()
+
+    # entries are a sha256 digest line followed by the json payload
+    def load(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                digest = f.readline().strip().decode()
+                payload = f.read()
+        except FileNotFoundError:
+            return None
+
+        if hashlib.sha256(payload).hexdigest() != digest:
+            os.remove(path)
+            return None
+
+        # recently used entries are the last to be evicted
+        os.utime(path)
+        return json.loads(payload)
+
+    def store(self, key, entry):
+        payload = json.dumps(entry).encode()
+        digest = hashlib.sha256(payload).hexdigest().encode()
+
+        # write and rename, concurrent runs never read a partial entry
+        path = self._path(key)
+        tmp_path = path + "." + str(os.getpid())
+        with open(tmp_path, 'wb') as f:
+            f.write(digest + b"\n" + payload)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".keys"):
+                continue
+            stat = os.stat(os.path.join(self.directory, name))
+            entries.append((stat.st_mtime, stat.st_size, name))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            os.remove(os.path.join(self.directory, name))
+            total -= size
+
+    # replay the warm up keys of a link, otherwise record them for next runs
+    def replay(self, senderkm, receiverkm):
+        sender = senderkm.lower_protocols[0].own
+        receiver = receiverkm.lower_protocols[0].own
+        # analytic links are cheaper to run than to cache
+        if not isinstance(sender, QKDNode):
+            return False
+
+        key = self.link_key(sender, receiver, senderkm.keysize,
+                            senderkm.num_keys)
+        entry = self.load(key)
+        if entry is None:
+            senderkm.record()
+            receiverkm.record()
+            self.recording.append((key, senderkm, receiverkm))
+            return False
+
+        senderkm.replay(entry["sender"])
+        receiverkm.replay(entry["receiver"])
+
+        # the error rate is still estimated, without keys, so that later
+        # requests on the link find the error correction set up as in the
+        # recorded run. privacy amplification requests whole frames
+        error_correction = sender.protocol_stack[1]
+        keylen = senderkm.keysize if sender.protocol_stack[3] is None \
+            else error_correction.frame_len
+        error_correction.push(keylen, 0)
+        return True
+
+    # store the streams completed before any other request on the link
+    def store_recorded(self):
+        for key, senderkm, receiverkm in self.recording:
+            start = senderkm.request_times[0]
+            end = senderkm.request_times[1] \
+                if len(senderkm.request_times) > 1 else None
+
+            entry = {}
+            for role, km in [("sender", senderkm), ("receiver", receiverkm)]:
+                stream = [[time - start, int(k)] for time, k in km.recording
+                          if end is None or time < end]
+                if len(stream) < km.num_keys:
+                    break
+                entry[role] = stream[:km.num_keys]
+            else:
+                self.store(key, entry)
+
+        self.recording = []
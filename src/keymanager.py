@@ -1,3 +1,95 @@
+from sequence.kernel.event import Event
+from sequence.kernel.process import Process
+from sequence.qkd.bitkey import BitKey
+from keys_exception import NoMoreKeysException
+
+
+class KeyPool():
+
+    def __init__(self, capacity=1024):
+        # ring buffer of packed key material
+        self.buffer = bytearray(capacity)
+        self.head = 0
+        self.size = 0
+
+        # bits that do not fill a whole byte yet
+        self.pending = 0
+        self.pending_bits = 0
+
+        # accounting
+        self.generated_bits = 0
+        self.consumed_bits = 0
+
+    def __len__(self):
+        return self.size
+
+    def remaining_bits(self):
+        return self.size * 8 + self.pending_bits
+
+    def push(self, key: BitKey):
+        bits = len(key)
+        self.generated_bits += bits
+        # key bits are packed least significant bit first, like BitKey, so
+        # whole bytes are copied as they are
+        if self.pending_bits == 0 and bits % 8 == 0:
+            self._write(key.to_bytes())
+            return
+
+        self.pending |= int(key) << self.pending_bits
+        self.pending_bits += bits
+
+        nbytes = self.pending_bits // 8
+        if nbytes == 0:
+            return
+        self.pending_bits -= nbytes * 8
+        data = (self.pending & ((1 << nbytes * 8) - 1)).to_bytes(nbytes, "little")
+        self.pending >>= nbytes * 8
+        self._write(data)
+
+    def consume(self, nbytes: int) -> bytes:
+        if nbytes > self.size:
+            raise NoMoreKeysException
+
+        end = self.head + nbytes
+        capacity = len(self.buffer)
+        view = memoryview(self.buffer)
+        if end <= capacity:
+            data = bytes(view[self.head:end])
+        else:
+            data = bytes(view[self.head:]) + bytes(view[:end - capacity])
+        view.release()
+
+        self.head = end % capacity
+        self.size -= nbytes
+        self.consumed_bits += nbytes * 8
+        return data
+
+    def _write(self, data: bytes):
+        if self.size + len(data) > len(self.buffer):
+            self._grow(self.size + len(data))
+
+        capacity = len(self.buffer)
+        tail = (self.head + self.size) % capacity
+        first = min(len(data), capacity - tail)
+        self.buffer[tail:tail + first] = data[:first]
+        self.buffer[:len(data) - first] = data[first:]
+        self.size += len(data)
+
+    def _grow(self, min_capacity: int):
+        capacity = len(self.buffer)
+        while capacity < min_capacity:
+            capacity *= 2
+
+        # unroll the stored bytes at the start of the new buffer
+        size = self.size
+        data = self.consume(size)
+        self.consumed_bits -= size * 8
+        self.buffer = bytearray(capacity)
+        self.head = 0
+        self.buffer[:size] = data
+        self.size = size
+
+
 class KeyManager():
 
     def __init__(self, timeline, keysize, num_keys):
@@ -5,19 +97,75 @@ class KeyManager():
         self.lower_protocols = []
         self.keysize = keysize
         self.num_keys = num_keys
-        self.keys = []
+        self.pool = KeyPool()
         self.times = []
+        self.request_times = []
+        self.observers = []
+        # (time, key) of every key received, only when recording for the cache
+        self.recording = None
+
+    def attach(self, observer):
+        if observer not in self.observers:
+            self.observers.append(observer)
+
+    # notify observers when the pool empties or refills, and of every key
+    def notify(self, info):
+        for observer in self.observers:
+            observer.update(self, info)
 
     # interface with cascade protocol
-    def send_request(self):
+    def send_request(self, num_keys=None):
+        if num_keys is None:
+            num_keys = self.num_keys
+        self.request_times.append(self.timeline.now())
         for p in self.lower_protocols:
-            p.push(self.keysize, self.num_keys)
+            p.push(self.keysize, num_keys)
 
     # get keys from cascade protocol
     def pop(self, key):
-        self.keys.append(key)
+        had_key = self.has_key()
+        self.pool.push(key)
         self.times.append(self.timeline.now() * 1e-9)
+        if self.recording is not None:
+            self.recording.append((self.timeline.now(), key))
+        if not had_key and self.has_key():
+            self.notify({"has_key": True})
+        self.notify({"has_key": self.has_key(), "received": len(self.times)})
+
+    def record(self):
+        self.recording = []
+
+    # schedule keys cached from a previous run, times relative to now.
+    # keys of one frame share a time, the priority keeps them in order
+    def replay(self, stream):
+        for i, (time, key) in enumerate(stream):
+            key = BitKey.from_int(key, self.keysize)
+            process = Process(self, "pop", [key])
+            self.timeline.schedule(
+                Event(self.timeline.now() + time, process, i))
+
+    def consume(self) -> bytes:
+        return self.consume_bits(self.keysize)
+
+    # bulk consume for messages longer than one key
+    def consume_bits(self, bits: int) -> bytes:
+        had_key = self.has_key()
+        key = self.pool.consume((bits + 7) // 8)
+        if had_key and not self.has_key():
+            self.notify({"has_key": False})
+        return key
+
+    def has_key(self) -> bool:
+        return len(self.pool) >= (self.keysize + 7) // 8
+
+    def remaining_keys(self) -> int:
+        return self.pool.remaining_bits() // self.keysize
+
+    def generated_bits(self) -> int:
+        return self.pool.generated_bits
+
+    def consumed_bits(self) -> int:
+        return self.pool.consumed_bits
 
-    def consume(self) -> str:
-        key_format = "{0:0" + str(self.keysize) + "b}"
-        return key_format.format(self.keys.pop(0))
+    def remaining_bits(self) -> int:
+        return self.pool.remaining_bits()
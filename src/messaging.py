@@ -1,10 +1,13 @@
 from enum import Enum, auto
-import json
+import struct
+import numpy
 from sequence.topology.node import Node
 from sequence.protocol import Protocol
 from sequence.message import Message
-import onetimepad
-from colorama import Fore
+from keys_exception import NoMoreKeysException
+
+# fixed packet header: destination node name and payload length in bytes
+HEADER = struct.Struct("!16sI")
 
 
 class MsgType(Enum):
@@ -12,6 +15,29 @@ class MsgType(Enum):
     TEXT_MESS = auto()
 
 
+def pack_packet(dest: str, payload: bytes) -> bytearray:
+    name = dest.encode()
+    if len(name) > 16:
+        raise ValueError(f"destination name {dest} longer than 16 bytes")
+
+    packet = bytearray(HEADER.size + len(payload))
+    HEADER.pack_into(packet, 0, name, len(payload))
+    packet[HEADER.size:] = payload
+    return packet
+
+
+def unpack_header(packet: bytearray):
+    name, length = HEADER.unpack_from(packet)
+    return name.rstrip(b"\0").decode(), length
+
+
+# one time pad applied in place, the key holds one byte per payload byte
+def xor_payload(packet: bytearray, key: bytes):
+    payload = numpy.frombuffer(packet, dtype=numpy.uint8, offset=HEADER.size)
+    numpy.bitwise_xor(payload, numpy.frombuffer(key, dtype=numpy.uint8),
+                      out=payload)
+
+
 class MessagingProtocol(Protocol):
 
     def __init__(
@@ -28,43 +54,58 @@ class MessagingProtocol(Protocol):
     def init(self):
         pass
 
-    def start(self, text: str, key: str):
-        message = json.loads(text)
-        ciphertext = onetimepad.encrypt(message["payload"], key)
-        message["payload"] = ciphertext
+    def start(self, packet: bytearray, key: bytes):
+        xor_payload(packet, key)
         new_msg = Message(MsgType.TEXT_MESS, self.other_name)
-        new_msg.payload = json.dumps(message)
+        new_msg.payload = packet
         new_msg.protocol_type = type(self)
+        new_msg.sent_time = self.own.timeline.now()
         self.own.send_message(self.other_node, new_msg)
 
     def received_message(self, src: str, msg: Message):
         assert msg.msg_type == MsgType.TEXT_MESS
 
-        packet = json.loads(msg.payload)
-        plaintext = onetimepad.decrypt(packet["payload"], self.key_manager.consume())
-
-        if packet["dest"] == self.super_qkd.name:
-            print(f"{Fore.LIGHTMAGENTA_EX}[{self.own.name}]{Fore.RESET}")
-            print(f"Received: {Fore.LIGHTGREEN_EX}TEXT Message{Fore.RESET}")
-            print(
-                f"At Simulation Time: {Fore.LIGHTCYAN_EX}"
-                f" {self.own.timeline.now() * (10 ** -12)} s{Fore.RESET}")
-            print(
-                f"Encrypted Message: {Fore.LIGHTYELLOW_EX}{packet['payload']}{Fore.RESET}")
-            print(
-                f"Decrypted Message: {Fore.LIGHTYELLOW_EX}{plaintext}{Fore.RESET}")
-
-        # message forwarding
+        packet = msg.payload
+        dest, length = unpack_header(packet)
+        # the pool of the receiver can lag behind the one of the sender
+        try:
+            key = self.key_manager.consume_bits(length * 8)
+        except NoMoreKeysException:
+            self.super_qkd.notify({"type": "dropped",
+                                   "time": self.own.timeline.now(),
+                                   "dest": dest,
+                                   "length": length,
+                                   "payload": None})
+            return
+        xor_payload(packet, key)
+        latency = self.own.timeline.now() - msg.sent_time
+
+        if dest == self.super_qkd.name:
+            self.super_qkd.notify({"type": "delivered",
+                                   "time": self.own.timeline.now(),
+                                   "dest": dest,
+                                   "length": length,
+                                   "link": src,
+                                   "latency": latency,
+                                   "payload": memoryview(packet)[HEADER.size:]})
+
+        # message forwarding, the packet is encrypted again in place
         else:
-            packet["payload"] = plaintext
-            print(f"{Fore.LIGHTMAGENTA_EX}[{self.own.name}]{Fore.RESET}")
-            print(f"Received: {Fore.LIGHTGREEN_EX}TEXT Message{Fore.RESET}")
-            print(
-                f"At Simulation Time: {Fore.LIGHTCYAN_EX}"
-                f" {self.own.timeline.now() * (10 ** -12)} s{Fore.RESET}")
-            print(f"{Fore.LIGHTBLUE_EX}[Forwarding...]{Fore.RESET}\n")
-            self.super_qkd.sendMessage(self.own.timeline, packet["dest"],
-                                       json.dumps(packet))
+            self.super_qkd.notify({"type": "forwarded",
+                                   "time": self.own.timeline.now(),
+                                   "dest": dest,
+                                   "length": length,
+                                   "link": src,
+                                   "latency": latency,
+                                   "payload": None})
+            try:
+                self.super_qkd.sendMessage(self.own.timeline, dest, packet)
+            except NoMoreKeysException:
+                self.super_qkd.notify({"type": "dropped",
+                                       "time": self.own.timeline.now(),
+                                       "dest": dest,
+                                       "length": length,
+                                       "payload": None})
 
     def add_key_manager(self, key_manager):
         self.key_manager = key_manager
@@ -0,0 +1,107 @@
+import math
+import numpy
+
+# sequence modules
+from sequence.kernel.entity import Entity
+from sequence.kernel.event import Event
+from sequence.kernel.process import Process
+
+SAMPLE_FIELDS = ["time", "link", "generated_bits", "key_rate", "pool_bits",
+                 "qber", "messages", "hop_latency"]
+LATENCY_FIELDS = ["time", "link", "latency"]
+
+
+class MetricsRegistry(Entity):
+
+    def __init__(self, name, timeline, sim_nodes, interval):
+        Entity.__init__(self, name, timeline)
+        self.sim_nodes = sim_nodes
+        # sampling interval in picoseconds
+        self.interval = interval
+
+        # columns of the link samples and of the per hop latencies
+        self.samples = {field: [] for field in SAMPLE_FIELDS}
+        self.latencies = {field: [] for field in LATENCY_FIELDS}
+
+        # per link state since the previous sample
+        self.last_time = 0
+        self.last_generated = {}
+        self.last_error_rate = {}
+        self.hop_latencies = {}
+
+        # hop latencies are reported by the super nodes
+        for super_node in sim_nodes.values():
+            super_node.attach(self)
+
+    def init(self):
+        self.last_time = self.timeline.now()
+        self._schedule_sample()
+
+    def _schedule_sample(self):
+        time = self.timeline.now() + self.interval
+        if time < self.timeline.stop_time:
+            process = Process(self, "sample", [])
+            self.timeline.schedule(Event(int(time), process))
+
+    # one row per link every interval, then reschedule the next sample
+    def sample(self):
+        now = self.timeline.now()
+        elapsed = (now - self.last_time) * 1e-12
+
+        for super_node in self.sim_nodes.values():
+            for sr_node in super_node.srqkdnodes.values():
+                self._sample_link(sr_node, now, elapsed)
+
+        self.last_time = now
+        self._schedule_sample()
+
+    def _sample_link(self, sr_node, now, elapsed):
+        link = sr_node.sender.name
+        km = sr_node.senderkm
+        generated = km.generated_bits()
+        key_rate = (generated - self.last_generated.get(link, 0)) / elapsed
+        self.last_generated[link] = generated
+
+        # mean QBER of the BB84 keys generated since the previous sample
+        error_rates = sr_node.sender.protocol_stack[0].error_rates
+        first = self.last_error_rate.get(link, 0)
+        qber = numpy.mean(error_rates[first:]) \
+            if len(error_rates) > first else math.nan
+        self.last_error_rate[link] = len(error_rates)
+
+        latencies = self.hop_latencies.pop(link, [])
+        hop_latency = numpy.mean(latencies) if latencies else math.nan
+
+        row = [now, link, generated, key_rate, km.remaining_bits(), qber,
+               len(latencies), hop_latency]
+        for field, value in zip(SAMPLE_FIELDS, row):
+            self.samples[field].append(value)
+
+    # hop latency of every message received by a super node
+    def update(self, super_node, info):
+        if "latency" not in info:
+            return
+        link = info["link"]
+        latency = info["latency"] * 1e-12
+        self.hop_latencies.setdefault(link, []).append(latency)
+
+        row = [info["time"], link, latency]
+        for field, value in zip(LATENCY_FIELDS, row):
+            self.latencies[field].append(value)
+
+    # one compressed array per column, the two tables share the file
+    def export(self, filepath):
+        columns = {}
+        for field, values in self.samples.items():
+            columns["samples_" + field] = numpy.array(values)
+        for field, values in self.latencies.items():
+            columns["latencies_" + field] = numpy.array(values)
+        numpy.savez_compressed(filepath, **columns)
+
+
+def read_metrics(filepath):
+    with numpy.load(filepath) as data:
+        samples = {field: data["samples_" + field] for field in SAMPLE_FIELDS}
+        latencies = {field: data["latencies_" + field]
+                     for field in LATENCY_FIELDS}
+    return samples, latencies
@@ -1,5 +1,5 @@
-import re
-from networkx import DiGraph, exception, shortest_path
+from math import inf
+from networkx import DiGraph, single_source_dijkstra
 from colorama import Fore
 
 
@@ -7,38 +7,68 @@ class NewQKDTopo():
 
     def __init__(self, sim_nodes):
         self.sim_nodes = sim_nodes
+        self.graph = DiGraph()
+        # key manager of each link -> (src, dst)
+        self.links = {}
+        # shortest path distances from every source node
+        self.distances = {}
 
     def gen_forward_tables(self):
-        graph = DiGraph()
-        for n in self.sim_nodes.keys():
-            graph.add_node(n)
+        self.graph = DiGraph()
+        self.graph.add_nodes_from(self.sim_nodes.keys())
 
-        edges = []
+        for n, super_node in self.sim_nodes.items():
+            for dst, srqkdnode in super_node.srqkdnodes.items():
+                km = srqkdnode.senderkm
+                if km not in self.links:
+                    self.links[km] = (n, dst)
+                    km.attach(self)
 
-        for n in graph.nodes:
-            for srqkdnode in self.sim_nodes[n].srqkdnodes.values():
-                dst = re.search('to (.+?).sender',
-                                srqkdnode.sender.name).group(1)
-                cc = srqkdnode.sender.cchannels[dst + " to " + n + ".receiver"]
+                if km.has_key():
+                    self.graph.add_edge(n, dst, weight=self._weight(n, dst))
 
-                n_keys = srqkdnode.senderkm.keys
+        for src in self.graph.nodes:
+            self._update_source(src)
 
-                if len(n_keys) > 0:
-                    edges.append((n, dst, {"weight": cc.distance}))
+    # called by the key managers when a link pool empties or refills
+    def update(self, key_manager, info):
+        if key_manager not in self.links:
+            return
+        src, dst = self.links[key_manager]
 
-        graph.add_edges_from(edges)
+        if info["has_key"]:
+            if self.graph.has_edge(src, dst):
+                return
+            weight = self._weight(src, dst)
+            self.graph.add_edge(src, dst, weight=weight)
+            # only the sources reaching dst faster through the new link change
+            affected = [s for s, d in self.distances.items()
+                        if d.get(src, inf) + weight < d.get(dst, inf)]
+        else:
+            if not self.graph.has_edge(src, dst):
+                return
+            self.graph.remove_edge(src, dst)
+            # routes form a shortest path tree, so the link is in use by a
+            # source only if the route towards dst ends with it
+            affected = []
+            for s in self.graph.nodes:
+                path = self.sim_nodes[s].routing_table.get(dst)
+                if path is not None and len(path) > 1 and path[-2] == src:
+                    affected.append(s)
 
-        for src in graph.nodes:
-            for dst in graph.nodes:
-                if src == dst:
-                    continue
-                try:
-                    path = shortest_path(
-                        graph, source=src, target=dst, weight="weight")
-                    self.sim_nodes[src].routing_table[dst] = path
+        for s in affected:
+            self._update_source(s)
 
-                except exception.NetworkXNoPath:
-                    pass
+    def _weight(self, src, dst):
+        srqkdnode = self.sim_nodes[src].srqkdnodes[dst]
+        return srqkdnode.sender.cchannels[dst + " to " + src + ".receiver"].distance
+
+    def _update_source(self, src):
+        distances, paths = single_source_dijkstra(
+            self.graph, src, weight="weight")
+        del paths[src]
+        self.distances[src] = distances
+        self.sim_nodes[src].routing_table = paths
 
     def print_tables(self):
         for n in self.sim_nodes:
@@ -3,11 +3,11 @@ import os
 import getopt
 import time
 from datetime import datetime
-import matplotlib.pyplot as plt
 import networkx as nx
 import json
 from colorama import Fore
 import random
+import numpy
 
 # sequence modules
 from sequence.kernel.timeline import Timeline
@@ -15,17 +15,22 @@ from sequence.topology.node import QKDNode
 from sequence.components.optical_channel import QuantumChannel, ClassicalChannel
 from sequence.qkd.BB84 import pair_bb84_protocols
 from sequence.qkd.cascade import pair_cascade_protocols
-from sequence.topology.qkd_topo import QKDTopo
+from sequence.qkd.ldpc import LDPC, pair_ldpc_protocols
+from sequence.qkd.privacy_amplification import PrivacyAmplification, \
+    pair_pa_protocols
 
 # netsecqkd modules
-from netparser import netparse
 from superqkdnode import SuperQKDNode
 from srqkdnode import SRQKDNode
 from newqkdtopo import NewQKDTopo
 from messaging import MessagingProtocol
 from keymanager import KeyManager
-from logger import Logger
-from keys_exception import NoMoreKeysException
+from metrics import MetricsRegistry
+from analytic import AnalyticQKDNode, pair_analytic_protocols
+from keycache import KeyCache
+from render import draw_in_background
+from results import NullSink, ResultSink, read_records, render_report
+from traffic import TrafficGenerator
 
 
 def gen_network(filepath, nodes_number):
@@ -37,105 +42,143 @@ def gen_network(filepath, nodes_number):
     return G
 
 
-def draw_to_file(graph, filepath):
-    pos = nx.kamada_kawai_layout(graph)
-    nx.draw_networkx_nodes(graph, pos, node_size=50, margins=0.01)
-    nx.draw_networkx_labels(graph, pos, font_size=5, font_color='w')
-    nx.draw_networkx_edges(graph, pos, width=0.5)
-    plt.savefig(filepath, dpi=500, orientation='landscape',
-                bbox_inches='tight')
+def load_graph(filepath):
+    with open(filepath, 'r') as f:
+        return nx.readwrite.json_graph.node_link_graph(json.load(f))
 
 
-def read_config(filepath):
-    return QKDTopo(filepath)
+def add_link(sim_nodes, timeline, source, dest, distance, attenuation,
+             fidelity, analytic=False, pulse_train=True,
+             privacy_amplification=False, ldpc=False):
+    # analytic links deliver keys at the expected rate without photons
+    node_type = AnalyticQKDNode if analytic else QKDNode
 
+    sender_name = source + " to " + dest + ".sender"
+    sender = node_type(sender_name, timeline)
 
-def gen_topology(network, timeline, fidelity):
-    sim_nodes = {}
+    receiver_name = source + " to " + dest + ".receiver"
+    receiver = node_type(receiver_name, timeline)
 
-    # construct dictionary of super qkd nodes
-    for node in network.get_nodes_by_type(QKDTopo.QKD_NODE):
-        sim_nodes[node.name] = SuperQKDNode(node.name)
+    # photons of a BB84 frame are simulated as arrays
+    if not analytic:
+        sender.update_lightsource_params("pulse_train", pulse_train)
+        receiver.update_lightsource_params("pulse_train", pulse_train)
 
-    # make network topology with our wrappers
-    for _, node in enumerate(network.get_nodes_by_type(QKDTopo.QKD_NODE)):
-        for key in node.cchannels.keys():
+    # one way error correction instead of cascade
+    if ldpc and not analytic:
+        sender.set_protocol_layer(1, LDPC(sender, sender_name + ".ldpc"))
+        receiver.set_protocol_layer(1, LDPC(receiver, receiver_name + ".ldpc"))
 
-            source = node.name
-            dest = node.cchannels[key].receiver
+    # key managers get secret keys compressed from the corrected keys
+    if privacy_amplification and not analytic:
+        sender.set_protocol_layer(
+            3, PrivacyAmplification(sender, sender_name + ".pa"))
+        receiver.set_protocol_layer(
+            3, PrivacyAmplification(receiver, receiver_name + ".pa"))
 
-            sender_name = source + " to " + dest + ".sender"
-            sender = QKDNode(sender_name, timeline)
+    dest_receiver = dest + " to " + source + ".receiver"
+    dest_sender = dest + " to " + source + ".sender"
 
-            receiver_name = source + " to " + dest + ".receiver"
-            receiver = QKDNode(receiver_name, timeline)
+    # sender channels
+    cchannel_name = "cchannel[" + source + " to " + dest + ".sender]"
+    cchannel = ClassicalChannel(cchannel_name, timeline, distance, 1)
+    cchannel.set_ends(sender, dest_receiver)
 
-            dest_receiver = dest + " to " + source + ".receiver"
-            dest_sender = dest + " to " + source + ".sender"
+    qchannel_name = "qchannel[" + source + " to " + dest + ".sender]"
+    qchannel = QuantumChannel(
+        qchannel_name, timeline, attenuation, distance, fidelity)
+    qchannel.set_ends(sender, dest_receiver)
 
-            # sender channels
-            cchannel_name = "cchannel[" + source + " to " + dest + ".sender]"
-            cchannel = ClassicalChannel(cchannel_name, timeline, 1000, 1)
-            cchannel.set_ends(sender, dest_receiver)
+    # receiver channels
+    cchannel_name = "cchannel[" + source + " to " + dest + ".receiver]"
+    cchannel = ClassicalChannel(cchannel_name, timeline, distance, 1)
+    cchannel.set_ends(receiver, dest_sender)
 
-            qchannel_name = "qchannel[" + source + " to " + dest + ".sender]"
-            qchannel = QuantumChannel(
-                qchannel_name, timeline, 0.0001, 1000, fidelity)
-            qchannel.set_ends(sender, dest_receiver)
+    qchannel_name = "qchannel[" + source + " to " + dest + ".receiver]"
+    qchannel = QuantumChannel(
+        qchannel_name, timeline, attenuation, distance, fidelity)
+    qchannel.set_ends(receiver, dest_sender)
 
-            # receiver channels
-            cchannel_name = "cchannel[" + source + " to " + dest + ".receiver]"
-            cchannel = ClassicalChannel(cchannel_name, timeline, 1000, 1)
-            cchannel.set_ends(receiver, dest_sender)
+    senderp = MessagingProtocol(
+        sender, "msgp", "msgp", dest_receiver, sim_nodes[source])
+    receiverp = MessagingProtocol(
+        receiver, "msgp", "msgp", dest_sender, sim_nodes[source])
 
-            qchannel_name = "qchannel[" + source + " to " + dest + ".receiver]"
-            qchannel = QuantumChannel(
-                qchannel_name, timeline, 0.0001, 1000, fidelity)
-            qchannel.set_ends(receiver, dest_sender)
+    sim_nodes[source].srqkdnodes[dest] = SRQKDNode(
+        sender, receiver, senderp, receiverp)
 
-            senderp = MessagingProtocol(
-                sender, "msgp", "msgp", dest_receiver, sim_nodes[node.name])
-            receiverp = MessagingProtocol(
-                receiver, "msgp", "msgp", dest_sender, sim_nodes[node.name])
 
-            sim_nodes[node.name].srqkdnodes[dest] = SRQKDNode(
-                sender, receiver, senderp, receiverp)
+# build the network wrappers straight from the networkx graph on the given
+# timeline, edge attributes override the default link parameters
+def gen_topology(graph, timeline, fidelity, distance=1000,
+                 attenuation=0.0001, analytic=False, pulse_train=True,
+                 privacy_amplification=False, ldpc=False):
+    sim_nodes = {}
+
+    # construct dictionary of super qkd nodes
+    for n in graph.nodes:
+        sim_nodes["node" + str(n)] = SuperQKDNode("node" + str(n))
+
+    # both directions of every edge carry a sender/receiver pair
+    for u, v, attrs in graph.edges(data=True):
+        link = (attrs.get("distance", distance),
+                attrs.get("attenuation", attenuation),
+                attrs.get("fidelity", fidelity),
+                attrs.get("analytic", analytic),
+                pulse_train, privacy_amplification, ldpc)
+        add_link(sim_nodes, timeline, "node" + str(u), "node" + str(v), *link)
+        add_link(sim_nodes, timeline, "node" + str(v), "node" + str(u), *link)
 
     return sim_nodes
 
 
-def run_sim(timeline, network, sim_nodes, num_keys, key_size, delta):
+# highest protocol of the stack of a node, the one key managers attach to
+def top_protocol(node):
+    if node.protocol_stack[3] is not None:
+        return node.protocol_stack[3]
+    return node.protocol_stack[1]
+
+
+def run_sim(timeline, sim_nodes, num_keys, key_size, delta,
+            warm_up=True, qkd_period=None, sink=None, payload_size=None,
+            key_cache=None):
 
     tick = time.time()
-    print(f"{Fore.LIGHTMAGENTA_EX}[NODES PAIRED FOR QKD]{Fore.RESET}")
+    if sink is None:
+        sink = NullSink()
 
     # pair each directly connected QKDNode for the QKD
-    for node in network.get_nodes_by_type(QKDTopo.QKD_NODE):
-        neighbors = node.qchannels.keys()
-        for k in neighbors:
-            A = sim_nodes[node.name].srqkdnodes[k].sender
-            B = sim_nodes[k].srqkdnodes[node.name].receiver
+    for name, super_node in sim_nodes.items():
+        for k in super_node.srqkdnodes:
+            A = super_node.srqkdnodes[k].sender
+            B = sim_nodes[k].srqkdnodes[name].receiver
 
             A.set_seed(0)
             B.set_seed(1)
 
+            if isinstance(A, AnalyticQKDNode):
+                pair_analytic_protocols(A.protocol_stack[1],
+                                        B.protocol_stack[1])
+                continue
             pair_bb84_protocols(A.protocol_stack[0], B.protocol_stack[0])
-            pair_cascade_protocols(A.protocol_stack[1], B.protocol_stack[1])
-            print(
-                f"{Fore.GREEN}[PAIR]: {Fore.RESET}"
-                f"{Fore.LIGHTCYAN_EX}[{A.name}]{Fore.RESET}"
-                f" - {Fore.LIGHTBLUE_EX}[{B.name}]{Fore.RESET}")
+            if isinstance(A.protocol_stack[1], LDPC):
+                pair_ldpc_protocols(A.protocol_stack[1], B.protocol_stack[1])
+            else:
+                pair_cascade_protocols(A.protocol_stack[1],
+                                       B.protocol_stack[1])
+            if A.protocol_stack[3] is not None:
+                pair_pa_protocols(A.protocol_stack[3], B.protocol_stack[3])
 
     # set up key managers for storing the generated quantum keys
     for super_node in sim_nodes.values():
         for srnode in super_node.srqkdnodes.values():
             km1 = KeyManager(timeline, key_size, num_keys)
-            km1.lower_protocols.append(srnode.sender.protocol_stack[1])
-            srnode.sender.protocol_stack[1].upper_protocols.append(km1)
+            km1.lower_protocols.append(top_protocol(srnode.sender))
+            top_protocol(srnode.sender).upper_protocols.append(km1)
 
             km2 = KeyManager(timeline, key_size, num_keys)
-            km2.lower_protocols.append(srnode.receiver.protocol_stack[1])
-            srnode.receiver.protocol_stack[1].upper_protocols.append(km2)
+            km2.lower_protocols.append(top_protocol(srnode.receiver))
+            top_protocol(srnode.receiver).upper_protocols.append(km2)
 
             srnode.addKeyManagers(km1, km2)
 
@@ -151,79 +194,45 @@ def run_sim(timeline, network, sim_nodes, num_keys, key_size, delta):
 
         sender_receiver.append({sender: f"node{receiver_node}"})
 
-    print(
-        f"{Fore.YELLOW}[Messages to Send]:{Fore.RESET} {json.dumps(sender_receiver, indent=4)}")
+    sink.record("messages_to_send", time=timeline.now(),
+                messages=sender_receiver)
 
-    # execute qkd for every node in the network
-    timeline.init()
+    # generate the routing tables, they are kept up to date as the
+    # key pools of the links drain and refill
+    topo_manager = NewQKDTopo(sim_nodes)
+    topo_manager.gen_forward_tables()
+
+    # messages and single key random QKD requests are pre-scheduled
+    # by the traffic generator when the timeline is initialized
+    traffic = TrafficGenerator("traffic", timeline, sim_nodes,
+                               sender_receiver, delta, warm_up=warm_up,
+                               qkd_period=qkd_period, sink=sink)
+    # random payload of the given size instead of the default text
+    if payload_size is not None:
+        traffic.plaintext = numpy.random.bytes(payload_size)
     for super_node in sim_nodes.values():
-        for sr_node in super_node.srqkdnodes.values():
-            print(
-                f"{Fore.LIGHTCYAN_EX}[SEND QKD REQUEST]:{Fore.RESET} {sr_node.sender.name}")
+        super_node.attach(sink)
+
+    # execute qkd for every node in the network and run the whole scenario
+    timeline.init()
+    for name, super_node in sim_nodes.items():
+        for dst, sr_node in super_node.srqkdnodes.items():
+            receiverkm = sim_nodes[dst].srqkdnodes[name].receiverkm
+            if key_cache is not None and \
+                    key_cache.replay(sr_node.senderkm, receiverkm):
+                sink.record("qkd_replay", time=timeline.now(),
+                            link=sr_node.sender.name)
+                continue
+            sink.record("qkd_request", time=timeline.now(),
+                        link=sr_node.sender.name)
             sr_node.senderkm.send_request()
     timeline.run()
 
-    print(
-        f"{Fore.YELLOW}[Simulation Time]:{Fore.RESET} {timeline.now() * (10**-12)} s")
-
-    # generate the routing tables
-    topo_manager = NewQKDTopo(sim_nodes)
-    topo_manager.gen_forward_tables()
+    if key_cache is not None:
+        key_cache.store_recorded()
 
-    num_nodes = len(sim_nodes)
-
-    plaintext = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
-
-    successes = 0
-    losses = 0
-
-    i = 0
-    
-    # schedule messages and single key random QKD requests
-    while timeline.now() + delta < timeline.stop_time:
-        curr_sim_time = timeline.now()
-        for key, value in sender_receiver[i % num_nodes].items():
-            sender = key
-            receiver = value
-        i += 1
-        try:
-            message = {"dest": receiver, "payload": plaintext}
-            message = json.dumps(message)
-            timeline.init()
-
-            print(
-                f"{Fore.LIGHTCYAN_EX}[Message]:{Fore.RESET} {sender} to {receiver}")
-            sim_nodes[sender].sendMessage(timeline, receiver, message)
-
-            timeline.run()
-
-        except NoMoreKeysException:
-            losses += 1
-        else:
-            successes += 1
-
-        # schedule QKD requests in between messages
-        while timeline.now() - curr_sim_time < delta:
-            timeline.init()
-            qkd_num = random.randint(0, len(list(sim_nodes))-1)
-
-            for i in range(0, qkd_num):
-                node1 = random.randint(0, len(list(sim_nodes))-1)
-                node_index = random.randint(
-                    0, len(sim_nodes[f"node{node1}"].srqkdnodes.keys())-1)
-                node2 = list(sim_nodes[f"node{node1}"].srqkdnodes.keys())[
-                    node_index]
-                print(
-                    f"{Fore.LIGHTCYAN_EX}[SEND QKD REQUEST]:{Fore.RESET}"
-                    f"{sim_nodes[f'node{node1}'].srqkdnodes[node2].sender.name}")
-
-                # reset num keys internal to the stack protocol
-                sim_nodes[f"node{node1}"].srqkdnodes[node2].sender.protocol_stack[1].frame_num = 1
-                sim_nodes[node2].srqkdnodes[f"node{node1}"].receiver.protocol_stack[1].frame_num = 1
-
-                sim_nodes[f"node{node1}"].srqkdnodes[node2].senderkm.send_request()
-
-            timeline.run()
+    successes = traffic.successes
+    losses = traffic.losses
 
     print(
         f"{Fore.YELLOW}[Successful Messages]:{Fore.RESET} {successes}")
@@ -231,12 +240,19 @@ def run_sim(timeline, network, sim_nodes, num_keys, key_size, delta):
         f"{Fore.YELLOW}[Dropped Messages]:{Fore.RESET} {losses}")
     print(
         f"{Fore.YELLOW}[Simulation Time]:{Fore.RESET} {timeline.now() * (10**-12)} s")
+    exec_time = time.time() - tick
     print(
-        f"{Fore.YELLOW}[Execution Time]: {Fore.RESET} {(time.time() - tick):0.4f} s")
+        f"{Fore.YELLOW}[Execution Time]: {Fore.RESET} {exec_time:0.4f} s")
 
     for super_node in sim_nodes.values():
         for sr_node in super_node.srqkdnodes.values():
-            sr_node.senderMetrics()
+            sink.record("link_metrics", time=timeline.now(),
+                        **sr_node.senderMetrics())
+
+    results = {"successes": successes, "losses": losses,
+               "sim_time": timeline.now() * (10**-12), "exec_time": exec_time}
+    sink.record("summary", time=timeline.now(), **results)
+    return results
 
 
 def main(argv):
@@ -244,7 +260,6 @@ def main(argv):
     current_sim = "simulations/sim_" + \
         str(datetime.now().strftime("%Y-%m-%d_%H:%M:%S")) + "/"
     filename = 'graph_networkx.json'
-    parsename = 'graph_sequence.json'
 
     # default parameters of simulations
     num_keys = 3
@@ -253,11 +268,22 @@ def main(argv):
     fidelity = 0.97
     nodes_number = 10
     output_html = False
+    warm_up = True
+    qkd_period = None
+    draw_graph = True
+    analytic = False
+    pulse_train = True
+    privacy_amplification = False
+    ldpc = False
+    key_cache = None
+    results_format = "jsonl"
+    payload_size = None
+    metrics_interval = None
     delta = 1  # 1 second
     end_time = 5  # 5 seconds
 
     # parse cli arguments
-    opts, _ = getopt.getopt(argv, "f:n:s:kvq:d:e:ht:")
+    opts, _ = getopt.getopt(argv, "f:n:s:kvq:d:e:ht:wb:l:p:m:gac:uxL")
     for opt, arg in opts:
         # network graph filepath
         if opt in ['-f']:
@@ -284,17 +310,55 @@ def main(argv):
         # set delta
         elif opt in ['-t']:
             delta = float(arg)
+        # send the first message at delta, without waiting for the warm up
+        elif opt in ['-w']:
+            warm_up = False
+        # one QKD batch per given seconds instead of back to back batches
+        elif opt in ['-b']:
+            qkd_period = float(arg) * (10**12)
+        # results format: jsonl, csv or quiet
+        elif opt in ['-l']:
+            results_format = arg
+        # size in bytes of the messages payload, one key byte per byte
+        elif opt in ['-p']:
+            payload_size = int(arg)
+        # sampling interval of the link metrics in seconds
+        elif opt in ['-m']:
+            metrics_interval = float(arg)
+        # skip the network graph png
+        elif opt in ['-g']:
+            draw_graph = False
+        # analytic key generation on every link
+        elif opt in ['-a']:
+            analytic = True
+        # simulate every photon instead of whole pulse trains
+        elif opt in ['-u']:
+            pulse_train = False
+        # privacy amplification of the corrected keys on every link
+        elif opt in ['-x']:
+            privacy_amplification = True
+        # LDPC error correction instead of cascade on every link
+        elif opt in ['-L']:
+            ldpc = True
+        # directory of the key material cache
+        elif opt in ['-c']:
+            key_cache = KeyCache(arg)
 
     # conversion of times to picoseconds
     end_time = end_time * (10**12)
     delta = delta * (10**12)
 
-    # generate current sim folder and redirect output to the logger
+    # generate current sim folder and the sink for the simulation records
     os.makedirs(os.path.dirname(current_sim), exist_ok=True)
-    sys.stdout = Logger(current_sim + "sim_output.txt")
+    records_path = current_sim + "sim_output." + results_format
+    if results_format == "quiet":
+        sink = NullSink()
+    else:
+        sink = ResultSink(records_path, results_format)
 
-    print(
-        f"{Fore.YELLOW}[Simulation Command]:{Fore.RESET} python3 {' '.join(sys.argv[0:])}")
+    command = f"python3 {' '.join(sys.argv[0:])}"
+    print(f"{Fore.YELLOW}[Simulation Command]:{Fore.RESET} {command}")
+    sink.record("simulation", time=0, command=command)
 
     # generate random network
     if do_gen:
@@ -307,29 +371,41 @@ def main(argv):
     else:
         print(
             f"{Fore.YELLOW}[Loaded Network Graph From File]:{Fore.RESET} {filename}")
-        with open(filename, 'r') as f:
-            js_graph = json.load(f)
-        graph = nx.readwrite.json_graph.node_link_graph(js_graph)
-        filename = 'graph_networkx.json'
-        with open(current_sim + filename, 'w') as f:
-            json.dump(js_graph, f, ensure_ascii=False)
-
-    # save the network graph to png file
-    draw_to_file(graph, current_sim + "network_graph.png")
+        graph = load_graph(filename)
+        with open(current_sim + 'graph_networkx.json', 'w') as f:
+            json.dump(nx.node_link_data(graph), f, ensure_ascii=False)
 
-    # parse NetworkX JSON to SeQUenCe JSON and load it
-    netparse(current_sim + filename, current_sim + parsename)
-    network = read_config(current_sim + parsename)
+    # save the network graph to png file while the simulation runs
+    if draw_graph:
+        drawing = draw_in_background(graph, current_sim + "network_graph.png",
+                                     "simulations/layouts/")
 
     # set up the network with our wrappers and run the simulation
     timeline = Timeline(end_time)
-    sim_nodes = gen_topology(network, timeline, fidelity)
-    run_sim(timeline, network, sim_nodes, num_keys, key_size, delta)
-
-    sys.stdout.flush()
-    if output_html:
-        os.system("cat " + current_sim + "sim_output.txt"
-                  + " | aha --black > " + current_sim + "sim_output.html")
+    sim_nodes = gen_topology(graph, timeline, fidelity, analytic=analytic,
+                             pulse_train=pulse_train,
+                             privacy_amplification=privacy_amplification,
+                             ldpc=ldpc)
+    if metrics_interval is not None:
+        metrics = MetricsRegistry("metrics", timeline, sim_nodes,
+                                  metrics_interval * (10**12))
+    run_sim(timeline, sim_nodes, num_keys, key_size, delta,
+            warm_up, qkd_period, sink, payload_size, key_cache)
+    sink.close()
+
+    if metrics_interval is not None:
+        metrics.export(current_sim + "metrics.npz")
+
+    # render the reports from the records
+    if results_format != "quiet":
+        records = read_records(records_path, results_format)
+        render_report(records, current_sim + "sim_output.txt")
+        if output_html:
+            render_report(records, current_sim + "sim_output.html",
+                          output_html=True)
+
+    if draw_graph:
+        drawing.join()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,64 @@
+import os
+import json
+import hashlib
+import multiprocessing
+import matplotlib
+import matplotlib.pyplot as plt
+import networkx as nx
+
+# rendering never needs a display, also in the background process
+matplotlib.use("Agg")
+
+# above this number of nodes kamada kawai is slower than the simulation
+LARGE_GRAPH = 200
+
+
+def graph_hash(graph):
+    nodes = sorted(str(n) for n in graph.nodes)
+    edges = sorted(sorted((str(u), str(v))) for u, v in graph.edges)
+    data = json.dumps([nodes, edges]).encode()
+    return hashlib.sha256(data).hexdigest()
+
+
+def compute_layout(graph):
+    if len(graph) <= LARGE_GRAPH:
+        return nx.kamada_kawai_layout(graph)
+    # sparse eigenvectors, fast enough for thousands of nodes
+    return nx.spectral_layout(graph)
+
+
+# layouts are cached on disk by graph hash and reused across runs
+def get_layout(graph, cache_dir):
+    cache_path = os.path.join(cache_dir, graph_hash(graph) + ".json")
+    if os.path.exists(cache_path):
+        with open(cache_path, 'r') as f:
+            positions = json.load(f)
+        return {n: positions[str(n)] for n in graph.nodes}
+
+    pos = compute_layout(graph)
+    os.makedirs(cache_dir, exist_ok=True)
+    # write and rename, concurrent runs never read a partial layout
+    tmp_path = cache_path + "." + str(os.getpid())
+    with open(tmp_path, 'w') as f:
+        json.dump({str(n): [float(x), float(y)]
+                   for n, (x, y) in pos.items()}, f)
+    os.replace(tmp_path, cache_path)
+    return pos
+
+
+def draw_to_file(graph, filepath, cache_dir):
+    pos = get_layout(graph, cache_dir)
+    nx.draw_networkx_nodes(graph, pos, node_size=50, margins=0.01)
+    nx.draw_networkx_labels(graph, pos, font_size=5, font_color='w')
+    nx.draw_networkx_edges(graph, pos, width=0.5)
+    plt.savefig(filepath, dpi=500, orientation='landscape',
+                bbox_inches='tight')
+    plt.close()
+
+
+# render while the simulation runs, join the process before exiting
+def draw_in_background(graph, filepath, cache_dir):
+    process = multiprocessing.Process(
+        target=draw_to_file, args=(graph, filepath, cache_dir))
+    process.start()
+    return process
@@ -0,0 +1,181 @@
+import csv
+import glob
+import json
+import html
+
+# bytes of the delivered payloads kept in the records
+PAYLOAD_PREVIEW = 64
+
+
+class NullSink():
+
+    # quiet mode, records are discarded as soon as they are produced
+    def record(self, record_type, **fields):
+        pass
+
+    def update(self, super_node, info):
+        pass
+
+    def close(self):
+        pass
+
+
+class ResultSink(NullSink):
+
+    def __init__(self, filepath, fmt="jsonl", buffer_size=4096):
+        self.filepath = filepath
+        self.fmt = fmt
+        self.buffer_size = buffer_size
+        self.buffer = []
+        # csv writers, one file per record type
+        self.files = {}
+        self.writers = {}
+
+        if fmt == "jsonl":
+            self.files[None] = open(filepath, "w")
+        elif fmt != "csv":
+            raise ValueError(f"invalid results format {fmt}")
+
+    def record(self, record_type, **fields):
+        fields["type"] = record_type
+        self.buffer.append(fields)
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
+
+    # outcome of the messages reported by the super nodes
+    def update(self, super_node, info):
+        payload = info["payload"]
+        if payload is not None:
+            payload = bytes(payload[:PAYLOAD_PREVIEW]).decode("latin-1")
+        self.record("message_" + info["type"], time=info["time"],
+                    node=super_node.name, dest=info["dest"],
+                    length=info["length"], payload=payload)
+
+    def flush(self):
+        if self.fmt == "jsonl":
+            self.files[None].write(
+                "".join(json.dumps(r) + "\n" for r in self.buffer))
+        else:
+            for r in self.buffer:
+                self._csv_writer(r).writerow(
+                    {k: json.dumps(v) if isinstance(v, (list, dict)) else v
+                     for k, v in r.items()})
+        self.buffer = []
+
+    def close(self):
+        self.flush()
+        for f in self.files.values():
+            f.close()
+
+    def _csv_writer(self, r):
+        record_type = r["type"]
+        path = f"{self.filepath}.{record_type}.csv"
+        if record_type not in self.writers:
+            f = open(path, "w", newline="")
+            self.files[record_type] = f
+            self.writers[record_type] = csv.DictWriter(
+                f, fieldnames=list(r), restval="")
+            self.writers[record_type].writeheader()
+
+        # records of a type may carry extra fields (e.g. the link metrics
+        # of mixed links), the file is rewritten with the union of the
+        # columns, earlier rows leave the new columns empty
+        writer = self.writers[record_type]
+        extra = [k for k in r if k not in writer.fieldnames]
+        if extra:
+            self.files[record_type].close()
+            with open(path, "r", newline="") as f:
+                rows = list(csv.DictReader(f))
+            f = open(path, "w", newline="")
+            self.files[record_type] = f
+            writer = csv.DictWriter(f, fieldnames=writer.fieldnames + extra,
+                                    restval="")
+            writer.writeheader()
+            writer.writerows(rows)
+            self.writers[record_type] = writer
+        return writer
+
+
+def read_records(filepath, fmt="jsonl"):
+    if fmt == "jsonl":
+        with open(filepath, "r") as f:
+            return [json.loads(line) for line in f]
+
+    records = []
+    for path in glob.glob(glob.escape(filepath) + ".*.csv"):
+        with open(path, "r", newline="") as f:
+            records.extend(csv.DictReader(f))
+    records.sort(key=lambda r: float(r["time"]))
+    return records
+
+
+def _format_record(r):
+    t = r["type"]
+    if t == "simulation":
+        return [("title", "[Simulation Command]: "), ("", r["command"])]
+    if t == "messages_to_send":
+        return [("title", "[Messages to Send]: "),
+                ("", json.dumps(r["messages"], indent=4))]
+    if t == "qkd_request":
+        return [("cyan", "[SEND QKD REQUEST]: "), ("", r["link"])]
+    if t == "qkd_replay":
+        return [("cyan", "[REPLAY CACHED KEYS]: "), ("", r["link"])]
+    if t == "message_sent":
+        return [("cyan", "[Message]: "),
+                ("", f"{r['src']} to {r['dest']} ({r['length']} bytes)")]
+    if t in ["message_delivered", "message_forwarded"]:
+        lines = [("magenta", f"[{r['node']}]\n"),
+                 ("", "Received: "), ("green", "TEXT Message\n"),
+                 ("", "At Simulation Time: "),
+                 ("cyan", f"{float(r['time']) * (10 ** -12)} s")]
+        if t == "message_forwarded":
+            lines.append(("blue", "\n[Forwarding...]\n"))
+        else:
+            lines += [("", "\nDecrypted Message: "), ("yellow", r["payload"])]
+        return lines
+    if t == "message_dropped":
+        return [("red", f"[{r['node']}] [No Keys Available To Use] "),
+                ("", f"message to {r['dest']} dropped")]
+    if t == "link_metrics":
+        return [("magenta", f"[Performance Metrics - {r['link']}]\n"),
+                ("cyan", "Cascade Protocol"),
+                ("", f"\n\tThroughput: {r['cascade_throughput']}bits/sec"
+                     f"\n\tError Bit Rate: {r['cascade_error_bit_rate']}"
+                     f"\n\tLatency: {r['cascade_latency']}"
+                     f"\n\tSetup Time: {r['cascade_setup_time']}"
+                     f"\n\tStart Time: {r['cascade_start_time']}\n"),
+                ("cyan", "BB84 Protocol"),
+                ("", f"\n\tThroughput: {r['bb84_throughputs']}bits/sec"
+                     f"\n\tError Rates: {r['bb84_error_rates']}"
+                     f"\n\tLatency: {r['bb84_latency']}s")]
+    if t == "summary":
+        return [("title", "[Successful Messages]: "), ("", f"{r['successes']}\n"),
+                ("title", "[Dropped Messages]: "), ("", f"{r['losses']}\n"),
+                ("title", "[Simulation Time]: "), ("", f"{r['sim_time']} s\n"),
+                ("title", "[Execution Time]: "), ("", f"{float(r['exec_time']):0.4f} s")]
+    return [("", json.dumps(r))]
+
+
+HTML_COLORS = {"title": "#e5e510", "cyan": "#29b8db", "magenta": "#d670d6",
+               "green": "#23d18b", "blue": "#3b8eea", "yellow": "#f5f543",
+               "red": "#f14c4c"}
+
+
+# render a report from the records after the simulation has ended
+def render_report(records, filepath, output_html=False):
+    with open(filepath, "w") as f:
+        if output_html:
+            f.write('<html><body style="background: black; color: white">'
+                    '<pre>\n')
+        for r in records:
+            for color, text in _format_record(r):
+                if not output_html:
+                    f.write(text)
+                elif color:
+                    f.write(f'<span style="color: {HTML_COLORS[color]}">'
+                            f'{html.escape(text)}</span>')
+                else:
+                    f.write(html.escape(text))
+            f.write("\n")
+        if output_html:
+            f.write("</pre></body></html>\n")
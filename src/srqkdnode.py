@@ -1,7 +1,6 @@
 from sequence.kernel.process import Process
 from sequence.kernel.event import Event
-from colorama import Fore
-from keys_exception import NoMoreKeysException
+from messaging import unpack_header
 
 
 class SRQKDNode:
@@ -25,38 +24,39 @@ class SRQKDNode:
         self.senderp.add_key_manager(senderkm)
         self.receiverp.add_key_manager(receiverkm)
 
-    def sendMessage(self, tl, plaintext):
-        if len(self.senderkm.keys) > 0:
-            key = self.senderkm.consume()
-            process = Process(self.senderp, "start", [plaintext, key])
-            event = Event(tl.now(), process)
-            tl.schedule(event)
-            return
-        print(f"{Fore.RED} sender.name = {self.sender.name}{Fore.RESET}")
-        print(Fore.RED, "[No Keys Available To Use]", Fore.RESET)
-        raise NoMoreKeysException
-
-    def _printMetrics(self, node):
-        name = node.name
+    # one key byte per payload byte, raises NoMoreKeysException otherwise.
+    # a 26 bytes message uses 208 key bits per hop instead of one 128 bits
+    # key, which lowers every message and key rate reported by the simulator
+    def sendMessage(self, tl, packet):
+        _, length = unpack_header(packet)
+        key = self.senderkm.consume_bits(length * 8)
+        process = Process(self.senderp, "start", [packet, key])
+        event = Event(tl.now(), process)
+        tl.schedule(event)
+
+    def _metrics(self, node):
         bb84 = node.protocol_stack[0]
         cascade = node.protocol_stack[1]
-
-        print(
-            f"{Fore.LIGHTMAGENTA_EX}[Performance Metrics - {name}]{Fore.RESET}"
-            f"\n{Fore.LIGHTCYAN_EX}Cascade Protocol{Fore.RESET}"
-            f"\n\tThroughput: {cascade.throughput}bits/sec"
-            f"\n\tError Bit Rate: {cascade.error_bit_rate}"
-            f"\n\tLatency: {cascade.latency}"
-            f"\n\tSetup Time: {cascade.setup_time}"
-            f"\n\tStart Time: {cascade.start_time}"
-            f"\n{Fore.LIGHTCYAN_EX}BB84 Protocol{Fore.RESET}"
-            f"\n\tThroughput: {bb84.throughputs}bits/sec"
-            f"\n\tError Rates: {bb84.error_rates}"
-            f"\n\tLatency: {bb84.latency}s"
-        )
+        pa = node.protocol_stack[3]
+
+        metrics = {
+            "link": node.name,
+            "cascade_throughput": cascade.throughput,
+            "cascade_error_bit_rate": cascade.error_bit_rate,
+            "cascade_latency": cascade.latency,
+            "cascade_setup_time": cascade.setup_time,
+            "cascade_start_time": cascade.start_time,
+            "bb84_throughputs": bb84.throughputs,
+            "bb84_error_rates": bb84.error_rates,
+            "bb84_latency": bb84.latency,
+        }
+        if pa is not None:
+            metrics["pa_throughput"] = pa.throughput
+            metrics["pa_compression_ratio"] = pa.compression_ratio
+        return metrics
 
     def senderMetrics(self):
-        self._printMetrics(self.sender)
+        return self._metrics(self.sender)
 
     def receiverMetrics(self):
-        self._printMetrics(self.receiver)
+        return self._metrics(self.receiver)
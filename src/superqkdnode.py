@@ -1,4 +1,3 @@
-from colorama import Fore
 from keys_exception import NoMoreKeysException
 
 
@@ -8,13 +7,20 @@ class SuperQKDNode:
         self.name = name
         self.srqkdnodes = {}
         self.routing_table = {}
+        self.observers = []
 
-    def sendMessage(self, tl, dest_node, plaintext_msg):
+    def attach(self, observer):
+        if observer not in self.observers:
+            self.observers.append(observer)
+
+    # notify observers about delivered and dropped messages
+    def notify(self, info):
+        for observer in self.observers:
+            observer.update(self, info)
+
+    def sendMessage(self, tl, dest_node, packet):
         if dest_node not in self.routing_table.keys():
-            print(f"{Fore.RED}[No Path towards Destination]{Fore.RESET}")
             raise NoMoreKeysException
         else:
             next_hop_name = self.routing_table[dest_node][1]
-            for srn in self.srqkdnodes.values():
-                if srn.sender.name.endswith(next_hop_name + ".sender"):
-                    srn.sendMessage(tl, plaintext_msg)
+            self.srqkdnodes[next_hop_name].sendMessage(tl, packet)
@@ -0,0 +1,158 @@
+import sys
+import os
+import getopt
+import csv
+import json
+import random
+import itertools
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy
+from colorama import Fore
+
+# sequence modules
+from sequence.kernel.timeline import Timeline
+
+# netsecqkd modules
+from qkd_sim import load_graph, gen_topology, run_sim
+from keycache import KeyCache
+
+RESULT_FIELDS = ["delta", "end_time", "key_size", "fidelity", "seed",
+                 "num_keys", "payload_size", "analytic", "successes", "losses", "sim_time", "exec_time"]
+
+# topology shared by all the cells executed in the same worker process
+_graph = None
+_cache_dir = None
+
+
+def _init_worker(filename, cache_dir):
+    global _graph, _cache_dir
+    # the simulations are too verbose to be useful when run in parallel
+    sys.stdout = open(os.devnull, 'w')
+    _graph = load_graph(filename)
+    _cache_dir = cache_dir
+
+
+def run_cell(cell):
+    random.seed(cell["seed"])
+    numpy.random.seed(cell["seed"])
+
+    # conversion of times to picoseconds
+    timeline = Timeline(cell["end_time"] * (10**12))
+    sim_nodes = gen_topology(_graph, timeline, cell["fidelity"],
+                             analytic=cell["analytic"])
+    key_cache = None
+    if _cache_dir is not None:
+        key_cache = KeyCache(_cache_dir, seed=cell["seed"])
+    results = run_sim(timeline, sim_nodes, cell["num_keys"],
+                      cell["key_size"], cell["delta"] * (10**12),
+                      payload_size=cell["payload_size"], key_cache=key_cache)
+
+    return {**cell, **results}
+
+
+def gen_grid(deltas, end_times, key_sizes, fidelities, seeds, num_keys,
+             payload_sizes=None, analytic=False):
+    if payload_sizes is None:
+        payload_sizes = [None]
+    grid = []
+    for delta, end_time, key_size, fidelity, seed, payload_size in \
+            itertools.product(deltas, end_times, key_sizes, fidelities, seeds,
+                              payload_sizes):
+        grid.append({"delta": delta, "end_time": end_time,
+                     "key_size": key_size, "fidelity": fidelity,
+                     "seed": seed, "num_keys": num_keys,
+                     "payload_size": payload_size, "analytic": analytic})
+    return grid
+
+
+def sweep(filename, grid, outpath, workers=None, cache_dir=None):
+    with open(outpath, 'w', newline='') as f, ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker,
+            initargs=(filename, cache_dir)) as executor:
+        writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
+
+        futures = [executor.submit(run_cell, cell) for cell in grid]
+        for done, future in enumerate(as_completed(futures), 1):
+            row = future.result()
+            writer.writerow(row)
+            f.flush()
+            print(
+                f"{Fore.GREEN}[{done}/{len(grid)}]{Fore.RESET} "
+                f"{json.dumps({k: row[k] for k in RESULT_FIELDS})}")
+
+
+def parse_list(arg, cast):
+    return [cast(v) for v in arg.split(',')]
+
+
+def main(argv):
+    outpath = "simulations/sweep_" + \
+        str(datetime.now().strftime("%Y-%m-%d_%H:%M:%S")) + ".csv"
+
+    # default parameters of the sweep
+    filename = 'graph_networkx_chain.json'
+    num_keys = 3
+    key_sizes = [128]
+    fidelities = [0.97]
+    deltas = [1]
+    end_times = [5]
+    seeds = [0]
+    payload_sizes = [None]
+    analytic = False
+    cache_dir = None
+    workers = None
+
+    # parse cli arguments, every grid axis is a comma separated list
+    opts, _ = getopt.getopt(argv, "f:n:s:q:e:t:r:j:o:p:ac:")
+    for opt, arg in opts:
+        # network graph filepath
+        if opt in ['-f']:
+            filename = arg
+        # number of keys to generate
+        elif opt in ['-n']:
+            num_keys = int(arg)
+        # keys bits to generate
+        elif opt in ['-s']:
+            key_sizes = parse_list(arg, int)
+        # fidelity of quantum channels
+        elif opt in ['-q']:
+            fidelities = parse_list(arg, float)
+        # max simulation duration in seconds
+        elif opt in ['-e']:
+            end_times = parse_list(arg, float)
+        # delta of the messages in seconds
+        elif opt in ['-t']:
+            deltas = parse_list(arg, float)
+        # random seeds, one simulation per seed
+        elif opt in ['-r']:
+            seeds = parse_list(arg, int)
+        # number of worker processes
+        elif opt in ['-j']:
+            workers = int(arg)
+        # results filepath
+        elif opt in ['-o']:
+            outpath = arg
+        # payload sizes of the messages in bytes
+        elif opt in ['-p']:
+            payload_sizes = parse_list(arg, int)
+        # analytic key generation on every link
+        elif opt in ['-a']:
+            analytic = True
+        # directory of the key material cache
+        elif opt in ['-c']:
+            cache_dir = arg
+
+    os.makedirs(os.path.dirname(outpath) or '.', exist_ok=True)
+    grid = gen_grid(deltas, end_times, key_sizes, fidelities, seeds, num_keys,
+                    payload_sizes, analytic)
+
+    print(
+        f"{Fore.YELLOW}[Sweep]:{Fore.RESET} {len(grid)} simulations on "
+        f"{filename}, results in {outpath}")
+    sweep(filename, grid, outpath, workers, cache_dir)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
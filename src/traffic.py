@@ -0,0 +1,154 @@
+import random
+
+# sequence modules
+from sequence.kernel.entity import Entity
+from sequence.kernel.event import Event
+from sequence.kernel.process import Process
+
+# netsecqkd modules
+from keys_exception import NoMoreKeysException
+from messaging import pack_packet
+from results import NullSink
+
+
+class TrafficGenerator(Entity):
+
+    # by default messages start once every link has its warm up keys and
+    # single key QKD batches run back to back until delta has elapsed since
+    # the last message, like the baseline sequential runs. warm_up=False
+    # starts the messages at delta, a qkd_period schedules one batch per
+    # period instead
+    def __init__(self, name, timeline, sim_nodes, sender_receiver, delta,
+                 plaintext=b'ABCDEFGHIJKLMNOPQRSTUVWXYZ', qkd_period=None,
+                 warm_up=True, sink=None):
+        Entity.__init__(self, name, timeline)
+        self.sim_nodes = sim_nodes
+        self.sender_receiver = sender_receiver
+        self.delta = delta
+        self.plaintext = plaintext
+        self.qkd_period = qkd_period
+        self.warm_up = warm_up
+        self.sink = NullSink() if sink is None else sink
+
+        # key managers still waiting for their warm up keys
+        self.warming = set()
+        # keys received by each key manager when the current batch is done
+        self.pending = {}
+        self.last_message_time = None
+
+        self.successes = 0
+        self.losses = 0
+
+        # delivered and dropped messages are reported by the super nodes
+        for super_node in sim_nodes.values():
+            super_node.attach(self)
+
+    def key_managers(self):
+        for super_node in self.sim_nodes.values():
+            for sr_node in super_node.srqkdnodes.values():
+                yield sr_node.senderkm
+                yield sr_node.receiverkm
+
+    # called once by timeline.init()
+    def init(self):
+        for km in self.key_managers():
+            km.attach(self)
+
+        if self.warm_up:
+            self.warming = {km for km in self.key_managers()
+                            if len(km.times) < km.num_keys}
+        if not self.warming:
+            self.start(self.delta if not self.warm_up else self.timeline.now())
+
+    # pre-schedule the messages and the periodic QKD batches
+    def start(self, start_time):
+        time = start_time
+        i = 0
+        while time + self.delta < self.timeline.stop_time:
+            for sender, receiver in self.sender_receiver[
+                    i % len(self.sender_receiver)].items():
+                process = Process(self, "send_message", [sender, receiver])
+                self.timeline.schedule(Event(int(time), process))
+            time += self.delta
+            i += 1
+
+        if self.qkd_period is None:
+            return
+        time = start_time + self.qkd_period / 2
+        while time < self.timeline.stop_time:
+            process = Process(self, "refresh_keys", [])
+            self.timeline.schedule(Event(int(time), process))
+            time += self.qkd_period
+
+    def send_message(self, sender, receiver):
+        self.last_message_time = self.timeline.now()
+        # every message owns its buffer, encrypted in place at every hop
+        packet = pack_packet(receiver, self.plaintext)
+        self.sink.record("message_sent", time=self.timeline.now(),
+                         src=sender, dest=receiver, length=len(self.plaintext))
+        try:
+            self.sim_nodes[sender].sendMessage(self.timeline, receiver, packet)
+        except NoMoreKeysException:
+            self.sim_nodes[sender].notify({"type": "dropped",
+                                           "time": self.timeline.now(),
+                                           "dest": receiver,
+                                           "length": len(self.plaintext),
+                                           "payload": None})
+
+        # batches of a stalled request do not carry over to the next message
+        if self.qkd_period is None:
+            self.pending = {}
+            self.refresh_keys()
+
+    def refresh_keys(self):
+        qkd_num = random.randint(0, len(self.sim_nodes) - 1)
+        # empty batches take no time, they are drawn again
+        while qkd_num == 0 and self.qkd_period is None \
+                and len(self.sim_nodes) > 1:
+            qkd_num = random.randint(0, len(self.sim_nodes) - 1)
+
+        for _ in range(0, qkd_num):
+            node1 = random.choice(list(self.sim_nodes))
+            node2 = random.choice(list(self.sim_nodes[node1].srqkdnodes))
+            self.request_qkd(node1, node2)
+
+    def request_qkd(self, node1, node2):
+        sr_node = self.sim_nodes[node1].srqkdnodes[node2]
+        self.sink.record("qkd_request", time=self.timeline.now(),
+                         link=sr_node.sender.name)
+
+        # the batch is done once both ends received their keys, requests on
+        # the same link add up
+        receiverkm = self.sim_nodes[node2].srqkdnodes[node1].receiverkm
+        for km in [sr_node.senderkm, receiverkm]:
+            self.pending[km] = self.pending.get(km, len(km.times)) + 1
+
+        # a single key, not the warm up keys of the key manager
+        sr_node.senderkm.send_request(1)
+
+    # keys received by the key managers
+    def update_keys(self, km, info):
+        if km in self.warming and info["received"] >= km.num_keys:
+            self.warming.remove(km)
+            if not self.warming:
+                self.start(self.timeline.now())
+
+        if km in self.pending and info["received"] >= self.pending[km]:
+            del self.pending[km]
+            # next batch until delta has elapsed since the last message
+            if not self.pending and self.qkd_period is None and \
+                    self.last_message_time is not None and \
+                    self.timeline.now() < self.last_message_time + self.delta:
+                self.refresh_keys()
+
+    # outcome of the messages reported by the super nodes, and keys
+    # received by the key managers
+    def update(self, subject, info):
+        if "received" in info:
+            self.update_keys(subject, info)
+        elif "has_key" in info:
+            return
+        elif info["type"] == "delivered":
+            self.successes += 1
+        elif info["type"] == "dropped":
+            self.losses += 1
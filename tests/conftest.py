@@ -0,0 +1,5 @@
+import os
+import sys
+
+# netsecqkd modules use flat imports, like when running src/qkd_sim.py
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
@@ -0,0 +1,69 @@
+import pytest
+
+from sequence.components.optical_channel import ClassicalChannel, QuantumChannel
+from sequence.kernel.timeline import Timeline
+from sequence.protocol import StackProtocol
+
+from analytic import AnalyticQKDNode, pair_analytic_protocols
+
+
+# dummy upper protocol collecting the keys
+class Parent(StackProtocol):
+    def __init__(self, own):
+        super().__init__(own, "")
+        self.keys = []
+
+    def pop(self, key):
+        self.keys.append(key)
+
+    def push(self):
+        pass
+
+    def received_message(self, src, msg):
+        pass
+
+
+def create_link(distance=1e4, attenuation=2e-4, fidelity=0.97):
+    tl = Timeline()
+    alice = AnalyticQKDNode("alice", tl)
+    bob = AnalyticQKDNode("bob", tl)
+    for src, dst in [(alice, bob), (bob, alice)]:
+        cc = ClassicalChannel("cc_" + src.name, tl, distance, 1)
+        cc.set_ends(src, dst.name)
+        qc = QuantumChannel("qc_" + src.name, tl, attenuation, distance, fidelity)
+        qc.set_ends(src, dst.name)
+    pair_analytic_protocols(alice.protocol_stack[1], bob.protocol_stack[1])
+
+    parents = []
+    for node in [alice, bob]:
+        parent = Parent(node)
+        node.protocol_stack[1].upper_protocols.append(parent)
+        parents.append(parent)
+    return tl, alice.protocol_stack[1], parents
+
+
+def test_key_rate():
+    tl, protocol, _ = create_link()
+
+    # 2 dB of loss: transmittance 10 ** -0.2 = 0.63096
+    # clicks: 8e7 * (1 - exp(-0.1 * 0.63096 * 0.9)) = 4.41631e6 per second
+    # dead time: 4.41631e6 / (1 + 4.41631e6 / 25e6) = 3.75329e6 per second
+    assert protocol.key_rate() == pytest.approx(1.876643e6, rel=1e-6)
+    # without dark counts only depolarized photons give errors
+    assert protocol.qber() == pytest.approx(0.015)
+
+
+def test_push_adds_requests():
+    tl, protocol, (pa, pb) = create_link()
+    tl.init()
+
+    protocol.push(128, 1)
+    protocol.push(256, 2)
+    assert protocol.keylen == 256
+    assert protocol.frame_num == 3
+
+    tl.run()
+    assert protocol.frame_num == 0
+    assert len(pa.keys) == len(pb.keys) == 3
+    assert pa.keys == pb.keys
+    assert len(pa.keys[-1]) == 256
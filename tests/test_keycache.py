@@ -0,0 +1,111 @@
+import os
+import random
+
+import networkx as nx
+import numpy
+
+from sequence.kernel.timeline import Timeline
+
+from keycache import KeyCache
+from qkd_sim import gen_topology, run_sim
+
+
+def entry(n):
+    return {"sender": [[i, i] for i in range(n)],
+            "receiver": [[i + 1, i] for i in range(n)]}
+
+
+def test_hit_miss(tmp_path):
+    cache = KeyCache(str(tmp_path))
+    assert cache.load("a") is None
+
+    cache.store("a", entry(3))
+    assert cache.load("a") == entry(3)
+    assert cache.load("b") is None
+
+
+def test_corrupted_entry(tmp_path):
+    cache = KeyCache(str(tmp_path))
+    cache.store("a", entry(3))
+
+    path = os.path.join(str(tmp_path), "a.keys")
+    with open(path, "ab") as f:
+        f.write(b" ")
+    assert cache.load("a") is None
+    assert not os.path.exists(path)
+
+
+def test_lru_eviction(tmp_path):
+    cache = KeyCache(str(tmp_path))
+    cache.store("a", entry(10))
+    cache.store("b", entry(10))
+    size = os.path.getsize(os.path.join(str(tmp_path), "a.keys"))
+
+    # b is older than a, until a is used
+    os.utime(os.path.join(str(tmp_path), "a.keys"), (1000, 1000))
+    os.utime(os.path.join(str(tmp_path), "b.keys"), (2000, 2000))
+    assert cache.load("a") == entry(10)
+
+    cache.max_bytes = 2 * size
+    cache.store("c", entry(10))
+    assert cache.load("b") is None
+    assert cache.load("a") == entry(10)
+    assert cache.load("c") == entry(10)
+
+
+def test_error_correction_key(tmp_path):
+    cache = KeyCache(str(tmp_path))
+    keys = []
+    for ldpc in [False, True]:
+        sim_nodes = gen_topology(nx.path_graph(2), Timeline(), 0.97, ldpc=ldpc)
+        sender = sim_nodes["node0"].srqkdnodes["node1"].sender
+        receiver = sim_nodes["node1"].srqkdnodes["node0"].receiver
+        keys.append(cache.link_key(sender, receiver, 128, 10))
+
+    # keys corrected by cascade are not replayed on LDPC links
+    assert keys[0] != keys[1]
+
+
+class RecordingCache(KeyCache):
+
+    # also record the keys of the links replayed from the cache
+    def replay(self, senderkm, receiverkm):
+        senderkm.record()
+        receiverkm.record()
+        return KeyCache.replay(self, senderkm, receiverkm)
+
+
+def run_link(cache):
+    random.seed(0)
+    numpy.random.seed(0)
+
+    # one photon level link, messages once the warm up keys are there
+    timeline = Timeline(0.03e12)
+    sim_nodes = gen_topology(nx.path_graph(2), timeline, 0.97)
+    results = run_sim(timeline, sim_nodes, 10, 128, 0.01e12,
+                      key_cache=cache)
+    key_managers = [km for super_node in sim_nodes.values()
+                    for sr_node in super_node.srqkdnodes.values()
+                    for km in [sr_node.senderkm, sr_node.receiverkm]]
+    return timeline, key_managers, results
+
+
+def test_record_replay(tmp_path):
+    _, recorded, results = run_link(RecordingCache(str(tmp_path)))
+    assert len(os.listdir(str(tmp_path))) == 1
+
+    timeline, replayed, replay_results = run_link(
+        RecordingCache(str(tmp_path)))
+
+    # the warm up keys arrive at the same times, without running BB84
+    for km1, km2 in zip(recorded, replayed):
+        stream1 = [(time, int(key)) for time, key in km1.recording[:10]]
+        stream2 = [(time, int(key)) for time, key in km2.recording[:10]]
+        assert stream1 == stream2
+
+        # later requests find the error correction set up
+        assert km2.lower_protocols[0].error_rate is not None
+
+    assert replay_results["successes"] == results["successes"] > 0
+    assert replay_results["losses"] == 0
+    assert timeline.now() > 0.02e12
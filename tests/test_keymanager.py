@@ -0,0 +1,35 @@
+import numpy as np
+
+from sequence.qkd.bitkey import BitKey
+
+from keymanager import KeyPool
+
+
+def pool_bytes(bits, lengths):
+    pool = KeyPool(capacity=2)
+    start = 0
+    for length in lengths:
+        pool.push(BitKey.from_bits(bits[start:start + length]))
+        start += length
+    return pool.consume(len(pool))
+
+
+def test_pool_encoding():
+    bits = np.random.default_rng(0).integers(2, size=96, dtype=np.uint8)
+    expected = BitKey.from_bits(bits).to_bytes()
+
+    # the same bits give the same key material, however they are split
+    for lengths in [[96], [32, 64], [5, 19, 72], [12] * 8, [1, 7, 8, 80]]:
+        assert pool_bytes(bits, lengths) == expected
+
+
+def test_pool_pending_bits():
+    pool = KeyPool()
+    pool.push(BitKey.from_int(0b101, 3))
+    assert len(pool) == 0
+    assert pool.remaining_bits() == 3
+
+    pool.push(BitKey.from_int(0b11111, 5))
+    assert pool.remaining_bits() == 8
+    assert pool.consume(1) == bytes([0b11111101])
+    assert pool.generated_bits == pool.consumed_bits == 8
@@ -0,0 +1,45 @@
+import os
+import random
+
+import numpy
+
+from sequence.kernel.timeline import Timeline
+
+from metrics import SAMPLE_FIELDS, MetricsRegistry, read_metrics
+from qkd_sim import gen_topology, load_graph, run_sim
+
+GRAPH = os.path.join(os.path.dirname(__file__), "..",
+                     "graph_networkx_chain.json")
+
+
+def test_metrics(tmp_path):
+    random.seed(0)
+    numpy.random.seed(0)
+
+    # analytic links, one sample every 0.25 s of a 1 s run
+    timeline = Timeline(1e12)
+    sim_nodes = gen_topology(load_graph(GRAPH), timeline, 0.97, analytic=True)
+    metrics = MetricsRegistry("metrics", timeline, sim_nodes, 0.25e12)
+    results = run_sim(timeline, sim_nodes, 3, 128, 0.5e12)
+
+    links = [sr_node.sender.name for super_node in sim_nodes.values()
+             for sr_node in super_node.srqkdnodes.values()]
+    assert len(metrics.samples["time"]) == 3 * len(links)
+    assert results["successes"] > 0
+    assert len(metrics.latencies["time"]) >= results["successes"]
+
+    filepath = str(tmp_path / "metrics.npz")
+    metrics.export(filepath)
+    samples, latencies = read_metrics(filepath)
+    assert list(samples) == SAMPLE_FIELDS
+    assert numpy.array_equal(samples["time"], metrics.samples["time"])
+    assert numpy.array_equal(latencies["latency"], metrics.latencies["latency"])
+
+    # cumulative key bits, the rate is the difference between two samples
+    for link in links:
+        rows = samples["link"] == link
+        generated = samples["generated_bits"][rows]
+        assert numpy.all(numpy.diff(generated) >= 0)
+        assert numpy.allclose(samples["key_rate"][rows][1:],
+                              numpy.diff(generated) / 0.25)
+        assert numpy.all(samples["pool_bits"][rows] <= generated)
@@ -0,0 +1,39 @@
+import os
+
+import networkx as nx
+
+from render import draw_in_background, draw_to_file, get_layout, graph_hash
+
+
+def test_graph_hash():
+    graph = nx.path_graph(4)
+    same = nx.Graph([(3, 2), (1, 0), (2, 1)])
+    assert graph_hash(graph) == graph_hash(same)
+    graph.add_edge(0, 3)
+    assert graph_hash(graph) != graph_hash(same)
+
+
+def test_layout_cache(tmp_path):
+    graph = nx.path_graph(5)
+    cache_dir = str(tmp_path / "layouts")
+    pos = get_layout(graph, cache_dir)
+    assert os.listdir(cache_dir) == [graph_hash(graph) + ".json"]
+
+    # the second call reads the cached layout
+    cached = get_layout(graph, cache_dir)
+    assert set(cached) == set(graph.nodes)
+    for n in graph.nodes:
+        assert cached[n] == [float(x) for x in pos[n]]
+
+
+def test_draw(tmp_path):
+    graph = nx.path_graph(5)
+    cache_dir = str(tmp_path / "layouts")
+    draw_to_file(graph, str(tmp_path / "graph.png"), cache_dir)
+    assert os.path.getsize(str(tmp_path / "graph.png")) > 0
+
+    process = draw_in_background(graph, str(tmp_path / "background.png"),
+                                 cache_dir)
+    process.join()
+    assert process.exitcode == 0
+    assert os.path.getsize(str(tmp_path / "background.png")) > 0
@@ -0,0 +1,64 @@
+from results import ResultSink, read_records, render_report
+
+
+class SuperNode():
+    name = "n0"
+
+
+def write_records(sink):
+    sink.record("qkd_request", time=2, link="n0 to n1.sender")
+    sink.record("messages_to_send", time=0, messages=[["n0", "n1"]])
+    sink.update(SuperNode(), {"type": "delivered", "time": 5, "dest": "n1",
+                              "length": 3, "payload": b"abc"})
+    sink.update(SuperNode(), {"type": "dropped", "time": 6, "dest": "n1",
+                              "length": 3, "payload": None})
+    sink.record("qkd_request", time=1, link="n1 to n2.sender", batch=4)
+    sink.close()
+
+
+def test_jsonl(tmp_path):
+    filepath = str(tmp_path / "sim_output.jsonl")
+    # a buffer smaller than the records also flushes while recording
+    write_records(ResultSink(filepath, buffer_size=2))
+
+    records = read_records(filepath)
+    assert [r["type"] for r in records] == [
+        "qkd_request", "messages_to_send", "message_delivered",
+        "message_dropped", "qkd_request"]
+    assert records[1]["messages"] == [["n0", "n1"]]
+    assert records[2]["payload"] == "abc"
+    assert records[3]["payload"] is None
+
+
+def test_csv(tmp_path):
+    filepath = str(tmp_path / "sim_output.csv")
+    write_records(ResultSink(filepath, "csv", buffer_size=2))
+
+    # one file per record type, read back sorted by time
+    records = read_records(filepath, "csv")
+    assert [r["type"] for r in records] == [
+        "messages_to_send", "qkd_request", "qkd_request",
+        "message_delivered", "message_dropped"]
+    assert records[0]["messages"] == '[["n0", "n1"]]'
+    # the extra field of a later record adds a column
+    assert records[1] == {"time": "1", "link": "n1 to n2.sender",
+                          "type": "qkd_request", "batch": "4"}
+    assert records[2]["batch"] == ""
+    assert records[4]["payload"] == ""
+
+
+def test_render_report(tmp_path):
+    filepath = str(tmp_path / "sim_output.jsonl")
+    write_records(ResultSink(filepath))
+    records = read_records(filepath)
+
+    render_report(records, str(tmp_path / "sim_output.txt"))
+    with open(str(tmp_path / "sim_output.txt")) as f:
+        text = f.read()
+    assert "[SEND QKD REQUEST]: n0 to n1.sender" in text
+    assert "Decrypted Message: abc" in text
+    assert "message to n1 dropped" in text
+
+    render_report(records, str(tmp_path / "sim_output.html"), True)
+    with open(str(tmp_path / "sim_output.html")) as f:
+        assert f.read().startswith("<html>")
@@ -0,0 +1,31 @@
+import csv
+import os
+
+from sweep import RESULT_FIELDS, gen_grid, sweep
+
+GRAPH = os.path.join(os.path.dirname(__file__), "..",
+                     "graph_networkx_chain.json")
+
+
+def test_gen_grid():
+    grid = gen_grid([0.5, 0.1], [1], [128, 256], [0.97], [0, 1], 3)
+    assert len(grid) == 8
+    assert grid[0] == {"delta": 0.5, "end_time": 1, "key_size": 128,
+                       "fidelity": 0.97, "seed": 0, "num_keys": 3,
+                       "payload_size": None, "analytic": False}
+
+
+def test_sweep(tmp_path):
+    # analytic links, fast enough for a two cell grid
+    grid = gen_grid([0.5], [1], [128], [0.97], [0, 1], 3, analytic=True)
+    outpath = str(tmp_path / "sweep.csv")
+    sweep(GRAPH, grid, outpath, workers=2)
+
+    with open(outpath, newline="") as f:
+        reader = csv.DictReader(f)
+        rows = list(reader)
+    assert reader.fieldnames == RESULT_FIELDS
+    assert sorted(row["seed"] for row in rows) == ["0", "1"]
+    for row in rows:
+        assert int(row["successes"]) + int(row["losses"]) > 0
+        assert float(row["sim_time"]) <= 1